@@ -0,0 +1,44 @@
+"""
+Times AssetManager startup over a folder of synthetic packs with different loader thread counts.
+
+    python manager_load.py --packs 32 --count 2000
+"""
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+from synthetic import make_pack2
+from DbgPack import AssetManager
+
+
+def main():
+    parser = ArgumentParser(description="AssetManager parallel pack loading benchmark")
+    parser.add_argument("--packs", type=int, default=32, help="number of synthetic packs")
+    parser.add_argument("--count", type=int, default=2000, help="assets per pack")
+    parser.add_argument("--size", type=int, default=1024, help="unzipped size of each asset")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.packs):
+            path = Path(tmp) / f"synthetic_{i:03d}.pack2"
+            make_pack2(path, args.count, args.size, seed=i, prefix=path.stem)
+            paths.append(path)
+
+        baseline = None
+        for processes in (False, True):
+            for workers in args.workers:
+                if processes and workers == 1:
+                    continue
+                start = time.perf_counter()
+                manager = AssetManager(paths, workers=workers, processes=processes)
+                elapsed = time.perf_counter() - start
+                baseline = baseline or elapsed
+                print(f"{'processes' if processes else 'threads':9} workers={workers:<3} {elapsed * 1000:9.1f} ms"
+                      f"  x{baseline / elapsed:5.2f}  {len(manager)} assets")
+
+
+if __name__ == "__main__":
+    main()
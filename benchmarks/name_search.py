@@ -0,0 +1,61 @@
+"""
+Times AssetManager name queries against the linear scan search used to do, on a large synthetic namelist.
+
+    python name_search.py --count 200000
+"""
+import random
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+from synthetic import make_pack2
+from DbgPack import AssetManager
+
+QUERIES = [("synthetic_012345", ""), ("_0000", ".bin"), ("syn", ".bin"), ("missing", "")]
+GLOBS = ["synthetic_00*.bin", "*_123???.bin", "*.bin"]
+
+
+def scan_search(manager: AssetManager, term: str, suffix: str = ""):
+    names = []
+    for key in manager.assets.values():
+        if term.lower() in key.name.lower() and key.name.endswith(suffix):
+            names.append(key.name)
+    names.sort()
+    return names
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = ArgumentParser(description="Indexed name search benchmark")
+    parser.add_argument("--count", type=int, default=200000, help="assets in the synthetic pack")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "synthetic.pack2"
+        make_pack2(path, args.count, 16, seed=random.randrange(1 << 16))
+        cache = Path(tmp) / "cache"
+
+        manager = AssetManager([path], index_cache=cache)
+        _, build = timed(lambda: manager.name_index)
+        manager = AssetManager([path], index_cache=cache)
+        _, load = timed(lambda: manager.name_index)
+        print(f"build {build:9.1f} ms  load from cache {load:9.1f} ms  {len(manager)} assets")
+
+        for term, suffix in QUERIES:
+            expected, scan = timed(scan_search, manager, term, suffix)
+            result, indexed = timed(manager.search, term, suffix)
+            assert result == expected
+            print(f"search {term!r:20} {suffix!r:8} scan {scan:8.2f} ms  index {indexed:8.3f} ms  {len(result)} hits")
+        for pattern in GLOBS:
+            result, indexed = timed(manager.glob, pattern)
+            print(f"glob   {pattern!r:29} index {indexed:8.3f} ms  {len(result)} hits")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Compares reading every asset of a pack through per-call file opens with the mmap read path.
+
+    python pack_read.py --count 2000 --size 16384
+"""
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+from synthetic import make_pack2
+from DbgPack import Pack2
+
+
+def read_all(pack: Pack2) -> int:
+    total = 0
+    # Bypass the data cache, or every run after the first, and the other read path, would time cache hits
+    for asset in pack.raw_assets.values():
+        total += len(asset.get_data(cache=False))
+    return total
+
+
+def main():
+    parser = ArgumentParser(description="Pack2 per-call open vs mmap read benchmark")
+    parser.add_argument("--count", type=int, default=2000, help="number of assets in the synthetic pack")
+    parser.add_argument("--size", type=int, default=16384, help="unzipped size of each asset")
+    parser.add_argument("--ratio", type=float, default=0.5, help="approximate compressed/unzipped ratio")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for zipped in (False, True):
+            path = Path(tmp) / ("zipped.pack2" if zipped else "stored.pack2")
+            make_pack2(path, args.count, args.size, args.ratio, zipped=zipped)
+            for use_mmap in (False, True):
+                pack = Pack2(path, use_mmap=use_mmap)
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    read_bytes = read_all(pack)
+                    best = min(best, time.perf_counter() - start)
+                pack.close()
+                print(f"{path.stem:7} {'mmap' if use_mmap else 'open':5} {best * 1000:9.1f} ms"
+                      f"  {read_bytes / best / 2 ** 20:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compares extracting every shipped LOD of a continent's tiles with decoding only LOD0 and downsampling it,
+in time and peak memory, on a synthetic pack of DDS tiles.
+
+    python pyramid_extract.py --size 256
+"""
+import io
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from argparse import ArgumentParser
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lib"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+import numpy as np
+from PIL import Image
+
+from DbgPack import AssetManager, Pack2Writer
+from DbgPack.hash import crc64
+from DbgPack.pack2 import _zip
+from extract_tiles import TILE_FORMAT, extract_pyramid, extract_tiles, find_tiles
+from tile_archive import TileDirectory
+
+
+def make_tile_pack(path: Path, size: int, seed: int = 0):
+    """
+    Writes a pack with all four LODs of a synthetic continent, each tile a noisy gradient saved as DXT1 DDS
+    like the game's tiles.
+    """
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 160, size, dtype=np.float32)
+    with Pack2Writer(path) as writer:
+        for lod in range(4):
+            step = 4 << lod
+            for x in range(-64, 64, step):
+                for z in range(-64, 64, step):
+                    pixels = gradient[:, None, None] + rng.integers(0, 96, (size, size, 3))
+                    output = io.BytesIO()
+                    Image.fromarray(pixels.astype(np.uint8)).save(output, format="DDS", pixel_format="DXT1")
+                    data = output.getvalue()
+                    writer.add(crc64(TILE_FORMAT.format("Synthetic", x, z, lod)), [_zip(data, 1)], 0x01,
+                               zlib.crc32(data))
+
+
+def run(mode: str, pack: Path, output: Path, workers: int):
+    manager = AssetManager([pack])
+    start = time.perf_counter()
+    if mode == "full":
+        written = extract_tiles(manager, find_tiles(manager, "Synthetic", range(4)), TileDirectory(output), workers)
+    else:
+        written = extract_pyramid(manager, "Synthetic", TileDirectory(output), range(2, 6), workers)
+    seconds = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({"mode": mode, "tiles": written, "seconds": round(seconds, 3),
+                      "peak_rss_mb": round(rss / 1024, 1), "peak_worker_rss_mb": round(children / 1024, 1)}))
+
+
+def main():
+    parser = ArgumentParser(description="Full LOD decoding vs LOD0 downsampling benchmark")
+    parser.add_argument("--size", type=int, default=256, help="tile width and height in pixels")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--mode", choices=["full", "pyramid"], help="run one mode on --pack in this process")
+    parser.add_argument("--pack", type=Path)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args.mode, args.pack, args.output, args.workers)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pack = Path(tmp) / "Synthetic_x64_0.pack2"
+        make_tile_pack(pack, args.size)
+        # Each mode runs in a fresh process so peak memory is measured separately
+        for mode in ("full", "pyramid"):
+            subprocess.run([sys.executable, __file__, "--mode", mode, "--pack", str(pack),
+                            "--output", str(Path(tmp) / mode), "--workers", str(args.workers),
+                            "--size", str(args.size)], check=True)
+        # Zoom 5 is decoded from LOD0 in both modes and should match pixel for pixel
+        finest = sorted((Path(tmp) / "full" / "5").iterdir())
+        identical = all(np.array_equal(np.asarray(Image.open(path)),
+                                       np.asarray(Image.open(Path(tmp) / "pyramid" / "5" / path.name)))
+                        for path in finest)
+        print(json.dumps({"zoom_5_tiles": len(finest), "identical": identical}))
+
+
+if __name__ == "__main__":
+    main()
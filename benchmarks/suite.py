@@ -0,0 +1,149 @@
+"""
+Times the main DbgPack operations on synthetic pack1 and pack2 files and writes the results as JSON,
+so runs on different commits can be compared.
+
+    python suite.py --count 5000 --size 4096 --output results.json
+    python suite.py --count 5000 --size 4096 --compare results.json
+"""
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Callable, Dict
+
+from synthetic import make_pack1, make_pack2
+from DbgPack import AssetManager, Pack1, Pack2, data_cache
+
+
+def best_of(repeat: int, function: Callable, setup: Callable = lambda: None) -> float:
+    """
+    :return: the fastest of `repeat` runs of function in seconds, setup is run untimed before each
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def result(seconds: float, operations: int = 1, nbytes: int = 0) -> Dict[str, float]:
+    entry = {"seconds": round(seconds, 6), "ops_per_second": round(operations / seconds, 1) if seconds else None}
+    if nbytes:
+        entry["mb_per_second"] = round(nbytes / (1 << 20) / seconds, 1) if seconds else None
+    return entry
+
+
+def run_format(kind: str, path: Path, names, args, tmp: Path) -> Dict[str, dict]:
+    results = {}
+    open_pack = (lambda: Pack1(path)) if kind == "pack1" else (lambda: Pack2(path))
+    results["open"] = result(best_of(args.repeat, open_pack))
+
+    pack = open_pack()
+    if isinstance(pack, Pack2):
+        def resolve():
+            pack.namelist = names
+        results["namelist"] = result(best_of(args.repeat, resolve), len(names))
+
+    manager = AssetManager([path])
+    sample = random.Random(args.seed).choices(names, k=args.lookups)
+
+    def random_reads():
+        for name in sample:
+            manager.get_raw(name).get_data(cache=False)
+    results["random_get_raw"] = result(best_of(args.repeat, random_reads), len(sample), len(sample) * args.size)
+
+    outdir = tmp / f"{kind}_extract"
+    outdir.mkdir()
+
+    def extract():
+        for name in names:
+            manager.save_raw_as(name, str(outdir / name))
+    results["extract"] = result(best_of(args.repeat, extract, data_cache.clear), len(names), len(names) * args.size)
+
+    assets = list(manager.assets.values())
+    for raw in (False, True):
+        if raw and kind == "pack1":
+            continue  # pack1 assets are never zipped, so a raw export is the same copy
+        seconds = best_of(args.repeat, lambda: Pack2.export(assets, "export.pack2", tmp / "export", raw=raw))
+        results["export_raw" if raw else "export"] = result(seconds, len(assets), len(assets) * args.size)
+
+    manager.close()
+    pack.close()
+    return results
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(current: dict, previous: dict):
+    """
+    Prints the speed of every benchmark relative to a previous run, above 1.0 meaning faster now.
+    """
+    if current["parameters"] != previous.get("parameters"):
+        print("warning: runs used different parameters", file=sys.stderr)
+    for kind, benchmarks in current["results"].items():
+        for benchmark, entry in benchmarks.items():
+            before = previous.get("results", {}).get(kind, {}).get(benchmark)
+            if before and entry["seconds"]:
+                print(f"{kind:13} {benchmark:15} {before['seconds'] * 1000:10.2f} ms -> {entry['seconds'] * 1000:10.2f} ms"
+                      f"  x{before['seconds'] / entry['seconds']:5.2f}", file=sys.stderr)
+
+
+def main():
+    parser = ArgumentParser(description="DbgPack benchmark suite on synthetic packs")
+    parser.add_argument("--count", type=int, default=5000, help="assets per pack")
+    parser.add_argument("--size", type=int, default=4096, help="unzipped size of each asset")
+    parser.add_argument("--ratio", type=float, default=0.5, help="approximate compressed/unzipped ratio")
+    parser.add_argument("--lookups", type=int, default=2000, help="random get_raw reads per run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--formats", nargs="+", default=["pack1", "pack2", "pack2_stored"],
+                        choices=["pack1", "pack2", "pack2_stored"])
+    parser.add_argument("--output", type=Path, help="write the results here instead of stdout")
+    parser.add_argument("--compare", type=Path, help="previous results to compare against")
+    args = parser.parse_args()
+
+    report = {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {key: getattr(args, key) for key in ("count", "size", "ratio", "lookups", "repeat", "seed")},
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for kind in args.formats:
+            if kind == "pack1":
+                path = tmp / "synthetic.pack"
+                names = make_pack1(path, args.count, args.size, args.ratio, args.seed)
+            else:
+                path = tmp / f"{kind}.pack2"
+                names = make_pack2(path, args.count, args.size, args.ratio, zipped=kind == "pack2", seed=args.seed)
+            kind_tmp = tmp / kind
+            kind_tmp.mkdir()
+            report["results"][kind] = run_format(kind, path, names, args, kind_tmp)
+            print(f"{kind}: done", file=sys.stderr)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
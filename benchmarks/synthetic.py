@@ -0,0 +1,113 @@
+"""
+Builds synthetic pack files so DbgPack can be measured without a PlanetSide install.
+"""
+import random
+import sys
+import zlib
+from pathlib import Path
+from typing import Collection, Dict, List, Tuple, Union
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lib"))
+from DbgPack import Asset2, Pack2, Pack2Writer
+from DbgPack.hash import crc64
+from DbgPack.pack2 import _zip
+
+NAME_FORMAT = "{}_{:06d}.bin"
+
+
+def make_data(rng: random.Random, size: int, ratio: float) -> bytes:
+    """
+    Random bytes padded with zeros, so zlib squeezes the asset to roughly `ratio` of its size.
+    """
+    noise = int(size * ratio)
+    return rng.randbytes(noise) + bytes(size - noise)
+
+
+def _stage(staging, data: bytes, zipped: bool):
+    offset = staging.tell()
+    if zipped:
+        staging.write(Asset2.ZIP_MAGIC)
+        staging.write(len(data).to_bytes(4, "big"))
+        staging.write(zlib.compress(data))
+    else:
+        staging.write(data)
+    return offset, staging.tell() - offset
+
+
+def make_pack2(path: Path, count: int, size: int, ratio: float = 0.5, zipped: bool = True, seed: int = 0,
+               prefix: str = "Synthetic") -> List[str]:
+    """
+    Writes a pack2 of `count` assets of `size` bytes with an internal namelist, using Pack2.export.
+    :return: names of the generated assets
+    """
+    rng = random.Random(seed)
+    names = [NAME_FORMAT.format(prefix, i) for i in range(count)]
+    staging_path = path.with_suffix(".staging")
+    staged = []
+    with staging_path.open("wb") as staging:
+        for name in names:
+            data = make_data(rng, size, ratio)
+            staged.append((crc64(name), len(data), zlib.crc32(data)) + _stage(staging, data, zipped))
+        namelist = "\n".join(names + ["{NAMELIST}"]).encode("utf-8")
+        staged.append((crc64(b"{NAMELIST}"), len(namelist), zlib.crc32(namelist)) + _stage(staging, namelist, True))
+
+    assets = [Asset2(name_hash=name_hash, path=staging_path, offset=offset, data_length=length,
+                     unzipped_length=unzipped_length, hash=crc)
+              for name_hash, unzipped_length, crc, offset, length in staged]
+    Pack2.export(assets, path.name, path.parent, raw=True)
+    staging_path.unlink()
+    return names
+
+
+def pack2_entry(data: bytes, zipped: bool = False, level: int = 6) -> Tuple[bytes, int, int]:
+    """
+    :return: stored bytes, flag and crc32 of an asset, as Pack2Writer.add takes them. Empty data is never zipped.
+    """
+    if zipped and data:
+        return _zip(data, level), 0x01, zlib.crc32(data)
+    return data, 0x10, zlib.crc32(data)
+
+
+def write_pack2(path: Path, entries: Dict[str, Union[bytes, Tuple[bytes, int, int]]],
+                zipped: Union[bool, Collection[str]] = False, level: int = 6):
+    """
+    Writes a pack2 of the given assets, in order and without a namelist.
+    :param entries: data by asset name, or stored bytes, flag and crc32 written as they are, so tests can also write
+                    entries that do not match their flag or crc32
+    :param zipped: whether to zip the data, or the names of the assets to zip
+    """
+    with Pack2Writer(path) as writer:
+        for name, entry in entries.items():
+            if isinstance(entry, bytes):
+                entry = pack2_entry(entry, zipped if isinstance(zipped, bool) else name in zipped, level)
+            stored, flag, crc = entry
+            writer.add(crc64(name), [stored], flag, crc)
+
+
+def make_pack1(path: Path, count: int, size: int, ratio: float = 0.5, seed: int = 0, prefix: str = "Synthetic",
+               chunk_assets: int = 256) -> List[str]:
+    """
+    Writes a pack1 of `count` uncompressed assets of `size` bytes. Like the game's packs, the assets are split into
+    chunks of `chunk_assets`, each a big-endian table followed by its data and linked to the next by offset.
+    :return: names of the generated assets
+    """
+    rng = random.Random(seed)
+    names = [NAME_FORMAT.format(prefix, i) for i in range(count)]
+    with path.open("wb") as file:
+        for start in range(0, count, chunk_assets):
+            chunk_names = names[start:start + chunk_assets]
+            encoded = [name.encode("utf-8") for name in chunk_names]
+            data = [make_data(rng, size, ratio) for _ in chunk_names]
+
+            table_length = 8 + sum(12 + 4 + len(name) for name in encoded)
+            offset = file.tell() + table_length
+            next_chunk = offset + sum(len(d) for d in data) if start + chunk_assets < count else 0
+
+            file.write(next_chunk.to_bytes(4, "big"))
+            file.write(len(chunk_names).to_bytes(4, "big"))
+            for name, d in zip(encoded, data):
+                file.write(len(name).to_bytes(4, "big") + name)
+                file.write(offset.to_bytes(4, "big") + len(d).to_bytes(4, "big") + zlib.crc32(d).to_bytes(4, "big"))
+                offset += len(d)
+            file.writelines(data)
+    return names
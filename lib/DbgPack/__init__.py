@@ -2,9 +2,15 @@ from .asset1 import Asset1
 from .asset2 import Asset2
 from .loose_asset import LooseAsset
 from .asset_manager import AssetManager
+from .async_manager import AsyncAssetManager
 from .pack1 import Pack1
-from .pack2 import Pack2
+from .pack2 import Pack2, Pack2Writer
+from .pack2_editor import Pack2Editor
+from .index_cache import PackIndexCache
+from .name_index import NameIndex
 from .loose_pack import LoosePack
 from .struct_reader import BinaryStructReader
+from .data_cache import DataCache, data_cache
 
-__all__ = ['Asset1', 'Asset2', 'LooseAsset', 'Pack1', 'Pack2', 'LoosePack', 'AssetManager']
+__all__ = ['Asset1', 'Asset2', 'LooseAsset', 'Pack1', 'Pack2', 'Pack2Writer', 'Pack2Editor', 'LoosePack', 'AssetManager',
+           'AsyncAssetManager', 'PackIndexCache', 'NameIndex', 'DataCache', 'data_cache']
@@ -1,7 +1,12 @@
 import hashlib
 from abc import ABC, abstractmethod
+from contextlib import closing
+from mmap import mmap, ACCESS_READ
+from io import BufferedReader
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterator, Optional, Union
+
+from .stream import CHUNK_SIZE, PEEK_SIZE, open_chunks
 
 
 class AbstractAsset(ABC):
@@ -14,15 +19,44 @@ class AbstractAsset(ABC):
     _md5: str
 
     @abstractmethod
-    def get_data(self, raw=False) -> bytes:
+    def get_data(self, raw=False, cache=True) -> Union[bytes, memoryview]:
+        """
+        :return: the asset data. Stored data of a mapped pack is a zero-copy memoryview of the mapping,
+                 copy it with bytes() to keep it past the pack's close()
+        """
         pass
 
+    def iter_chunks(self, raw=False, chunk_size=CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Yields the asset data in pieces of at most chunk_size bytes, so it can be copied in bounded memory.
+        """
+        yield self.get_data(raw, cache=False)
+
+    def peek(self, length: int) -> bytes:
+        """
+        :return: the first length bytes of the data, reading and decompressing as little as possible
+        """
+        data = b''
+        with closing(self.iter_chunks(chunk_size=max(length, PEEK_SIZE))) as chunks:
+            for chunk in chunks:
+                data += bytes(chunk[:length - len(data)])
+                if len(data) >= length:
+                    break
+        return data
+
+    def open(self, raw=False) -> BufferedReader:
+        """
+        :return: a read-only file object streaming the asset data
+        """
+        return open_chunks(self.iter_chunks(raw))
+
     @property
     @abstractmethod
     def md5(self) -> str:
         if self._md5 is None:
             hash_md5 = hashlib.md5()
-            hash_md5.update(self.get_data())
+            for chunk in self.iter_chunks():
+                hash_md5.update(chunk)
             self._md5 = hash_md5.hexdigest()
 
         return self._md5
@@ -40,11 +74,41 @@ class AbstractPack(ABC):
     asset_count: int
     assets: Dict[str, AbstractAsset]
 
+    _mmap: Optional[mmap] = None
+    _view: Optional[memoryview] = None
+
     @abstractmethod
     def __init__(self, path: Path):
         self.path = path
         self.name = self.path.stem
 
+    def _map(self) -> memoryview:
+        """
+        Maps the whole pack file read-only so assets can be sliced out of it without reopening the file.
+        """
+        with self.path.open('rb') as file:
+            self._mmap = mmap(file.fileno(), 0, access=ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        return self._view
+
+    def close(self):
+        """
+        Releases the pack mapping, if there is one. Assets go back to reading from the file afterwards.
+        """
+        if self._mmap is None:
+            return
+
+        for asset in self:
+            asset._view = None
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Callers still hold slices of the mapping, it is unmapped once they are collected
+            pass
+        self._mmap = None
+        self._view = None
+
     @abstractmethod
     def __repr__(self):
         return f'{self.__class__.__name__}("{self.path}")'
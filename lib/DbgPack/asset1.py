@@ -1,7 +1,9 @@
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Iterator, Union
 
 from .abc import AbstractAsset
+from .stream import CHUNK_SIZE
 from .struct_reader import BinaryStructReader
 
 
@@ -10,25 +12,47 @@ class Asset1(AbstractAsset):
     name: str = field(default=None)
     path: Path = field(default=None)
 
+    name_hash: int = field(default=None)
     offset: int = field(default=0)
     data_length: int = field(default=0)
     hash: int = field(default=0)
 
     _md5: str = field(default=None)
+    _view: memoryview = field(default=None, repr=False, compare=False)  # Mapped pack, set by Pack1(use_mmap=True)
 
     def __post_init__(self):
         assert self.name, 'name is required'
         assert self.path, 'path is required'
 
-    def get_data(self, raw=False) -> bytes:
-        # No raw data, so just ignore it
+    def get_data(self, raw=False, cache=True) -> Union[bytes, memoryview]:
+        # No raw data, so just ignore it. Nothing is decompressed either, so there is nothing to cache
         if self.data_length == 0:
             return bytes()
 
+        if self._view is not None:
+            return self._view[self.offset:self.offset + self.data_length]
+
         with BinaryStructReader(self.path) as reader:
             reader.seek(self.offset)
             return reader.read(self.data_length)
 
+    def iter_chunks(self, raw=False, chunk_size=CHUNK_SIZE) -> Iterator[bytes]:
+        end = self.offset + self.data_length
+        if self._view is not None:
+            for position in range(self.offset, end, chunk_size):
+                yield self._view[position:min(position + chunk_size, end)]
+            return
+
+        with BinaryStructReader(self.path) as reader:
+            reader.seek(self.offset)
+            remaining = self.data_length
+            while remaining > 0:
+                data = reader.read(min(chunk_size, remaining))
+                if not data:
+                    return
+                remaining -= len(data)
+                yield data
+
     @property
     def md5(self) -> str:
         return super().md5
@@ -1,8 +1,11 @@
 from dataclasses import dataclass, field
 from pathlib import Path
-from zlib import decompress
+from typing import Iterator, Union
+from zlib import decompress, decompressobj
 
 from .abc import AbstractAsset
+from .data_cache import data_cache
+from .stream import CHUNK_SIZE
 from .struct_reader import BinaryStructReader
 
 
@@ -15,24 +18,51 @@ class Asset2(AbstractAsset):
     offset: int = field(default=0)
     data_length: int = field(default=0)  # data_length should refer to stored data size
     unzipped_length: int = field(default=0)  # unzipped_length should refer to the real size
-    is_zipped: bool = field(default=False)
+    is_zipped: bool = field(default=None)  # Probed from the data header when not given
     hash: int = field(default=0)
 
     _md5: str = field(default=None)
+    _view: memoryview = field(default=None, repr=False, compare=False)  # Mapped pack, set by Pack2(use_mmap=True)
 
     ZIP_MAGIC = b'\xa1\xb2\xc3\xd4'
+    ZIP_HEADER_LENGTH = 8  # ZIP_MAGIC followed by the uint32BE unzipped length
 
     def __post_init__(self):
         assert self.name_hash, 'name_hash is required'
         assert self.path, 'path is required'
+        if self.is_zipped is not None:
+            return
+
+        if self._view is not None:
+            self.is_zipped = self._view[self.offset:self.offset + len(self.ZIP_MAGIC)] == self.ZIP_MAGIC
+            return
+
         with BinaryStructReader(self.path) as reader:
             reader.seek(self.offset)
             self.is_zipped = reader.peek(len(self.ZIP_MAGIC))[:4] == self.ZIP_MAGIC
 
-    def get_data(self, raw=False) -> bytes:
+    def get_data(self, raw=False, cache=True) -> Union[bytes, memoryview]:
+        """
+        :param raw: return the stored data without decompressing it
+        :param cache: look up and keep decompressed data in the shared data_cache
+        """
         if self.data_length == 0:
             return bytes()
 
+        if raw or not cache or not self.is_zipped:
+            return self._read_data(raw)
+
+        key = (self.path, self.offset, self.data_length)
+        data = data_cache.get(key)
+        if data is None:
+            data = self._read_data()
+            data_cache.put(key, data)
+        return data
+
+    def _read_data(self, raw=False):
+        if self._view is not None:
+            return self._get_mapped_data(raw)
+
         with BinaryStructReader(self.path) as reader:
             reader.seek(self.offset)
             if raw:
@@ -50,6 +80,75 @@ class Asset2(AbstractAsset):
             else:  # Not zipped
                 return reader.read(self.data_length)
 
+    def _get_mapped_data(self, raw=False):
+        """
+        Reads the asset out of the mapped pack. Stored data is returned as a zero-copy memoryview,
+        zipped data is decompressed directly from the mapping.
+        """
+        stored = self._view[self.offset:self.offset + self.data_length]
+        if raw or not self.is_zipped:
+            return stored
+
+        assert stored[:len(self.ZIP_MAGIC)] == self.ZIP_MAGIC, 'invalid zip magic'
+        return decompress(stored[self.ZIP_HEADER_LENGTH:])
+
+    def iter_chunks(self, raw=False, chunk_size=CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Streams the asset, decompressing zipped data incrementally. Peak memory is about two chunks
+        instead of the whole stored plus unzipped data.
+        """
+        if self.data_length == 0:
+            return
+
+        if raw or not self.is_zipped:
+            yield from self._iter_stored(chunk_size)
+            return
+
+        header = b''
+        decompressor = decompressobj()
+        for chunk in self._iter_stored(chunk_size):
+            if len(header) < self.ZIP_HEADER_LENGTH:
+                needed = self.ZIP_HEADER_LENGTH - len(header)
+                header += bytes(chunk[:needed])
+                chunk = chunk[needed:]
+                if len(header) < self.ZIP_HEADER_LENGTH:
+                    continue
+                assert header[:len(self.ZIP_MAGIC)] == self.ZIP_MAGIC, 'invalid zip magic'
+
+            while True:
+                data = decompressor.decompress(chunk, chunk_size)
+                if data:
+                    yield data
+                chunk = decompressor.unconsumed_tail
+                # A full chunk of output may leave more buffered in zlib even with no input left
+                if not chunk and len(data) < chunk_size:
+                    break
+            if decompressor.eof:
+                break
+        data = decompressor.flush()
+        if data:
+            yield data
+
+    def _iter_stored(self, chunk_size: int) -> Iterator[bytes]:
+        """
+        Yields the stored data chunk_size bytes at a time.
+        """
+        end = self.offset + self.data_length
+        position = self.offset
+        if self._view is not None:
+            for position in range(position, end, chunk_size):
+                yield self._view[position:min(position + chunk_size, end)]
+            return
+
+        with BinaryStructReader(self.path) as reader:
+            reader.seek(position)
+            while position < end:
+                data = reader.read(min(chunk_size, end - position))
+                if not data:
+                    return
+                position += len(data)
+                yield data
+
     @property
     def md5(self) -> str:
         return super().md5
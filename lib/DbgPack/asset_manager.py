@@ -1,113 +1,309 @@
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from sys import path
-from DbgPack.asset2 import Asset2
+from time import monotonic
 from DbgPack.hash import crc64
-from collections import ChainMap
 from dataclasses import dataclass, field
 from pathlib import Path, PosixPath
-from typing import List, ChainMap as ChainMapType, Callable, Optional
+from typing import Dict, List, Callable, Optional, Tuple, TYPE_CHECKING
 
 from .abc import AbstractPack, AbstractAsset
+from .index_cache import PackIndexCache
 from .loose_pack import LoosePack
+from .name_index import NameIndex, fingerprint
 from .pack1 import Pack1
-from .pack2 import Pack2
+from .pack2 import Pack2, PackIndex
+
+if TYPE_CHECKING:
+    from .verify import VerifyReport
+
+
+def _read_pack2_index(path: Path, index_cache: Optional[PackIndexCache]) -> Tuple[PackIndex, bool]:
+    """
+    Process pool worker for AssetManager: parses a pack2 index, or loads it from the cache.
+    :return: the index and whether it came from the cache
+    """
+    index = index_cache.load(path) if index_cache is not None else None
+    if index is not None:
+        return index, True
+    return Pack2.read_index(path), False
 
 
 @dataclass
 class AssetManager:
     packs: List[AbstractPack]
-    assets: ChainMapType[str, AbstractAsset] = field(repr=False)
+    assets: Dict[str, AbstractAsset] = field(repr=False)
+    raw_assets: Dict[int, AbstractAsset] = field(repr=False)
 
     @staticmethod
-    def load_pack(path: Path, namelist: List[str] = None):
+    def load_pack(path: Path, namelist: List[str] = None, use_mmap: bool = False,
+                  index_cache: Optional[PackIndexCache] = None):
         if path.is_file():
             if path.suffix == '.pack':
-                return Pack1(path)
+                return Pack1(path, use_mmap=use_mmap)
             elif path.suffix == '.pack2':
-                return Pack2(path, namelist=namelist)
+                return Pack2(path, namelist=namelist, use_mmap=use_mmap, index_cache=index_cache)
         else:
             return LoosePack(path)
 
     def export_pack2(self, name: str, outdir: Path, raw=False):
         Pack2.export(list(self.assets.values()), name, outdir, raw)
 
-    def __init__(self, paths: List[Path], namelist: List[str] = None, callback: Callable = lambda x, y, z: True):
-        self.packs = [AssetManager.load_pack(path, namelist=namelist) for i, path in enumerate(paths) if callback(i, len(paths), path)]
-        self.assets = ChainMap(*[p.assets for p in self.packs])
+    def __init__(self, paths: List[Path], namelist: List[str] = None, callback: Callable = lambda x, y, z: True,
+                 use_mmap: bool = False, index_cache: Optional[Path] = None, workers: int = 1,
+                 processes: bool = False, watch_interval: Optional[float] = None):
+        """
+        :param paths: pack files and loose asset directories, earlier paths take precedence
+        :param namelist: extra names to resolve asset hashes with
+        :param callback: called as callback(i, total, path) before loading each path, returning False skips it
+        :param use_mmap: map pack files once and read assets out of the mappings
+        :param index_cache: directory of sidecar pack indexes, so unchanged packs load without being parsed again
+        :param workers: number of threads loading packs. With more than one, callback is called as each pack
+                        finishes loading and returning False drops that pack
+        :param processes: parse pack2 indexes on a process pool instead of threads, sidestepping the GIL.
+                          Assets are still built in this process from the parsed indexes
+        :param watch_interval: seconds after which a lookup first refreshes loose directories, None to only refresh
+                               on explicit calls to refresh()
+        """
+        self.watch_interval = watch_interval
+        self._last_refresh = monotonic()
+        self.index_cache = PackIndexCache(index_cache) if index_cache is not None else None
+        if workers > 1:
+            self.packs = self._load_packs_parallel(paths, namelist, callback, use_mmap, workers, processes)
+        else:
+            self.packs = [AssetManager.load_pack(path, namelist=namelist, use_mmap=use_mmap, index_cache=self.index_cache)
+                          for i, path in enumerate(paths) if callback(i, len(paths), path)]
+        self._build_index()
+
+    def _load_packs_parallel(self, paths: List[Path], namelist: List[str], callback: Callable, use_mmap: bool,
+                             workers: int, processes: bool) -> List[AbstractPack]:
+        """
+        Loads packs on a thread pool, where pack reads and zlib release the GIL, or parses pack2 indexes on a process
+        pool. The result keeps the order of paths, so precedence is the same as a sequential load.
+        """
+        loaded = {}
+        executor_type = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        with executor_type(max_workers=workers) as executor:
+            if processes:
+                futures = {executor.submit(_read_pack2_index, path, self.index_cache): i
+                           for i, path in enumerate(paths) if path.is_file() and path.suffix == '.pack2'}
+            else:
+                futures = {executor.submit(AssetManager.load_pack, path, namelist=namelist, use_mmap=use_mmap,
+                                           index_cache=self.index_cache): i
+                           for i, path in enumerate(paths)}
+
+            done = 0
+            for future in as_completed(futures):
+                i = futures[future]
+                if processes:
+                    index, cached = future.result()
+                    pack = Pack2(paths[i], namelist=namelist, use_mmap=use_mmap, index=index,
+                                 index_cache=None if cached else self.index_cache)
+                else:
+                    pack = future.result()
+                if callback(done, len(paths), paths[i]):
+                    loaded[i] = pack
+                done += 1
+
+        # Pack1 files and loose directories are not sent to the process pool
+        submitted = set(futures.values())
+        for i, path in enumerate(paths):
+            if i in submitted:
+                continue
+            if callback(done, len(paths), path):
+                loaded[i] = AssetManager.load_pack(path, namelist=namelist, use_mmap=use_mmap)
+            done += 1
+        return [loaded[i] for i in sorted(loaded)]
+
+    def refresh(self) -> List[str]:
+        """
+        Picks up changes to loose directories and rebuilds the merged index if there were any. Packs are not re-read.
+        :return: names of the added, removed and modified loose assets
+        """
+        changed = []
+        for pack in self.packs:
+            if isinstance(pack, LoosePack):
+                changed.extend(pack.refresh())
+        if changed:
+            self._build_index()
+        self._last_refresh = monotonic()
+        return changed
+
+    def _watch(self):
+        if self.watch_interval is not None and monotonic() - self._last_refresh >= self.watch_interval:
+            self.refresh()
+
+    def _build_index(self):
+        """
+        Merges the name and hash tables of every pack once. When an asset is in several packs,
+        the one from the earliest pack wins.
+        """
+        self.assets = {}
+        self.raw_assets = {}
+        self._name_index = None
+        for pack in reversed(self.packs):
+            self.assets.update(pack.assets)
+            self.raw_assets.update(pack.raw_assets)
+
+    def verify(self, workers: Optional[int] = None,
+               callback: Callable = lambda i, total, path: None) -> 'VerifyReport':
+        """
+        Checks every entry of every pack2 against its recorded crc32. Pack1 files and loose directories carry no
+        checksums and are skipped.
+        :param workers: number of processes, shared by all packs, defaults to the number of CPUs
+        :param callback: called as callback(i, total, path) before verifying each pack
+        """
+        from .verify import VerifyReport
+        report = VerifyReport()
+        packs = [pack for pack in self.packs if isinstance(pack, Pack2)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for i, pack in enumerate(packs):
+                callback(i, len(packs), pack.path)
+                report.merge(pack.verify(workers, executor=executor))
+        return report
+
+    def close(self):
+        for pack in self.packs:
+            pack.close()
 
     def __len__(self):
+        self._watch()
         return len(self.assets)
 
     def __getitem__(self, item):
-        return self.assets[item]
+        self._watch()
+        if isinstance(item, str):
+            try:
+                return self.assets[item]
+            except KeyError:
+                return self.raw_assets[crc64(item)]
+
+        elif isinstance(item, int):
+            return self.raw_assets[item]
+        else:
+            raise KeyError
 
     def __contains__(self, item):
-        return item in self.assets
+        # Goes through __getitem__, which refreshes loose directories when due
+        try:
+            return self[item] is not None
+        except KeyError:
+            return False
 
     def __iter__(self):
+        self._watch()
         return iter(self.assets.values())
     
+    @property
+    def name_index(self) -> NameIndex:
+        """
+        Search index over the names of every asset, built on first use and again after the merged index changes.
+        With an index cache it is saved next to the pack indexes and reused while the names are the same.
+        """
+        if self._name_index is None:
+            names = [asset.name for asset in self.assets.values()]
+            digest = fingerprint(names)
+            paths = [pack.path for pack in self.packs]
+            if self.index_cache is not None:
+                self._name_index = self.index_cache.load_names(paths, digest)
+            if self._name_index is None:
+                self._name_index = NameIndex(names, digest)
+                if self.index_cache is not None:
+                    self.index_cache.store_names(paths, self._name_index)
+        return self._name_index
+
     def search(self, term: str, suffix: str = ""):
-        names = []
-        for key in self.assets.values():
-            if term.lower() in key.name.lower() and key.name.endswith(suffix):
-                names.append(key.name)
-        names.sort()
-        return names
-    
-    def get_raw(self, name: str) -> Optional[Asset2]:
-        name_hash = crc64(name.encode("ascii"))
-        for pack in self.packs:
-            assert type(pack) == Pack2
-            if name_hash in pack.raw_assets:
-                return pack.raw_assets[name_hash]
-        return None
+        self._watch()
+        return self.name_index.search(term, suffix)
+
+    def glob(self, pattern: str) -> List[str]:
+        """
+        :return: sorted names matching a shell-style pattern, ignoring case
+        """
+        self._watch()
+        return self.name_index.glob(pattern)
+
+    def get_raw(self, name: str) -> Optional[AbstractAsset]:
+        self._watch()
+        return self.raw_assets.get(crc64(name.encode("ascii")))
     
     def save_raw(self, name: str, dest_dir: str="./") -> bool:
         to_save = self.get_raw(name)
         if to_save is not None:
             try:
                 with open(dest_dir + name, "wb") as f:
-                    f.write(to_save.get_data())
+                    f.writelines(to_save.iter_chunks())
             except Exception as e:
                 print(e)
                 return False
             return True
         return False
     
-    def export_all_of_magic(self, magic: bytes, callback: Callable = lambda x, y, z: None, suffix: str = None):
+    def export_all_of_magic(self, magic: bytes, callback: Callable = lambda x, y, z: None, suffix: str = None,
+                            workers: int = 4):
+        """
+        Exports every asset whose data starts with magic into a directory named after its pack.
+        Only the first block of each asset is decompressed to test it, and matches are written by a thread pool.
+        With an index cache, the magic of every asset is remembered, so later exports of any type skip the scan.
+        """
         assert len(magic) == 4
         i = 0
         total = 0
         for pack in self.packs:
             total += len(pack.raw_assets)
-        for pack in self.packs:
-            for namehash, asset in pack.raw_assets.items():
-                name = str(namehash) + "." + (suffix if suffix is not None else str(magic, encoding="utf-8").strip().lower())
-                if asset.name != '':
-                    name = asset.name
-                callback(i, total, PosixPath(name))
-                i += 1
-                data = asset.get_data()
-                if data[:4] == magic:
-                    if not os.path.exists(pack.name):
-                        os.makedirs(pack.name, exist_ok=True)
-                    if os.path.exists(pack.name + os.sep + name):
-                        continue
-                    with open(pack.name + os.sep + name, "wb") as f:
-                        f.write(data)
-                    
-    
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            writes = []
+            for pack in self.packs:
+                types = self._load_types(pack)
+                scanned = types is None
+                if scanned:
+                    types = {}
+
+                for namehash, asset in pack.raw_assets.items():
+                    name = str(namehash) + "." + (suffix if suffix is not None else str(magic, encoding="utf-8").strip().lower())
+                    if asset.name != '':
+                        name = asset.name
+                    callback(i, total, PosixPath(name))
+                    i += 1
+                    if scanned:
+                        types[namehash] = asset.peek(len(magic))
+                    if types[namehash] == magic:
+                        if not os.path.exists(pack.name):
+                            os.makedirs(pack.name, exist_ok=True)
+                        if os.path.exists(pack.name + os.sep + name):
+                            continue
+                        writes.append(executor.submit(self.write_asset, asset, pack.name + os.sep + name))
+
+                if scanned and self.index_cache is not None and pack.path.is_file():
+                    self.index_cache.store_types(pack.path, types)
+
+            for write in writes:
+                write.result()
+
+    def _load_types(self, pack: AbstractPack) -> Optional[Dict[int, bytes]]:
+        if self.index_cache is None or not pack.path.is_file():
+            return None
+        return self.index_cache.load_types(pack.path)
+
+    @staticmethod
+    def write_asset(asset: AbstractAsset, dest: str):
+        """
+        Writes the unzipped data of asset to the file dest in bounded memory
+        """
+        with open(dest, "wb") as f:
+            f.writelines(asset.iter_chunks())
+
     def save(self, key: str):
         with open(key, "wb") as f:
-            f.write(self.assets[key].get_data())
+            f.writelines(self.assets[key].iter_chunks())
 
     def save_raw_as(self, key: str, dest: str):
         to_save = self.get_raw(key)
         if to_save is not None:
             try:
                 with open(dest, "wb") as f:
-                    f.write(to_save.get_data())
+                    f.writelines(to_save.iter_chunks())
             except Exception as e:
                 print(e)
                 return False
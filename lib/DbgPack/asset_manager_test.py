@@ -0,0 +1,149 @@
+import os
+
+import pytest
+from synthetic import make_pack1, make_pack2, write_pack2
+
+from DbgPack import Asset2, AssetManager, LoosePack, Pack1, Pack2
+from DbgPack.hash import crc64
+from DbgPack.index_cache import PackIndexCache
+
+
+def make_packs(tmp_path):
+    """
+    A loose directory, a pack1 and two pack2 files, all containing Synthetic_000000.bin with different data.
+    The second pack2 also has names the others do not.
+    """
+    loose = tmp_path / 'loose'
+    loose.mkdir()
+    (loose / 'Synthetic_000000.bin').write_bytes(b'loose')
+    (loose / 'loose_only.txt').write_bytes(b'only')
+    make_pack1(tmp_path / 'first.pack', 3, 100, seed=1)
+    make_pack2(tmp_path / 'second.pack2', 3, 100, seed=2)
+    make_pack2(tmp_path / 'third.pack2', 6, 100, seed=3)
+    return [loose, tmp_path / 'first.pack', tmp_path / 'second.pack2', tmp_path / 'third.pack2']
+
+
+def test_earliest_pack_wins(tmp_path):
+    paths = make_packs(tmp_path)
+    manager = AssetManager(paths)
+    assert manager['Synthetic_000000.bin'].get_data() == b'loose'
+    assert manager.get_raw('Synthetic_000000.bin').get_data() == b'loose'
+    # Pack1 comes before both pack2 files
+    assert manager['Synthetic_000001.bin'].path == paths[1]
+    assert manager['Synthetic_000005.bin'].path == paths[3]
+
+    manager = AssetManager(list(reversed(paths)))
+    assert manager['Synthetic_000000.bin'].path == paths[3]
+    assert manager['loose_only.txt'].get_data() == b'only'
+
+
+def test_contains(tmp_path):
+    paths = make_packs(tmp_path)
+    for pack, present in [(LoosePack(paths[0]), 'loose_only.txt'), (Pack1(paths[1]), 'Synthetic_000002.bin'),
+                          (Pack2(paths[2]), 'Synthetic_000002.bin')]:
+        assert (present in pack) is True
+        assert (pack[present].name_hash in pack) is True
+        assert ('missing.bin' in pack) is False
+        assert (12345 in pack) is False
+
+    manager = AssetManager(paths)
+    assert ('loose_only.txt' in manager) is True
+    assert ('Synthetic_000005.bin' in manager) is True
+    assert ('missing.bin' in manager) is False
+
+
+def test_parallel_loading_matches_serial(tmp_path):
+    paths = make_packs(tmp_path)
+    serial = AssetManager(paths)
+
+    def locations(manager):
+        return {name_hash: (asset.path, getattr(asset, 'offset', None)) for name_hash, asset in manager.raw_assets.items()}
+
+    for processes in (False, True):
+        loaded = []
+        manager = AssetManager(paths, workers=2, processes=processes,
+                               callback=lambda i, total, path: loaded.append(path) or True)
+        assert [pack.path for pack in manager.packs] == paths
+        assert sorted(loaded) == sorted(paths)
+        assert locations(manager) == locations(serial)
+        assert manager.assets.keys() == serial.assets.keys()
+
+
+ASSETS = {'a.dds': b'DDS ' + b'a' * 5000, 'b.dds': b'DDS ' + bytes(20000), 'c.fsb': b'FSB5' + b'c' * 100,
+          'd.txt': b'hi', 'e.bin': b''}
+
+
+def test_watch_refreshes_loose_directories(tmp_path):
+    paths = make_packs(tmp_path)
+    manager = AssetManager(paths[:2], watch_interval=0)
+    count = len(manager)
+    lookups = [
+        lambda: len(manager) == count + 1,
+        lambda: 'new.txt' in manager,
+        lambda: any(asset.name == 'new.txt' for asset in manager),
+        lambda: manager.glob('new.*') == ['new.txt'],
+        lambda: 'new.txt' in manager.search('new'),
+    ]
+    for lookup in lookups:
+        (paths[0] / 'new.txt').write_bytes(b'new')
+        assert lookup()
+        (paths[0] / 'new.txt').unlink()
+        assert not lookup()
+
+    manager = AssetManager(paths[:2], watch_interval=None)
+    (paths[0] / 'new.txt').write_bytes(b'new')
+    assert 'new.txt' not in manager and len(manager) == count
+    assert manager.refresh() == ['new.txt']
+    assert manager['new.txt'].get_data() == b'new'
+
+
+def make_typed_pack(path, assets):
+    write_pack2(path, assets, zipped=list(assets)[::2])
+
+
+def test_export_all_of_magic(tmp_path, monkeypatch):
+    make_typed_pack(tmp_path / 'test.pack2', ASSETS)
+    monkeypatch.chdir(tmp_path)
+    manager = AssetManager([tmp_path / 'test.pack2'], namelist=list(ASSETS))
+    manager.export_all_of_magic(b'DDS ', workers=2)
+    exported = tmp_path / 'test'
+    assert sorted(os.listdir(exported)) == ['a.dds', 'b.dds']
+    for name in ('a.dds', 'b.dds'):
+        assert (exported / name).read_bytes() == ASSETS[name]
+
+    manager.export_all_of_magic(b'FSB5', workers=2)
+    assert sorted(os.listdir(exported)) == ['a.dds', 'b.dds', 'c.fsb']
+
+
+def test_types_sidecar(tmp_path, monkeypatch):
+    path = tmp_path / 'test.pack2'
+    make_typed_pack(path, ASSETS)
+    monkeypatch.chdir(tmp_path)
+    cache = PackIndexCache(tmp_path / 'cache')
+    manager = AssetManager([path], namelist=list(ASSETS), index_cache=tmp_path / 'cache')
+    manager.export_all_of_magic(b'DDS ')
+    types = cache.load_types(path)
+    assert types == {crc64(name): data[:4] for name, data in ASSETS.items()}
+
+    # A current sidecar is used instead of scanning the assets
+    with monkeypatch.context() as patch:
+        patch.setattr(Asset2, 'peek', lambda self, length: pytest.fail('scanned despite the type index'))
+        manager.export_all_of_magic(b'FSB5')
+    assert (tmp_path / 'test' / 'c.fsb').read_bytes() == ASSETS['c.fsb']
+
+    # Rewriting the pack makes the sidecar stale, the next export scans again and stores the new types
+    changed = dict(ASSETS, **{'c.fsb': b'DDS ' + b'now a texture', 'f.dds': b'DDS new'})
+    make_typed_pack(path, changed)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.load_types(path) is None
+    manager = AssetManager([path], namelist=list(changed), index_cache=tmp_path / 'cache')
+    manager.export_all_of_magic(b'DDS ')
+    assert (tmp_path / 'test' / 'f.dds').read_bytes() == changed['f.dds']
+    assert cache.load_types(path) == {crc64(name): data[:4] for name, data in changed.items()}
+
+    types_path = cache.index_path(path, '.types')
+    data = bytearray(types_path.read_bytes())
+    data[-1] ^= 0xff
+    types_path.write_bytes(bytes(data))
+    assert cache.load_types(path) is None
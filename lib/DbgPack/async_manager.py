@@ -0,0 +1,106 @@
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from .abc import AbstractAsset
+from .asset_manager import AssetManager
+
+
+class AsyncAssetManager:
+    """
+    Asyncio facade over an AssetManager. Lookups, reads and decompression run on a bounded executor instead of the
+    event loop, since a lookup can refresh loose directories, and concurrent requests for the same asset share a
+    single read.
+    """
+
+    def __init__(self, manager: AssetManager, workers: int = 4, executor: Optional[Executor] = None):
+        """
+        :param manager: loaded manager to read assets from
+        :param workers: size of the thread pool created when no executor is given
+        :param executor: run reads on this executor instead, it is left open by close()
+        """
+        self.manager = manager
+        self.workers = workers
+        self._executor = executor or ThreadPoolExecutor(max_workers=workers, thread_name_prefix='DbgPack')
+        self._owns_executor = executor is None
+        self._reads: Dict[Tuple[object, bool], asyncio.Future] = {}
+
+    @classmethod
+    async def load(cls, paths: List[Path], workers: int = 4, **kwargs) -> 'AsyncAssetManager':
+        """
+        Loads an AssetManager off the event loop.
+        :param kwargs: passed on to AssetManager
+        """
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='DbgPack')
+        manager = await asyncio.get_running_loop().run_in_executor(executor, lambda: AssetManager(paths, **kwargs))
+        instance = cls(manager, workers, executor)
+        instance._owns_executor = True
+        return instance
+
+    async def contains(self, item) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.manager.__contains__, item)
+
+    async def asset(self, item) -> AbstractAsset:
+        """
+        :param item: asset name or name hash, as accepted by AssetManager
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.manager.__getitem__, item)
+
+    def _read(self, name, raw: bool):
+        return self.manager[name].get_data(raw)
+
+    async def get(self, name, raw: bool = False):
+        """
+        :param name: asset name or name hash, as accepted by AssetManager
+        :param raw: return the stored data without decompressing it
+        :return: the asset data
+        """
+        key = (name, raw)
+        read = self._reads.get(key)
+        if read is None:
+            # The lookup runs with the read, it can refresh loose directories when watch_interval is set
+            read = asyncio.get_running_loop().run_in_executor(self._executor, self._read, name, raw)
+            self._reads[key] = read
+            read.add_done_callback(lambda _, key=key: self._reads.pop(key, None))
+        # One waiter being cancelled should not cancel the read for the others
+        return await asyncio.shield(read)
+
+    async def get_many(self, names: Iterable, raw: bool = False) -> list:
+        """
+        Fetches several assets concurrently, in the order of names.
+        """
+        return await asyncio.gather(*(self.get(name, raw) for name in names))
+
+    async def iter_data(self, names: Iterable, raw: bool = False,
+                        limit: Optional[int] = None) -> AsyncIterator[Tuple[object, bytes]]:
+        """
+        Yields (name, data) in the order of names while reading ahead, so at most limit reads are in flight.
+        :param limit: maximum reads in flight, defaults to twice the number of workers
+        """
+        limit = limit or 2 * self.workers
+        pending = deque()
+        try:
+            for name in names:
+                pending.append((name, asyncio.ensure_future(self.get(name, raw))))
+                if len(pending) >= limit:
+                    name, read = pending.popleft()
+                    yield name, await read
+            while pending:
+                name, read = pending.popleft()
+                yield name, await read
+        finally:
+            for _, read in pending:
+                read.cancel()
+
+    def close(self):
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+        self.manager.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+
+import pytest
+from synthetic import write_pack2
+
+from DbgPack import Asset2, AssetManager, AsyncAssetManager
+
+DATA = {f'asset_{i}.bin': bytes([i]) * (1000 + i) for i in range(20)}
+
+
+def make_manager(tmp_path):
+    path = tmp_path / 'async.pack2'
+    write_pack2(path, DATA, zipped=True)
+    return AssetManager([path], namelist=list(DATA))
+
+
+def test_get_and_iterate(tmp_path):
+    async def run():
+        async with AsyncAssetManager(make_manager(tmp_path), workers=2) as manager:
+            assert await manager.get('asset_3.bin') == DATA['asset_3.bin']
+            assert await manager.get_many(DATA) == list(DATA.values())
+            assert [(name, data) async for name, data in manager.iter_data(DATA, limit=3)] == list(DATA.items())
+
+    asyncio.run(run())
+
+
+def test_coalesces_reads(tmp_path, monkeypatch):
+    reads = []
+    get_data = Asset2.get_data
+
+    def counting_get_data(self, raw=False, cache=True):
+        reads.append(self.name)
+        return get_data(self, raw, cache)
+
+    monkeypatch.setattr(Asset2, 'get_data', counting_get_data)
+
+    async def run():
+        async with AsyncAssetManager(make_manager(tmp_path), workers=2) as manager:
+            results = await asyncio.gather(*(manager.get('asset_7.bin') for _ in range(10)))
+            assert results == [DATA['asset_7.bin']] * 10
+            await manager.get('asset_7.bin')
+
+    asyncio.run(run())
+    assert reads == ['asset_7.bin', 'asset_7.bin']
+
+
+def test_lookups_run_off_the_loop(tmp_path, monkeypatch):
+    make_manager(tmp_path)
+    loose = tmp_path / 'loose'
+    loose.mkdir()
+    manager = AssetManager([loose, tmp_path / 'async.pack2'], namelist=list(DATA), watch_interval=0)
+    threads = []
+    refresh = AssetManager.refresh
+    monkeypatch.setattr(AssetManager, 'refresh', lambda self: threads.append(threading.get_ident()) or refresh(self))
+
+    async def run():
+        async with AsyncAssetManager(manager, workers=2) as async_manager:
+            (loose / 'new.txt').write_bytes(b'new')
+            assert await async_manager.get('new.txt') == b'new'
+            assert await async_manager.contains('asset_1.bin')
+            assert not await async_manager.contains('missing.bin')
+            assert (await async_manager.asset('asset_2.bin')).name == 'asset_2.bin'
+            with pytest.raises(KeyError):
+                await async_manager.get('missing.bin')
+            return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert threads and loop_thread not in threads
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+from threading import Lock
+from typing import Hashable, Optional
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size: int = 0  # bytes currently held
+
+
+class DataCache:
+    """
+    Thread-safe LRU cache of decompressed asset data, bounded by the total number of bytes it holds.
+    Keys are (path, offset, data_length) of the stored asset.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Hashable, bytes]' = OrderedDict()
+        self._stats = CacheStats()
+        self._lock = Lock()
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return replace(self._stats)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return data
+
+    def put(self, key: Hashable, data: bytes):
+        """
+        Stores data under key, replacing what was there. Data larger than the whole budget is not kept.
+        """
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._stats.size -= len(previous)
+            if len(data) <= self.max_bytes:
+                self._entries[key] = data
+                self._stats.size += len(data)
+                self._evict()
+            self._stats.entries = len(self._entries)
+
+    def _evict(self):
+        while self._stats.size > self.max_bytes:
+            _, data = self._entries.popitem(last=False)
+            self._stats.size -= len(data)
+            self._stats.evictions += 1
+        self._stats.entries = len(self._entries)
+
+    def resize(self, max_bytes: int):
+        """
+        Changes the byte budget, evicting the least recently used data if it shrank. 0 turns the cache off.
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def invalidate(self, path: Path):
+        """
+        Drops all data read from the pack at path, e.g. after it was rewritten.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                self._stats.size -= len(self._entries.pop(key))
+            self._stats.entries = len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats = CacheStats()
+
+
+# Shared by every asset in the process
+data_cache = DataCache()
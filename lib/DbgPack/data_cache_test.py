@@ -0,0 +1,75 @@
+from pathlib import Path
+from threading import Thread
+
+from DbgPack.data_cache import DataCache
+
+
+def test_evicts_least_recently_used():
+    cache = DataCache(max_bytes=10)
+    cache.put('a', b'1234')
+    cache.put('b', b'1234')
+    assert cache.get('a') == b'1234'  # b is now the least recently used
+    cache.put('c', b'1234')
+    assert cache.get('b') is None
+    assert cache.get('a') == b'1234' and cache.get('c') == b'1234'
+    stats = cache.stats
+    assert (stats.entries, stats.size, stats.evictions) == (2, 8, 1)
+
+    cache.put('a', b'1234567')  # Replacing keeps one entry and pushes c out
+    assert cache.get('c') is None
+    assert (cache.stats.entries, cache.stats.size) == (1, 7)
+
+
+def test_oversize_data_is_not_kept():
+    cache = DataCache(max_bytes=10)
+    cache.put('a', b'small')
+    cache.put('b', b'x' * 11)
+    assert cache.get('b') is None
+    assert cache.get('a') == b'small'
+    # An oversize replacement drops the old data instead of leaving it stale
+    cache.put('a', b'x' * 11)
+    assert cache.get('a') is None
+    assert (cache.stats.entries, cache.stats.size) == (0, 0)
+
+
+def test_stats():
+    cache = DataCache()
+    for i in range(5):
+        cache.put((Path('other'), i, i + 1), bytes(i + 1))
+    assert cache.stats.entries == 5
+    assert cache.stats.size == 15
+    cache.get((Path('other'), 0, 1)), cache.get((Path('other'), 1, 2)), cache.get((Path('other'), 9, 9))
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.evictions) == (2, 1, 0)
+
+    cache.invalidate(Path('pack'))
+    cache.put((Path('pack'), 0, 4), b'data')
+    cache.invalidate(Path('pack'))
+    assert cache.stats.entries == 5
+    cache.resize(0)
+    assert (cache.stats.entries, cache.stats.size, cache.stats.evictions) == (0, 0, 5)
+
+
+def test_concurrent_use():
+    cache = DataCache(max_bytes=4096)
+
+    def work(seed):
+        for i in range(2000):
+            key = (seed * 7 + i) % 64
+            data = cache.get(key)
+            if data is None:
+                cache.put(key, bytes([key]) * 100)
+            else:
+                assert data == bytes([key]) * 100
+
+    threads = [Thread(target=work, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats
+    assert stats.hits + stats.misses == 8 * 2000
+    assert stats.size <= cache.max_bytes
+    assert stats.size == sum(len(data) for data in cache._entries.values())
+    assert stats.entries == len(cache._entries)
@@ -0,0 +1,105 @@
+"""
+Compares two sets of packs, such as the installs before and after a game update, using only their entry tables.
+
+    python -m DbgPack.diff <old assets dir> <new assets dir> [--extract <dir>]
+"""
+import json
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+from .abc import AbstractAsset
+from .asset_manager import AssetManager
+
+
+def asset_file_name(name_hash: int, asset: AbstractAsset) -> str:
+    """
+    The asset's name, or its hash in the 0x<hash>.bin form LooseAsset reads back.
+    """
+    return asset.name if asset.name else f'0x{name_hash:016x}.bin'
+
+
+@dataclass
+class PackDiff:
+    added: List[int] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+    changed: List[int] = field(default_factory=list)
+    names: Dict[int, str] = field(default_factory=dict, repr=False)
+
+    def to_json(self) -> Dict[str, List[str]]:
+        return {key: sorted(self.names.get(name_hash, f'0x{name_hash:016x}') for name_hash in getattr(self, key))
+                for key in ('added', 'removed', 'changed')}
+
+    def extract(self, manager: AssetManager, outdir: Path, workers: int = 4) -> int:
+        """
+        Writes the added and changed assets from manager, normally the new side of the diff, to outdir.
+        :return: number of assets written
+        """
+        outdir.mkdir(parents=True, exist_ok=True)
+        hashes = self.added + self.changed
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            writes = []
+            for name_hash in hashes:
+                asset = manager.raw_assets[name_hash]
+                dest = outdir / asset_file_name(name_hash, asset)
+                # Loose assets from subdirectories are named by their relative path
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                writes.append(executor.submit(AssetManager.write_asset, asset, str(dest)))
+            for write in writes:
+                write.result()
+        return len(hashes)
+
+
+def diff_managers(old: AssetManager, new: AssetManager) -> PackDiff:
+    """
+    Compares the merged entry tables of two managers by name hash, stored length and stored crc.
+    Nothing is read from the packs, so zipped assets are never decompressed.
+    """
+    old_assets = old.raw_assets
+    new_assets = new.raw_assets
+    diff = PackDiff(added=sorted(new_assets.keys() - old_assets.keys()),
+                    removed=sorted(old_assets.keys() - new_assets.keys()))
+    for name_hash in sorted(new_assets.keys() & old_assets.keys()):
+        old_asset = old_assets[name_hash]
+        new_asset = new_assets[name_hash]
+        if old_asset.data_length != new_asset.data_length or old_asset.hash != new_asset.hash:
+            diff.changed.append(name_hash)
+
+    for assets in (old_assets, new_assets):
+        diff.names.update((name_hash, asset.name) for name_hash, asset in assets.items() if asset.name)
+    return diff
+
+
+def pack_paths(path: Path) -> List[Path]:
+    """
+    Pack files in an assets directory, or the path itself if it is a single pack.
+    """
+    if path.is_file():
+        return [path]
+    return sorted(path.glob('*.pack2')) + sorted(path.glob('*.pack'))
+
+
+def main():
+    parser = ArgumentParser(description='List assets added, removed and changed between two sets of packs as JSON')
+    parser.add_argument('old', type=Path, help='assets directory or pack of the old install')
+    parser.add_argument('new', type=Path, help='assets directory or pack of the new install')
+    parser.add_argument('--extract', type=Path, help='write the added and changed assets of the new install here')
+    parser.add_argument('--workers', type=int, default=4, help='threads for loading packs and extracting')
+    parser.add_argument('--index-cache', type=Path, help='directory of sidecar pack indexes')
+    args = parser.parse_args()
+
+    old = AssetManager(pack_paths(args.old), workers=args.workers, index_cache=args.index_cache)
+    new = AssetManager(pack_paths(args.new), workers=args.workers, index_cache=args.index_cache)
+    diff = diff_managers(old, new)
+    json.dump(diff.to_json(), sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+    if args.extract is not None:
+        diff.extract(new, args.extract, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import json
+import sys
+
+from synthetic import write_pack2
+
+from DbgPack import AssetManager
+from DbgPack.diff import diff_managers, main
+from DbgPack.hash import crc64
+
+OLD = {'same.txt': b'same', 'removed.txt': b'removed', 'resized.txt': b'short', 'edited.txt': b'edit 1',
+       'zipped.txt': b'zipped' * 50, 'unnamed.txt': b'old hidden'}
+NEW = {'same.txt': b'same', 'resized.txt': b'much longer', 'edited.txt': b'edit 2', 'zipped.txt': b'ZIPPED' * 50,
+       'unnamed.txt': b'new hidden', 'added.txt': b'added'}
+
+
+def make_pack(path, assets):
+    """
+    Zips every other asset and names all but unnamed.txt in the pack's namelist
+    """
+    names = [name for name in assets if name != 'unnamed.txt'] + ['{NAMELIST}']
+    entries = dict(assets, **{'{NAMELIST}': '\n'.join(names).encode('utf-8')})
+    write_pack2(path, entries, zipped=list(entries)[::2])
+
+
+def make_managers(tmp_path):
+    make_pack(tmp_path / 'old.pack2', OLD)
+    make_pack(tmp_path / 'new.pack2', NEW)
+    return AssetManager([tmp_path / 'old.pack2']), AssetManager([tmp_path / 'new.pack2'])
+
+
+def test_diff_managers(tmp_path):
+    old, new = make_managers(tmp_path)
+    diff = diff_managers(old, new)
+    assert diff.added == [crc64('added.txt')]
+    assert diff.removed == [crc64('removed.txt')]
+    assert diff.changed == sorted(crc64(name) for name in
+                                  ('resized.txt', 'edited.txt', 'zipped.txt', 'unnamed.txt', '{NAMELIST}'))
+    assert diff.to_json() == {
+        'added': ['added.txt'],
+        'removed': ['removed.txt'],
+        'changed': sorted(['edited.txt', 'resized.txt', 'zipped.txt', '{NAMELIST}', f'0x{crc64("unnamed.txt"):016x}']),
+    }
+    assert diff_managers(new, new).to_json() == {'added': [], 'removed': [], 'changed': []}
+
+
+def test_extract(tmp_path):
+    old, new = make_managers(tmp_path)
+    outdir = tmp_path / 'extracted'
+    assert diff_managers(old, new).extract(new, outdir, workers=2) == 6
+    unnamed = f'0x{crc64("unnamed.txt"):016x}.bin'
+    assert sorted(path.name for path in outdir.iterdir()) == sorted(
+        [unnamed, 'added.txt', 'edited.txt', 'resized.txt', 'zipped.txt', '{NAMELIST}'])
+    for name in ('added.txt', 'edited.txt', 'resized.txt', 'zipped.txt'):
+        assert (outdir / name).read_bytes() == NEW[name]
+    assert (outdir / unnamed).read_bytes() == NEW['unnamed.txt']
+
+    # The extracted directory loads back as a loose pack under the same hashes
+    assert AssetManager([outdir])[crc64('unnamed.txt')].get_data() == NEW['unnamed.txt']
+
+
+def test_main(tmp_path, monkeypatch, capsys):
+    make_pack(tmp_path / 'old.pack2', OLD)
+    (tmp_path / 'new').mkdir()
+    make_pack(tmp_path / 'new' / 'new.pack2', NEW)
+    outdir = tmp_path / 'extracted'
+    monkeypatch.setattr(sys, 'argv', ['diff', str(tmp_path / 'old.pack2'), str(tmp_path / 'new'),
+                                      '--extract', str(outdir), '--workers', '2'])
+    main()
+    result = json.loads(capsys.readouterr().out)
+    assert result['added'] == ['added.txt'] and result['removed'] == ['removed.txt']
+    assert len(result['changed']) == 5
+    assert (outdir / 'added.txt').read_bytes() == b'added'
+    assert len(list(outdir.iterdir())) == 6
@@ -1,3 +1,7 @@
+from typing import Iterable, Union
+
+import numpy as np
+
 # Rhett's table
 crc_table = [
     0x0000000000000000, 0x7ad870c830358979,
@@ -130,6 +134,11 @@ crc_table = [
     0x536fa08fdfd90e51, 0x29b7d047efec8728
 ]
 
+_crc_table = np.array(crc_table, dtype=np.uint64)
+_CRC_MASK = np.uint64(0xffffffffffffffff)
+_BYTE_MASK = np.uint64(0xff)
+_BYTE_SHIFT = np.uint64(8)
+
 
 # TODO: MAke this a single function instead of a class
 class CRC64(object):
@@ -160,16 +169,53 @@ def crc64(buffer):
     return crc.finish()
 
 
+def crc64_many(buffers: Iterable[Union[str, bytes]]) -> np.ndarray:
+    """
+    Calculates the CRC64 hashes of many names at once, matching crc64 on each of them.
+    The table walk runs one character column at a time across all names still being hashed.
+    :param buffers: names as str or utf-8 bytes
+    :return: uint64 array of hashes in input order
+    """
+    names = [(b.decode('utf-8') if isinstance(b, bytes) else b).strip().upper() for b in buffers]
+    if not names:
+        return np.zeros(0, dtype=np.uint64)
+
+    lengths = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+    # crc64 mixes in the low byte of each character's code point
+    chars = (np.frombuffer(''.join(names).encode('utf-32-le'), dtype=np.uint32) & 0xff).astype(np.uint64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    # Longest names first, so the names still being hashed at any column are a prefix of the order
+    order = np.argsort(-lengths, kind='stable')
+    starts = starts[order]
+    sorted_lengths = lengths[order]
+    active_counts = np.searchsorted(-sorted_lengths, -np.arange(sorted_lengths[0]), side='left')
+
+    crc = np.full(len(names), _CRC_MASK, dtype=np.uint64)
+    for column, active in enumerate(active_counts.tolist()):
+        current = crc[:active]
+        index = (current & _BYTE_MASK) ^ chars[starts[:active] + column]
+        crc[:active] = _crc_table[index] ^ (current >> _BYTE_SHIFT)
+
+    hashes = np.empty_like(crc)
+    hashes[order] = crc ^ _CRC_MASK
+    return hashes
+
+
 if __name__ == '__main__':
+    # python -m DbgPack.hash [hashes.txt], checking lines of <hex crc64>:<name>. The tests live in hash_test.py
+    import sys
+
     expected = crc64('{NAMELIST}')
     actual = 0x4137cc65bd97fd30
     print(hex(expected))
     print(hex(actual))
     assert crc64('{NAMELIST}') == actual
 
-    with open('../test/hashes.txt') as file:
-        for line in file:
-            expected, filename = line.split(':')
-            print(filename, filename.upper())
-            print(hex(int(expected, 16)))
-            print(hex(crc64(filename)))
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as file:
+            for line in file:
+                expected, filename = line.rstrip('\n').split(':', 1)
+                print(filename, filename.upper())
+                print(hex(int(expected, 16)))
+                print(hex(crc64(filename)))
@@ -0,0 +1,23 @@
+from DbgPack.hash import crc64, crc64_many
+
+NAMELIST_HASH = 0x4137cc65bd97fd30
+
+
+def test_namelist_constant():
+    assert crc64('{NAMELIST}') == NAMELIST_HASH
+    assert crc64_many(['{NAMELIST}'])[0] == NAMELIST_HASH
+    assert crc64_many([b'{NAMELIST}'])[0] == NAMELIST_HASH
+
+
+def test_matches_scalar():
+    names = ['{NAMELIST}', 'Oshur_Tile_-64_-64_LOD0.dds', 'oshur_tile_000_004_lod3.dds', '  padded.adr\r',
+             'a', '', 'Héllo.txt', b'Bytes_Name.xml']
+    assert crc64_many(names).tolist() == [crc64(n) for n in names]
+
+
+def test_case_insensitive():
+    assert crc64_many(['{namelist}', '{NameList}']).tolist() == [NAMELIST_HASH, NAMELIST_HASH]
+
+
+def test_empty():
+    assert len(crc64_many([])) == 0
@@ -0,0 +1,163 @@
+from hashlib import sha1
+from mmap import mmap, ACCESS_READ
+from os import makedirs, replace
+from pathlib import Path
+from struct import Struct
+from typing import Dict, List, Optional
+from zlib import crc32
+
+import numpy as np
+
+from .name_index import NameIndex
+from .pack2 import MAP_ENTRY, Pack2, PackIndex
+
+
+class PackIndexCache:
+    """
+    Sidecar index files that let a Pack2 skip parsing its map table and internal namelist when the pack is unchanged.
+    Each index is keyed by the pack's resolved path and checked against its size and mtime before use.
+    The cache also keeps a type index per pack: the leading magic bytes of every asset, keyed by name hash,
+    and a name search index per set of packs.
+    """
+    MAGIC = b'DBGI'
+    TYPES_MAGIC = b'DBGT'
+    VERSION = 1
+    TYPE_LENGTH = 4
+
+    # magic, version, pack size, pack mtime_ns, asset_count, length, map_offset, names length, payload crc32
+    _header = Struct('<4sIQqQQQQI')
+    # magic, version, pack size, pack mtime_ns, entry count, payload crc32
+    _types_header = Struct('<4sIQqQI')
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        makedirs(self.directory, exist_ok=True)
+
+    def index_path(self, path: Path, suffix: str = '.idx') -> Path:
+        key = sha1(str(Path(path).resolve()).encode('utf-8')).hexdigest()[:16]
+        return self.directory / f'{Path(path).stem}-{key}{suffix}'
+
+    def load(self, path: Path) -> Optional[PackIndex]:
+        """
+        :return: the cached index of the pack at path, or None if it is missing, stale or corrupt
+        """
+        index_path = self.index_path(path)
+        try:
+            stat = Path(path).stat()
+            with index_path.open('rb') as file:
+                mapping = mmap(file.fileno(), 0, access=ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        with mapping:
+            return self._parse(mapping, stat.st_size, stat.st_mtime_ns)
+
+    def _parse(self, mapping: mmap, size: int, mtime_ns: int) -> Optional[PackIndex]:
+        if len(mapping) < self._header.size:
+            return None
+        magic, version, pack_size, pack_mtime_ns, asset_count, length, map_offset, names_length, checksum = \
+            self._header.unpack_from(mapping)
+        if magic != self.MAGIC or version != self.VERSION or pack_size != size or pack_mtime_ns != mtime_ns:
+            return None
+
+        payload_length = asset_count * (MAP_ENTRY.itemsize + 5) + names_length
+        if len(mapping) != self._header.size + payload_length:
+            return None
+        with memoryview(mapping)[self._header.size:] as payload:
+            if crc32(payload) != checksum:
+                return None
+
+            position = 0
+            table = np.frombuffer(payload, dtype=MAP_ENTRY, count=asset_count, offset=position).copy()
+            position += asset_count * MAP_ENTRY.itemsize
+            unzipped_lengths = np.frombuffer(payload, dtype='<u4', count=asset_count, offset=position).copy()
+            position += asset_count * 4
+            is_zipped = np.frombuffer(payload, dtype=np.bool_, count=asset_count, offset=position).copy()
+            position += asset_count
+            # One name per asset, empty when unknown. An empty pack has no names rather than one empty name
+            names = bytes(payload[position:]).decode('utf-8').split('\n') if asset_count else []
+
+        if len(names) != asset_count:
+            return None
+        return PackIndex(asset_count=asset_count, length=length, map_offset=map_offset, table=table,
+                         is_zipped=is_zipped, unzipped_lengths=unzipped_lengths,
+                         names={name_hash: name for name_hash, name in zip(table['name_hash'].tolist(), names) if name})
+
+    def store(self, pack: Pack2):
+        """
+        Writes the index for a freshly parsed pack, replacing any previous one.
+        """
+        index = pack.index
+        stat = pack.path.stat()
+        names = '\n'.join(index.names.get(name_hash, '') for name_hash in index.table['name_hash'].tolist())
+        names = names.encode('utf-8')
+        payload = b''.join((index.table.astype(MAP_ENTRY).tobytes(), index.unzipped_lengths.astype('<u4').tobytes(),
+                            index.is_zipped.astype(np.bool_).tobytes(), names))
+        header = self._header.pack(self.MAGIC, self.VERSION, stat.st_size, stat.st_mtime_ns, index.asset_count,
+                                   index.length, index.map_offset, len(names), crc32(payload))
+
+        self._write(self.index_path(pack.path), header, payload)
+
+    def load_types(self, path: Path) -> Optional[Dict[int, bytes]]:
+        """
+        :return: the cached type index of the pack at path, or None if it is missing, stale or corrupt
+        """
+        try:
+            stat = Path(path).stat()
+            with self.index_path(path, '.types').open('rb') as file:
+                mapping = mmap(file.fileno(), 0, access=ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        with mapping:
+            if len(mapping) < self._types_header.size:
+                return None
+            magic, version, pack_size, pack_mtime_ns, count, checksum = self._types_header.unpack_from(mapping)
+            if magic != self.TYPES_MAGIC or version != self.VERSION or pack_size != stat.st_size \
+                    or pack_mtime_ns != stat.st_mtime_ns:
+                return None
+            if len(mapping) != self._types_header.size + count * (8 + 1 + self.TYPE_LENGTH):
+                return None
+            with memoryview(mapping)[self._types_header.size:] as payload:
+                if crc32(payload) != checksum:
+                    return None
+                hashes = np.frombuffer(payload, dtype='<u8', count=count).tolist()
+                lengths = np.frombuffer(payload, dtype=np.uint8, count=count, offset=count * 8).tolist()
+                types = bytes(payload[count * 9:])
+
+        return {name_hash: types[i * self.TYPE_LENGTH:i * self.TYPE_LENGTH + length]
+                for i, (name_hash, length) in enumerate(zip(hashes, lengths))}
+
+    def store_types(self, path: Path, types: Dict[int, bytes]):
+        """
+        Writes the type index for the pack at path, replacing any previous one.
+        """
+        stat = Path(path).stat()
+        magics = [magic[:self.TYPE_LENGTH] for magic in types.values()]
+        payload = b''.join((np.fromiter(types.keys(), dtype='<u8', count=len(types)).tobytes(),
+                            bytes(len(magic) for magic in magics),
+                            b''.join(magic.ljust(self.TYPE_LENGTH, b'\x00') for magic in magics)))
+        header = self._types_header.pack(self.TYPES_MAGIC, self.VERSION, stat.st_size, stat.st_mtime_ns, len(types),
+                                         crc32(payload))
+        self._write(self.index_path(path, '.types'), header, payload)
+
+    def names_path(self, paths: List[Path]) -> Path:
+        key = sha1('\n'.join(str(Path(path).resolve()) for path in paths).encode('utf-8')).hexdigest()[:16]
+        return self.directory / f'names-{key}.npz'
+
+    def load_names(self, paths: List[Path], fingerprint: str) -> Optional[NameIndex]:
+        """
+        :return: the name index of the packs at paths, or None if it is missing or was built from other names
+        """
+        return NameIndex.load(self.names_path(paths), fingerprint)
+
+    def store_names(self, paths: List[Path], index: NameIndex):
+        index.save(self.names_path(paths))
+
+    @staticmethod
+    def _write(index_path: Path, header: bytes, payload: bytes):
+        temp_path = index_path.with_name(index_path.name + '.tmp')
+        with temp_path.open('wb') as file:
+            file.write(header)
+            file.write(payload)
+        replace(temp_path, index_path)
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+from synthetic import make_pack2, write_pack2
+
+from DbgPack import Pack2
+from DbgPack.index_cache import PackIndexCache
+
+
+def assert_same_index(cached, parsed):
+    assert cached.asset_count == parsed.asset_count
+    assert (cached.length, cached.map_offset) == (parsed.length, parsed.map_offset)
+    assert np.array_equal(cached.table, parsed.table)
+    assert np.array_equal(cached.is_zipped, parsed.is_zipped)
+    assert np.array_equal(cached.unzipped_lengths, parsed.unzipped_lengths)
+    assert cached.names == parsed.names
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'synthetic.pack2'
+    make_pack2(path, 50, 500)
+    cache = PackIndexCache(tmp_path / 'cache')
+    assert cache.load(path) is None
+
+    parsed = Pack2(path, index_cache=cache)
+    assert cache.index_path(path).exists()
+    assert_same_index(cache.load(path), parsed.index)
+    cached = Pack2(path, index_cache=cache)
+    assert cached.assets.keys() == parsed.assets.keys()
+
+
+def test_changed_pack_is_stale(tmp_path):
+    path = tmp_path / 'synthetic.pack2'
+    make_pack2(path, 10, 500)
+    cache = PackIndexCache(tmp_path / 'cache')
+    Pack2(path, index_cache=cache)
+
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.load(path) is None
+
+    make_pack2(path, 11, 500)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert path.stat().st_size != stat.st_size
+    assert cache.load(path) is None
+    # Loading rebuilds the index for the new pack
+    assert len(Pack2(path, index_cache=cache)) == 12
+    assert cache.load(path).asset_count == 12
+
+
+def test_damaged_index_is_rejected(tmp_path):
+    path = tmp_path / 'synthetic.pack2'
+    make_pack2(path, 10, 500)
+    cache = PackIndexCache(tmp_path / 'cache')
+    Pack2(path, index_cache=cache)
+    index_path = cache.index_path(path)
+    original = index_path.read_bytes()
+
+    index_path.write_bytes(original[:-10])
+    assert cache.load(path) is None
+
+    corrupted = bytearray(original)
+    corrupted[-1] ^= 0xff
+    index_path.write_bytes(bytes(corrupted))
+    assert cache.load(path) is None
+
+    index_path.write_bytes(b'XXXX' + original[4:])
+    assert cache.load(path) is None
+
+    version = PackIndexCache._header.unpack_from(original)[1]
+    index_path.write_bytes(original[:4] + (version + 1).to_bytes(4, 'little') + original[8:])
+    assert cache.load(path) is None
+
+    # A rejected index is rewritten by the next load
+    Pack2(path, index_cache=cache)
+    assert index_path.read_bytes() == original
+
+
+def test_empty_pack(tmp_path):
+    path = tmp_path / 'empty.pack2'
+    write_pack2(path, {})
+    cache = PackIndexCache(tmp_path / 'cache')
+    Pack2(path, index_cache=cache)
+    index = cache.load(path)
+    assert index is not None and index.asset_count == 0 and index.names == {}
@@ -1,13 +1,13 @@
 from binascii import crc32
 from dataclasses import dataclass
-from pathlib import Path
+from os import stat_result
+from pathlib import Path, PurePosixPath
 from re import fullmatch
+from typing import Iterator, Optional
 
 from .abc import AbstractAsset
 from .hash import crc64
-
-
-# TODO: Handle file modifications after load
+from .stream import CHUNK_SIZE
 
 
 @dataclass
@@ -17,10 +17,15 @@ class LooseAsset(AbstractAsset):
     path: Path
 
     data_length: int
-    hash: int
+    mtime_ns: int
 
-    def __init__(self, name: str, path: Path):
-        mo = fullmatch(r'(0x[a-fA-F0-9]{16}).bin', name)
+    def __init__(self, name: str, path: Path, stat: Optional[stat_result] = None):
+        """
+        Only the file's stat is read here, its contents are hashed on first use of crc32, hash or md5.
+        :param name: file name, or path relative to path for files in subdirectories
+        :param stat: stat of the file, if the caller already has it
+        """
+        mo = fullmatch(r'(0x[a-fA-F0-9]{16}).bin', PurePosixPath(name).name)
         if mo:
             self.name_hash = int(mo.group(1), 0)
 
@@ -29,12 +34,37 @@ class LooseAsset(AbstractAsset):
         self.name = name
         self.path = path
 
-        self.data_length = (self.path / self.name).stat().st_size
-        self.crc32 = crc32((self.path / self.name).read_bytes())
+        stat = stat or (self.path / self.name).stat()
+        self.data_length = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self._crc32 = None
+        self._md5 = None
+
+    @property
+    def crc32(self) -> int:
+        if self._crc32 is None:
+            value = 0
+            for chunk in self.iter_chunks():
+                value = crc32(chunk, value)
+            self._crc32 = value
+
+        return self._crc32
 
-    def get_data(self, raw=False) -> bytes:
-        # Ignore raw for now. Maybe we can keep these in zipped files
+    @property
+    def hash(self) -> int:
+        return self.crc32
+
+    def get_data(self, raw=False, cache=True) -> bytes:
+        # Ignore raw and cache for now. Maybe we can keep these in zipped files
         return (self.path / self.name).read_bytes() if self.data_length > 0 else bytes()
 
+    def iter_chunks(self, raw=False, chunk_size=CHUNK_SIZE) -> Iterator[bytes]:
+        with (self.path / self.name).open('rb') as file:
+            yield from iter(lambda: file.read(chunk_size), b'')
+
+    @property
+    def md5(self) -> str:
+        return super().md5
+
     def __len__(self):
         return super().__len__()
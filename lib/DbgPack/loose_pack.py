@@ -1,10 +1,10 @@
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Iterator, List, Tuple
 from pathlib import Path
-from os import walk
-from re import fullmatch
+from os import DirEntry, scandir
 
 from .abc import AbstractPack
+from .hash import crc64
 from .loose_asset import LooseAsset
 
 
@@ -15,15 +15,60 @@ class LoosePack(AbstractPack):
 
     asset_count: int
     assets: Dict[str, LooseAsset]
+    raw_assets: Dict[int, LooseAsset]
 
     def __init__(self, path: Path):
+        """
+        Indexes file names and stat sizes under path, including subdirectories. File contents are not read.
+        Files in subdirectories are named by their path relative to path, such as textures/foo.dds.
+        """
         super().__init__(path)
 
         self.assets = {}
-        for root, _, files in walk(self.path):
-            for file in files:
-                asset = LooseAsset(name=file, path=self.path)
-                self.assets[asset.name] = asset
+        for name, entry in self._scan(self.path):
+            self.assets[name] = LooseAsset(name=name, path=self.path, stat=entry.stat())
+        self._update_raw_assets()
+
+    @staticmethod
+    def _scan(directory: Path, prefix: str = '') -> Iterator[Tuple[str, DirEntry]]:
+        """
+        Yields the name relative to the pack root and the DirEntry of every file under directory
+        """
+        with scandir(directory) as entries:
+            subdirectories = []
+            for entry in entries:
+                if entry.is_dir():
+                    subdirectories.append(entry)
+                elif entry.is_file():
+                    yield prefix + entry.name, entry
+        for subdirectory in subdirectories:
+            yield from LoosePack._scan(Path(subdirectory.path), prefix + subdirectory.name + '/')
+
+    def _update_raw_assets(self):
+        self.raw_assets = {asset.name_hash: asset for asset in self.assets.values()}
+        self.asset_count = len(self.assets)
+
+    def refresh(self) -> List[str]:
+        """
+        Re-stats the tree and picks up new, removed and modified files. Only assets whose size or mtime changed are
+        replaced, so unchanged files keep their cached crc32 and md5.
+        :return: names of the added, removed and modified assets
+        """
+        assets = {}
+        changed = []
+        for name, entry in self._scan(self.path):
+            stat = entry.stat()
+            asset = self.assets.get(name)
+            if asset is None or asset.data_length != stat.st_size or asset.mtime_ns != stat.st_mtime_ns:
+                asset = LooseAsset(name=name, path=self.path, stat=stat)
+                changed.append(name)
+            assets[name] = asset
+
+        changed.extend(self.assets.keys() - assets.keys())
+        if changed:
+            self.assets = assets
+            self._update_raw_assets()
+        return changed
 
     def __repr__(self):
         return super().__repr__()
@@ -33,7 +78,13 @@ class LoosePack(AbstractPack):
 
     def __getitem__(self, item):
         if isinstance(item, str):
-            return self.assets[item]
+            try:
+                return self.assets[item]
+            except KeyError:
+                return self.raw_assets[crc64(item)]
+
+        elif isinstance(item, int):
+            return self.raw_assets[item]
         else:
             raise KeyError
 
@@ -41,4 +92,4 @@ class LoosePack(AbstractPack):
         return iter(self.assets.values())
 
     def __contains__(self, item):
-        super().__contains__(item)
+        return super().__contains__(item)
@@ -0,0 +1,55 @@
+import os
+
+from DbgPack import LoosePack
+from DbgPack.hash import crc64
+
+
+def make_tree(root):
+    (root / 'textures').mkdir(parents=True)
+    (root / 'models').mkdir()
+    (root / 'readme.txt').write_bytes(b'top')
+    (root / 'textures' / 'rock.dds').write_bytes(b'texture rock')
+    (root / 'models' / 'rock.dds').write_bytes(b'model rock')
+    (root / 'models' / '0x0000000000001234.bin').write_bytes(b'hashed')
+
+
+def touch(path, data: bytes):
+    # Sizes can stay the same, so the mtime is moved on explicitly
+    mtime = path.stat().st_mtime_ns
+    path.write_bytes(data)
+    os.utime(path, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+
+
+def test_subdirectories_keep_relative_names(tmp_path):
+    make_tree(tmp_path)
+    pack = LoosePack(tmp_path)
+    assert sorted(pack.assets) == ['models/0x0000000000001234.bin', 'models/rock.dds', 'readme.txt', 'textures/rock.dds']
+    assert len(pack) == len(pack.raw_assets) == 4
+    assert pack['textures/rock.dds'].get_data() == b'texture rock'
+    assert pack['models/rock.dds'].get_data() == b'model rock'
+    assert pack[crc64('models/rock.dds')] is pack['models/rock.dds']
+    assert pack[0x1234].get_data() == b'hashed'
+    assert 'rock.dds' not in pack
+
+
+def test_refresh(tmp_path):
+    make_tree(tmp_path)
+    pack = LoosePack(tmp_path)
+    for asset in pack:
+        assert asset.crc32 is not None
+    unchanged = pack['textures/rock.dds']
+    assert pack.refresh() == []
+
+    touch(tmp_path / 'models' / 'rock.dds', b'model ROCK')
+    (tmp_path / 'readme.txt').unlink()
+    (tmp_path / 'textures' / 'grass.dds').write_bytes(b'grass')
+    assert sorted(pack.refresh()) == ['models/rock.dds', 'readme.txt', 'textures/grass.dds']
+
+    assert sorted(pack.assets) == ['models/0x0000000000001234.bin', 'models/rock.dds', 'textures/grass.dds',
+                                   'textures/rock.dds']
+    assert len(pack) == len(pack.raw_assets) == 4
+    assert 'readme.txt' not in pack and crc64('readme.txt') not in pack.raw_assets
+    assert pack['models/rock.dds'].get_data() == b'model ROCK'
+    assert pack['textures/grass.dds'].get_data() == b'grass'
+    assert pack['textures/rock.dds'] is unchanged and unchanged._crc32 is not None
+    assert pack.refresh() == []
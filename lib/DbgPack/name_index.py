@@ -0,0 +1,183 @@
+from bisect import bisect_left
+from fnmatch import translate
+from hashlib import sha1
+from pathlib import Path
+from re import compile as compile_regex, split
+from typing import List, Optional
+
+import numpy as np
+
+_CODE_BITS = np.uint64(21)  # enough for any unicode code point
+
+
+def _code_points(names: List[str]) -> np.ndarray:
+    return np.frombuffer(''.join(names).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+
+
+def _trigram_codes(names: List[str]):
+    """
+    :return: the code of every trigram in names and the index of the name it came from
+    """
+    lengths = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+    points = _code_points(names)
+    ids = np.repeat(np.arange(len(names), dtype=np.int64), lengths)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    valid = np.arange(len(points)) - starts[ids] <= lengths[ids] - 3
+    positions = np.flatnonzero(valid)
+    codes = (points[positions] << (_CODE_BITS * np.uint64(2))) | (points[positions + 1] << _CODE_BITS) | \
+        points[positions + 2]
+    return codes, ids[positions]
+
+
+def fingerprint(names: List[str]) -> str:
+    """
+    :return: digest identifying a collection of names regardless of their order
+    """
+    return sha1('\n'.join(sorted(names)).encode('utf-8')).hexdigest()
+
+
+def _prefix_range(keys: List[str], prefix: str):
+    start = bisect_left(keys, prefix)
+    return start, bisect_left(keys, prefix + '\U0010ffff', start)
+
+
+class NameIndex:
+    """
+    Case-insensitive index over asset names, answering substring, prefix, suffix and glob queries without a scan.
+    Substrings are looked up in a trigram index, prefixes and suffixes by binary search over the sorted names.
+    Results are always returned in the same sorted order as AssetManager.search used to produce.
+    """
+    VERSION = 1
+
+    def __init__(self, names: List[str], fingerprint: str = '', _arrays: Optional[dict] = None):
+        """
+        :param names: names to index, duplicates are kept
+        :param fingerprint: identifies the set of names, so a saved index can be checked before reuse
+        """
+        self.fingerprint = fingerprint
+        self.names = sorted(names)
+        self._lower = [name.lower() for name in self.names]
+
+        if _arrays is None:
+            codes, ids = _trigram_codes(self._lower)
+            order = np.argsort(codes, kind='stable')
+            codes, ids = codes[order], ids[order]
+            # a name repeating a trigram only needs to be posted once
+            unique = np.ones(len(codes), dtype=bool)
+            unique[1:] = (codes[1:] != codes[:-1]) | (ids[1:] != ids[:-1])
+            _arrays = {'codes': codes[unique], 'ids': ids[unique],
+                       'by_prefix': np.array(sorted(range(len(self.names)), key=self._lower.__getitem__),
+                                             dtype=np.int64),
+                       'by_suffix': np.array(sorted(range(len(self.names)), key=lambda i: self._lower[i][::-1]),
+                                             dtype=np.int64)}
+        self._codes = _arrays['codes']
+        self._ids = _arrays['ids']
+        self._by_prefix = _arrays['by_prefix']
+        self._by_suffix = _arrays['by_suffix']
+        self._prefix_keys = None
+        self._suffix_keys = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def _trigram_filter(self, term: str, candidates: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Narrows candidates to the names containing every trigram of term, starting from the rarest trigram.
+        Common trigrams are skipped once the candidates are few enough that checking them directly is cheaper.
+        :return: sorted name indexes, or None if term is too short to filter on
+        """
+        if len(term) < 3:
+            return candidates
+        codes = np.unique(_trigram_codes([term])[0])
+        starts = np.searchsorted(self._codes, codes, side='left')
+        ends = np.searchsorted(self._codes, codes, side='right')
+        for start, end in sorted(zip(starts.tolist(), ends.tolist()), key=lambda bounds: bounds[1] - bounds[0]):
+            if candidates is not None and (len(candidates) == 0 or end - start > 16 * len(candidates)):
+                break
+            ids = self._ids[start:end]
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+        return candidates
+
+    def _substring_ids(self, term: str) -> np.ndarray:
+        candidates = self._trigram_filter(term)
+        if candidates is None:
+            return np.array([i for i, name in enumerate(self._lower) if term in name], dtype=np.int64)
+        return np.array([i for i in candidates.tolist() if term in self._lower[i]], dtype=np.int64)
+
+    def _prefix_ids(self, prefix: str) -> np.ndarray:
+        if self._prefix_keys is None:
+            self._prefix_keys = [self._lower[i] for i in self._by_prefix.tolist()]
+        start, end = _prefix_range(self._prefix_keys, prefix)
+        return np.sort(self._by_prefix[start:end])
+
+    def _suffix_ids(self, suffix: str) -> np.ndarray:
+        if self._suffix_keys is None:
+            self._suffix_keys = [self._lower[i][::-1] for i in self._by_suffix.tolist()]
+        start, end = _prefix_range(self._suffix_keys, suffix[::-1])
+        return np.sort(self._by_suffix[start:end])
+
+    def _names(self, ids: np.ndarray) -> List[str]:
+        return [self.names[i] for i in ids.tolist()]
+
+    def substring(self, term: str) -> List[str]:
+        return self._names(self._substring_ids(term.lower()))
+
+    def prefix(self, prefix: str) -> List[str]:
+        return self._names(self._prefix_ids(prefix.lower()))
+
+    def suffix(self, suffix: str) -> List[str]:
+        return self._names(self._suffix_ids(suffix.lower()))
+
+    def search(self, term: str, suffix: str = '') -> List[str]:
+        """
+        Same results as AssetManager.search: term matches anywhere ignoring case, suffix is matched exactly.
+        """
+        ids = self._substring_ids(term.lower()) if term else self._suffix_ids(suffix.lower())
+        return [name for name in self._names(ids) if name.endswith(suffix)]
+
+    def glob(self, pattern: str) -> List[str]:
+        """
+        Names matching a shell-style pattern, ignoring case, e.g. Oshur_Tile_*_LOD0.dds
+        """
+        pattern = pattern.lower()
+        regex = compile_regex(translate(pattern))
+        literals = split(r'[*?]', pattern)
+
+        candidates = None
+        if '[' not in literals[0] and literals[0]:
+            candidates = self._prefix_ids(literals[0])
+        if '[' not in literals[-1] and literals[-1] and len(literals) > 1:
+            ids = self._suffix_ids(literals[-1])
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+        for literal in sorted(literals, key=len, reverse=True):
+            if '[' not in literal:
+                candidates = self._trigram_filter(literal, candidates)
+        if candidates is None:
+            candidates = np.arange(len(self.names))
+        return [self.names[i] for i in candidates.tolist() if regex.match(self._lower[i])]
+
+    def save(self, path: Path):
+        names = '\n'.join(self.names).encode('utf-8')
+        temp_path = path.with_name(path.name + '.tmp.npz')
+        np.savez(temp_path, version=self.VERSION, fingerprint=self.fingerprint, count=len(self.names),
+                 names=np.frombuffer(names, dtype=np.uint8), codes=self._codes, ids=self._ids,
+                 by_prefix=self._by_prefix, by_suffix=self._by_suffix)
+        temp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, fingerprint: str) -> Optional['NameIndex']:
+        """
+        :return: the saved index, or None if it is missing, corrupt or was built from other names
+        """
+        try:
+            with np.load(path) as saved:
+                if int(saved['version']) != cls.VERSION or str(saved['fingerprint']) != fingerprint:
+                    return None
+                count = int(saved['count'])
+                names = saved['names'].tobytes().decode('utf-8').split('\n') if count else []
+                arrays = {key: saved[key] for key in ('codes', 'ids', 'by_prefix', 'by_suffix')}
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(names) != count:
+            return None
+        return cls(names, fingerprint, arrays)
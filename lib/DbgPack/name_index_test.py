@@ -0,0 +1,37 @@
+from fnmatch import fnmatch
+
+from DbgPack.name_index import NameIndex
+
+NAMES = ['Oshur_Tile_-64_-64_LOD0.dds', 'Oshur_Tile_000_004_LOD3.dds', 'oshur_tile_004_000_lod1.DDS', 'Amerish.adr',
+         'Vehicle_Common_Magrider.adr', 'ui_map_icon.png', '', '', 'Héllo.txt', 'ab', 'abab.xml', 'abc']
+
+
+def scan(term, suffix=''):
+    return sorted(name for name in NAMES if term.lower() in name.lower() and name.endswith(suffix))
+
+
+def test_search_matches_scan():
+    index = NameIndex(NAMES)
+    for term, suffix in [('', ''), ('oshur', ''), ('TILE', '.dds'), ('lod', '.DDS'), ('', '.adr'), ('a', ''),
+                         ('ab', ''), ('aba', ''), ('héllo', ''), ('missing', ''), ('_', '.png'), ('.', '')]:
+        assert index.search(term, suffix) == scan(term, suffix), (term, suffix)
+
+
+def test_prefix_suffix_glob():
+    index = NameIndex(NAMES)
+    assert index.prefix('OSHUR_') == sorted(name for name in NAMES if name.lower().startswith('oshur_'))
+    assert index.suffix('.DDS') == sorted(name for name in NAMES if name.lower().endswith('.dds'))
+    for pattern in ['oshur_tile_*_lod0.dds', '*.adr', 'ab?', '*', 'Oshur_Tile_[0-9]*', '*tile*lod?.dds', 'abc']:
+        expected = sorted(name for name in NAMES if fnmatch(name.lower(), pattern.lower()))
+        assert index.glob(pattern) == expected, pattern
+
+
+def test_save_load(tmp_path):
+    path = tmp_path / 'names.npz'
+    index = NameIndex(NAMES, 'fingerprint')
+    index.save(path)
+    assert NameIndex.load(path, 'other') is None
+    loaded = NameIndex.load(path, 'fingerprint')
+    assert loaded.names == index.names
+    assert loaded.glob('*tile*') == index.glob('*tile*')
+    assert NameIndex.load(tmp_path / 'missing.npz', 'fingerprint') is None
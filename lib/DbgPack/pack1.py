@@ -3,6 +3,7 @@ from typing import Dict
 
 from .abc import AbstractPack
 from .asset1 import Asset1
+from .hash import crc64, crc64_many
 from .struct_reader import BinaryStructReader
 
 
@@ -12,9 +13,12 @@ class Pack1(AbstractPack):
 
     asset_count: int
     assets: Dict[str, Asset1]
+    raw_assets: Dict[int, Asset1]
 
-    def __init__(self, path: Path):
+    def __init__(self, path: Path, use_mmap: bool = False):
         super().__init__(path)
+        if use_mmap:
+            self._map()
 
         self.assets = {}
         self.asset_count = 0
@@ -31,12 +35,18 @@ class Pack1(AbstractPack):
                     data_length = reader.uint32BE()
                     file_hash = reader.uint32BE()
 
-                    asset = Asset1(name=name, path=self.path, offset=offset, data_length=data_length, hash=file_hash)
+                    asset = Asset1(name=name, path=self.path, offset=offset, data_length=data_length, hash=file_hash,
+                                   _view=self._view)
                     self.assets[asset.name] = asset
 
                 self.asset_count += asset_count
                 reader.seek(next_chunk)
 
+        self.raw_assets = {}
+        for asset, name_hash in zip(self.assets.values(), crc64_many(self.assets.keys()).tolist()):
+            asset.name_hash = name_hash
+            self.raw_assets[name_hash] = asset
+
     def __repr__(self):
         return super().__repr__()
 
@@ -48,9 +58,15 @@ class Pack1(AbstractPack):
 
     def __getitem__(self, item):
         if isinstance(item, str):
-            return self.assets[item]
+            try:
+                return self.assets[item]
+            except KeyError:
+                return self.raw_assets[crc64(item)]
+
+        elif isinstance(item, int):
+            return self.raw_assets[item]
         else:
             raise KeyError
 
     def __contains__(self, item):
-        super().__contains__(item)
+        return super().__contains__(item)
@@ -0,0 +1,16 @@
+from synthetic import make_pack1
+
+from DbgPack import Pack1
+
+
+def test_mmap_reads_match(tmp_path):
+    path = tmp_path / 'synthetic.pack'
+    names = make_pack1(path, 40, 2000, chunk_assets=16)
+    plain, mapped = Pack1(path), Pack1(path, use_mmap=True)
+    for name in names:
+        assert bytes(mapped[name].get_data()) == plain[name].get_data()
+
+    mapping = mapped._mmap
+    mapped.close()
+    assert mapping.closed and mapped._view is None
+    assert mapped[names[0]].get_data() == plain[names[0]].get_data()
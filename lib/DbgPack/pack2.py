@@ -1,15 +1,24 @@
-from dataclasses import dataclass
-from os import makedirs
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from mmap import mmap, ACCESS_READ
+from os import cpu_count, makedirs
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, List, Optional, TYPE_CHECKING
+import zlib
+
+import numpy as np
 
 from .abc import AbstractPack, AbstractAsset
 from .asset2 import Asset2
-from .hash import crc64
-from .loose_asset import LooseAsset
+from .hash import crc64, crc64_many
 from .struct_reader import BinaryStructReader
 from .struct_writer import BinaryStructWriter
 
+if TYPE_CHECKING:
+    from .index_cache import PackIndexCache
+    from .verify import VerifyReport
+
 _MAGIC: bytes = b'PAK\x01'
 _NAMELIST_HASH: int = crc64(b'{NAMELIST}')
 assert _NAMELIST_HASH == 0x4137cc65bd97fd30, 'crc64 is not generated correctly'
@@ -17,6 +26,84 @@ assert _NAMELIST_HASH == 0x4137cc65bd97fd30, 'crc64 is not generated correctly'
 _ZIPPED_FLAGS = (0x01, 0x11)
 _UNZIPPED_FLAGS = (0x10, 0x00)
 
+# One entry of the asset map table
+MAP_ENTRY = np.dtype([('name_hash', '<u8'), ('offset', '<u8'), ('data_length', '<u8'), ('flag', '<u4'), ('hash', '<u4')])
+
+
+def _name_hash(asset: AbstractAsset) -> int:
+    name_hash = getattr(asset, 'name_hash', None)
+    return name_hash if name_hash is not None else crc64(asset.name)
+
+
+def _zip(data: bytes, level: int) -> bytes:
+    """
+    Process pool worker for Pack2.export: stores data the way zipped pack2 assets are stored.
+    """
+    return Asset2.ZIP_MAGIC + len(data).to_bytes(4, 'big') + zlib.compress(data, level)
+
+
+class Pack2Writer:
+    """
+    Writes a pack2 front to back: the data region, then the map table, then the header over the start of the file.
+    The gap between the header and the data is skipped with a seek instead of being padded.
+    """
+    DATA_OFFSET = 0x200
+
+    def __init__(self, path: Path):
+        self._writer = BinaryStructWriter(path)
+        self._writer.seek(self.DATA_OFFSET)
+        self._entries = []
+
+    def add(self, name_hash: int, chunks: Iterable[bytes], flag: int, hash_: int):
+        """
+        Appends one asset.
+        :param chunks: the stored data, as written to the pack
+        :param flag: one of the zipped or unzipped map flags, matching how chunks are stored
+        :param hash_: crc32 recorded in the map table
+        """
+        offset = self._writer.tell()
+        self._writer.writelines(chunks)
+        self._entries.append((name_hash, offset, self._writer.tell() - offset, flag, hash_))
+
+    def close(self):
+        table = np.array(self._entries, dtype=MAP_ENTRY)
+        table.sort(order='name_hash')
+        map_offset = self._writer.tell()
+        self._writer.write(table.tobytes())
+        pack_length = self._writer.tell()
+
+        self._writer.seek(0)
+        self._writer.write(_MAGIC)
+        self._writer.uint32LE(len(table))
+        self._writer.uint64LE(pack_length)
+        self._writer.uint64LE(map_offset)
+        self._writer.uint64LE(256)
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._writer.close()
+
+
+@dataclass
+class PackIndex:
+    """
+    Everything Pack2 parses out of a pack file before it can hand out assets.
+    """
+    asset_count: int
+    length: int
+    map_offset: int
+
+    table: np.ndarray
+    is_zipped: np.ndarray
+    unzipped_lengths: np.ndarray
+    names: Dict[int, str]  # Names resolved from the pack's internal namelist
+
 
 @dataclass
 class Pack2(AbstractPack):
@@ -26,11 +113,13 @@ class Pack2(AbstractPack):
     asset_count: int
     length: int
     map_offset: int
+    table: np.ndarray = field(compare=False)
 
     assets: Dict[str, Asset2]
     raw_assets: Dict[int, Asset2]
 
     _namelist: List[str]
+    _internal_names: Dict[int, str]
 
     @property
     def namelist(self) -> List[str]:
@@ -43,139 +132,216 @@ class Pack2(AbstractPack):
         self._update_assets(self._namelist)
 
     @staticmethod
-    def export(assets: List[AbstractAsset], name: str, outdir: Path, raw: bool):
+    def export(assets: List[AbstractAsset], name: str, outdir: Path, raw: bool, compress: bool = False,
+               workers: Optional[int] = None, level: int = 6):
         """
 
         :param assets: List of assets to export
         :param name: name of file to export to
         :param outdir: path to save file
         :param raw: should we use raw zipped data
+        :param compress: zip every asset, compressing on a process pool. Already zipped assets are copied as stored
+        :param workers: number of compression processes, defaults to the number of CPUs
+        :param level: zlib compression level
         """
 
         makedirs(outdir, exist_ok=True)
 
-        with BinaryStructWriter(outdir / name) as writer:
-            sizes = []
+        assets = sorted(assets, key=_name_hash)
+        with Pack2Writer(outdir / name) as writer:
+            if compress:
+                Pack2._export_compressed(writer, assets, workers, level)
+                return
+
             for a in assets:
-                if isinstance(a, Asset2):
-                    if a.is_zipped:
-                        if raw:
-                            sizes.append(a.data_length)
-                        else:
-                            sizes.append(a.unzipped_length)
-
-                    else:  # not zipped
-                        sizes.append(a.data_length)
-
-                else:  # not Asset2
-                    sizes.append(a.data_length)
-
-            total_data_length = sum(sizes)
-
-            writer.write(_MAGIC)
-            writer.uint32LE(len(assets))
-            writer.uint64LE(0)  # Overwrite this later
-            writer.uint64LE(total_data_length + 0x200)
-            writer.uint64LE(256)
-
-            # Padding
-            while writer.tell() < total_data_length + 0x200:
-                writer.write(b'\x00')
-
-            data_offset = 0x200
-            for a in sorted(assets, key=lambda x: x.name_hash if isinstance(x, Asset2) else crc64(x.name)):
-                if isinstance(a, (Asset2, LooseAsset)):
-                    writer.uint64LE(a.name_hash)
+                zipped = raw and isinstance(a, Asset2) and a.is_zipped
+                writer.add(_name_hash(a), a.iter_chunks(raw), _ZIPPED_FLAGS[0] if zipped else _UNZIPPED_FLAGS[0],
+                           a.hash)  # PTS doesn't care if the checksums don't match
+
+    @staticmethod
+    def _export_compressed(writer: 'Pack2Writer', assets: List[AbstractAsset], workers: Optional[int], level: int):
+        """
+        Compresses assets on a process pool while writing them in order. Only a few assets per worker are in flight,
+        so memory stays bounded on large exports.
+        """
+        window = 2 * (workers or cpu_count() or 1)
+        pending = deque()
+
+        def write_next():
+            a, future = pending.popleft()
+            if future is not None:
+                writer.add(_name_hash(a), [future.result()], _ZIPPED_FLAGS[0], a.hash)
+            elif isinstance(a, Asset2) and a.is_zipped:
+                writer.add(_name_hash(a), a.iter_chunks(raw=True), _ZIPPED_FLAGS[0], a.hash)
+            else:  # empty
+                writer.add(_name_hash(a), [], _UNZIPPED_FLAGS[0], a.hash)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for a in assets:
+                if a.data_length == 0 or (isinstance(a, Asset2) and a.is_zipped):
+                    pending.append((a, None))
                 else:
-                    writer.uint64LE(crc64(a.name))
-
-                writer.uint64LE(data_offset)
-                length = 0
-                flag = 0
-                if isinstance(a, Asset2):
-                    if a.is_zipped:
-                        if raw:
-                            length = a.data_length
-                            flag = _ZIPPED_FLAGS[0]
-                        else:
-                            length = a.unzipped_length
-                            flag = _UNZIPPED_FLAGS[0]
-
-                    else:  # not zipped
-                        length = a.data_length
-                        flag = _UNZIPPED_FLAGS[0]
-
-                else:  # not Asset2
-                    length = a.data_length
-                    flag = _UNZIPPED_FLAGS[0]
-
-                writer.uint64LE(length)
-                writer.uint32LE(flag)
-
-                writer.uint32LE(a.hash)  # PTS doesn't care if the checksums don't match
-
-                # Write data
-                writer.write_to(a.get_data(raw), data_offset)
-                data_offset += length
-
-            pack_length = writer.tell()
-            writer.seek(0x8, 0)
-            writer.uint64LE(pack_length)
-
-    def __init__(self, path: Path, namelist: List[str] = None):
+                    pending.append((a, executor.submit(_zip, bytes(a.get_data(cache=False)), level)))
+
+                while len(pending) > window:
+                    write_next()
+
+            while pending:
+                write_next()
+
+    def __init__(self, path: Path, namelist: List[str] = None, use_mmap: bool = False,
+                 index_cache: 'PackIndexCache' = None, index: Optional[PackIndex] = None):
+        """
+        :param path: pack file to load
+        :param namelist: extra names to resolve asset hashes with
+        :param use_mmap: map the pack once and read assets out of the mapping
+        :param index_cache: reuse the parsed map table and internal namelist from a previous load of an unchanged pack
+        :param index: an index already parsed with Pack2.read_index, e.g. by another process
+        """
         super().__init__(path)
         self._namelist = namelist
+        if use_mmap:
+            self._map()
+
+        cached = False
+        if index is None and index_cache is not None:
+            index = index_cache.load(self.path)
+            cached = index is not None
+        if index is None:
+            index = Pack2.read_index(self.path, self._view)
+
+        self.asset_count = index.asset_count
+        self.length = index.length
+        self.map_offset = index.map_offset
+        self.table = index.table
+        self._is_zipped = index.is_zipped
+        self._unzipped_lengths = index.unzipped_lengths
+        self._internal_names = index.names
+
+        self.raw_assets = {}
+        for name_hash, offset, data_length, hash_, zipped, unzipped_length in zip(
+                self.table['name_hash'].tolist(), self.table['offset'].tolist(), self.table['data_length'].tolist(),
+                self.table['hash'].tolist(), self._is_zipped.tolist(), self._unzipped_lengths.tolist()):
+            asset = Asset2(name_hash=name_hash, hash=hash_, offset=offset, is_zipped=zipped,
+                           data_length=data_length, unzipped_length=unzipped_length, path=self.path,
+                           _view=self._view)
+            self.raw_assets[asset.name_hash] = asset
+
+        self.assets = {}
+        self._update_assets(self._namelist)
 
-        with BinaryStructReader(self.path) as reader:
+        if index_cache is not None and not cached:
+            index_cache.store(self)
+
+    @property
+    def index(self) -> PackIndex:
+        return PackIndex(asset_count=self.asset_count, length=self.length, map_offset=self.map_offset,
+                         table=self.table, is_zipped=self._is_zipped, unzipped_lengths=self._unzipped_lengths,
+                         names=self._internal_names)
+
+    @staticmethod
+    def read_table(path: Path):
+        """
+        Reads only the header and map table, without looking at any asset data.
+        :return: asset_count, length, map_offset and the MAP_ENTRY table
+        """
+        with BinaryStructReader(path) as reader:
             assert reader.read(len(_MAGIC)) == _MAGIC, 'invalid pack2 magic'
-            self.asset_count = reader.uint32LE()
-            self.length = reader.uint64LE()
-            self.map_offset = reader.uint64LE()
-
-            reader.seek(self.map_offset)
-            self.raw_assets = {}
-            for i in range(self.asset_count):
-                name_hash = reader.uint64LE()
-
-                offset = reader.uint64LE()
-                data_length = reader.uint64LE()  # length of stored data
-                zipped_flag = reader.uint32LE()
-                hash = reader.uint32LE()
-
-                if zipped_flag in _ZIPPED_FLAGS and data_length > 0:
-                    pos = reader.tell()
-                    reader.seek(offset)
-                    assert reader.read(len(Asset2.ZIP_MAGIC)) == Asset2.ZIP_MAGIC, 'zip flag mismatch with data header'
-                    is_zipped = True
-                    unzipped_length = reader.uint32BE()
-                    reader.seek(pos)
-                else:
-                    unzipped_length = 0  # This is only used if the asset is zipped
-                    is_zipped = False
+            asset_count = reader.uint32LE()
+            length = reader.uint64LE()
+            map_offset = reader.uint64LE()
 
-                asset = Asset2(name_hash=name_hash, hash=hash, offset=offset, is_zipped=is_zipped,
-                               data_length=data_length, unzipped_length=unzipped_length, path=self.path)
-                self.raw_assets[asset.name_hash] = asset
+            reader.seek(map_offset)
+            table = np.frombuffer(reader.read(asset_count * MAP_ENTRY.itemsize), dtype=MAP_ENTRY)
+            assert len(table) == asset_count, 'truncated asset map'
+        return asset_count, length, map_offset, table
 
-        self.assets = {}
-        self._update_assets(self._namelist)
+    @staticmethod
+    def read_index(path: Path, view: memoryview = None) -> PackIndex:
+        """
+        Parses the header, map table and internal namelist of a pack without building any assets.
+        :param path: pack file to parse
+        :param view: mapping of the pack, if it is already mapped
+        """
+        asset_count, length, map_offset, table = Pack2.read_table(path)
+        is_zipped, unzipped_lengths = Pack2._probe_zip_headers(path, table, view)
+
+        # Check for internal namelist
+        names = {}
+        rows = np.flatnonzero(table['name_hash'] == _NAMELIST_HASH)
+        if len(rows):
+            row = rows[0]
+            namelist = Asset2(name_hash=_NAMELIST_HASH, path=path, offset=int(table['offset'][row]),
+                              data_length=int(table['data_length'][row]), is_zipped=bool(is_zipped[row]), _view=view)
+            namelist = bytes(namelist.get_data(cache=False)).decode('utf-8').strip().split('\n')
+            hashes = crc64_many(namelist)
+            present = np.isin(hashes, table['name_hash'])
+            names = {name_hash: name for name_hash, name, found in zip(hashes.tolist(), namelist, present.tolist())
+                     if found}
+
+        return PackIndex(asset_count=asset_count, length=length, map_offset=map_offset, table=table,
+                         is_zipped=is_zipped, unzipped_lengths=unzipped_lengths, names=names)
+
+    def verify(self, workers: Optional[int] = None,
+               callback: Callable[[int, int], None] = lambda done, total: None,
+               executor: Optional[Executor] = None) -> 'VerifyReport':
+        """
+        Checks every entry against the crc32 in the map table on a process pool, see DbgPack.verify.
+        :param workers: number of processes, defaults to the number of CPUs
+        :param callback: called as callback(entries done, total entries) as batches finish
+        :param executor: process pool to use instead of starting one for this pack
+        """
+        from .verify import verify_pack2
+        return verify_pack2(self.path, self.table, workers, callback,
+                            names={name_hash: asset.name for name_hash, asset in self.raw_assets.items()},
+                            executor=executor)
+
+    @staticmethod
+    def _probe_zip_headers(path: Path, table: np.ndarray, view: memoryview = None):
+        """
+        Reads the zip header of every asset in one pass over a mapping of the pack instead of seeking to each one.
+        :return: is_zipped and unzipped_length arrays in table order
+        """
+        header_length = Asset2.ZIP_HEADER_LENGTH
+        offsets = table['offset'].astype(np.int64)
+        probed = table['data_length'] >= header_length
+        headers = np.zeros((len(table), header_length), dtype=np.uint8)
+
+        if probed.any():
+            file_length = len(view) if view is not None else path.stat().st_size
+            assert (offsets[probed] + header_length <= file_length).all(), 'asset data past the end of the pack'
+            mapping = None
+            if view is None:
+                with path.open('rb') as file:
+                    mapping = mmap(file.fileno(), 0, access=ACCESS_READ)
+                view = memoryview(mapping)
+
+            data = np.frombuffer(view, dtype=np.uint8)
+            headers[probed] = data[offsets[probed, np.newaxis] + np.arange(header_length)]
+            del data
+            if mapping is not None:
+                view.release()
+                mapping.close()
+
+        magic = np.frombuffer(Asset2.ZIP_MAGIC, dtype=np.uint8)
+        is_zipped = probed & (headers[:, :len(magic)] == magic).all(axis=1)
+        flagged = np.isin(table['flag'], _ZIPPED_FLAGS) & (table['data_length'] > 0)
+        assert not (flagged & ~is_zipped).any(), 'zip flag mismatch with data header'
+
+        # This is only used if the asset is zipped
+        unzipped_lengths = np.where(flagged, headers[:, len(magic):].copy().view('>u4')[:, 0], 0)
+        return is_zipped, unzipped_lengths
 
     def _update_assets(self, namelist: List[str] = None):
         name_dict: Dict[int, str] = {}
         used_hashes = []
 
-        # Check for internal namelist
-        if _NAMELIST_HASH in self:
-            names = self.raw_assets[_NAMELIST_HASH].get_data().strip().split(b'\n')
-            for n in names:
-                hash_ = crc64(n)
-                name_dict[hash_] = n.decode('utf-8')
+        # Names from the internal namelist are resolved by read_index
+        name_dict.update(self._internal_names)
 
         # Check for external namelist
         if namelist:
-            for n in namelist:
-                hash_ = crc64(n)
-                name_dict[hash_] = n
+            name_dict.update(zip(crc64_many(namelist).tolist(), namelist))
 
         # Apply names to assets
         for name_hash, name in name_dict.items():
@@ -0,0 +1,135 @@
+from os import replace
+from pathlib import Path
+from struct import Struct
+from typing import Dict, Tuple, Union
+from zlib import crc32
+
+import numpy as np
+
+from .data_cache import data_cache
+from .hash import crc64
+from .pack2 import MAP_ENTRY, Pack2, Pack2Writer, _NAMELIST_HASH, _UNZIPPED_FLAGS, _ZIPPED_FLAGS, _zip
+
+
+class Pack2Editor:
+    """
+    Adds, replaces and removes assets of a pack2 without rewriting the rest of it.
+
+    Changes are staged until commit(), which appends the new data and a new map table to the end of the file and
+    then rewrites the header to point at them. Until the header is rewritten the old table is still intact, so an
+    interrupted commit leaves the pack as it was. Replaced and removed data stays in the file as dead space
+    until compact().
+    """
+    # asset_count, length, map_offset, following the pack2 magic
+    _header = Struct('<IQQ')
+
+    def __init__(self, path: Path, level: int = 6):
+        """
+        :param path: pack to edit
+        :param level: zlib compression level for zipped assets
+        """
+        self.path = Path(path)
+        self.level = level
+        self._load()
+
+    def _load(self):
+        index = Pack2.read_index(self.path)
+        self.length = index.length
+        self.map_offset = index.map_offset
+        self._entries: Dict[int, Tuple[int, int, int, int]] = {
+            name_hash: (offset, data_length, flag, hash_) for name_hash, offset, data_length, flag, hash_ in
+            index.table.tolist()}
+        self._names: Dict[int, str] = dict(index.names)
+        self._staged: Dict[int, Tuple[bytes, int, int]] = {}
+        self._names_changed = False
+        self._dirty = False
+
+    def __contains__(self, item):
+        name_hash = crc64(item) if isinstance(item, str) else item
+        return name_hash in self._entries or name_hash in self._staged
+
+    def add(self, name: str, data: bytes, zipped: bool = True):
+        """
+        Stages an asset, replacing any asset with the same name.
+        """
+        name_hash = crc64(name)
+        if zipped:
+            self._staged[name_hash] = (_zip(data, self.level), _ZIPPED_FLAGS[0], crc32(data))
+        else:
+            self._staged[name_hash] = (bytes(data), _UNZIPPED_FLAGS[0], crc32(data))
+        self._dirty = True
+
+        if self._names.get(name_hash) != name:
+            self._names[name_hash] = name
+            self._names_changed = True
+
+    def remove(self, item: Union[str, int]):
+        """
+        Drops an asset from the map table. Its data becomes dead space.
+        :param item: asset name or name hash
+        """
+        name_hash = crc64(item) if isinstance(item, str) else item
+        if name_hash not in self:
+            raise KeyError(item)
+
+        self._entries.pop(name_hash, None)
+        self._staged.pop(name_hash, None)
+        self._dirty = True
+        if self._names.pop(name_hash, None) is not None:
+            self._names_changed = True
+
+    def commit(self):
+        """
+        Writes the staged changes: new data and map table at the end of the pack, then the header.
+        """
+        if not self._dirty:
+            return
+
+        if self._names_changed:
+            self._names[_NAMELIST_HASH] = '{NAMELIST}'
+            namelist = '\n'.join(sorted(self._names.values())).encode('utf-8')
+            self._staged[_NAMELIST_HASH] = (_zip(namelist, self.level), _ZIPPED_FLAGS[0], crc32(namelist))
+
+        with self.path.open('r+b') as file:
+            file.seek(0, 2)
+            for name_hash, (stored, flag, hash_) in self._staged.items():
+                self._entries[name_hash] = (file.tell(), len(stored), flag, hash_)
+                file.write(stored)
+
+            table = np.array([(name_hash,) + entry for name_hash, entry in self._entries.items()], dtype=MAP_ENTRY)
+            table.sort(order='name_hash')
+            map_offset = file.tell()
+            file.write(table.tobytes())
+            length = file.tell()
+            file.flush()
+
+            file.seek(4)
+            file.write(self._header.pack(len(table), length, map_offset))
+
+        self.length = length
+        self.map_offset = map_offset
+        self._staged.clear()
+        self._names_changed = False
+        self._dirty = False
+
+    @property
+    def dead_space(self) -> int:
+        """
+        Bytes of the pack no longer referenced by the committed map table.
+        """
+        offsets = [offset for offset, data_length, _, _ in self._entries.values() if data_length]
+        data_start = min(offsets + [Pack2Writer.DATA_OFFSET])
+        live = sum(data_length for _, data_length, _, _ in self._entries.values())
+        return self.map_offset - data_start - live
+
+    def compact(self):
+        """
+        Commits, then rewrites the pack without dead space. The new pack replaces the old one only once it is complete.
+        """
+        self.commit()
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        pack = Pack2(self.path)
+        Pack2.export(list(pack.raw_assets.values()), temp_path.name, temp_path.parent, raw=True)
+        replace(temp_path, self.path)
+        data_cache.invalidate(self.path)
+        self._load()
@@ -0,0 +1,42 @@
+from synthetic import write_pack2
+
+from DbgPack import Pack2, Pack2Editor
+
+
+def test_add_replace_remove(tmp_path):
+    path = tmp_path / 'test.pack2'
+    write_pack2(path, {'a.txt': b'first', 'b.txt': b'second', 'c.txt': b'third'})
+
+    editor = Pack2Editor(path)
+    editor.add('a.txt', b'replaced')
+    editor.add('d.txt', b'added' * 100)
+    editor.add('e.txt', b'stored', zipped=False)
+    editor.remove('b.txt')
+    editor.commit()
+
+    pack = Pack2(path)
+    assert len(pack) == 5  # a, c, d, e and the namelist
+    assert pack['a.txt'].get_data() == b'replaced'
+    assert pack['c.txt'].get_data() == b'third'
+    assert pack['d.txt'].get_data() == b'added' * 100
+    assert pack['d.txt'].is_zipped
+    assert pack['e.txt'].get_data() == b'stored'
+    assert 'b.txt' not in pack
+    assert editor.dead_space > 0
+
+
+def test_compact(tmp_path):
+    path = tmp_path / 'test.pack2'
+    write_pack2(path, {'a.txt': b'first' * 100, 'b.txt': b'second'})
+
+    editor = Pack2Editor(path)
+    editor.add('a.txt', b'replaced')
+    editor.commit()
+    size = path.stat().st_size
+    editor.compact()
+
+    assert path.stat().st_size < size
+    assert editor.dead_space == 0
+    pack = Pack2(path)
+    assert pack['a.txt'].get_data() == b'replaced'
+    assert pack['b.txt'].get_data() == b'second'
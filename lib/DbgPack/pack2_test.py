@@ -0,0 +1,91 @@
+from zlib import crc32
+
+import numpy as np
+import pytest
+from synthetic import make_pack2
+
+from DbgPack import Pack2, Pack2Writer
+from DbgPack.hash import crc64
+from DbgPack.pack2 import _zip
+
+
+def test_mmap_reads_match(tmp_path):
+    for zipped in (True, False):
+        path = tmp_path / f'synthetic_{zipped}.pack2'
+        names = make_pack2(path, 20, 3000, zipped=zipped)
+        plain, mapped = Pack2(path), Pack2(path, use_mmap=True)
+        for name in names:
+            for raw in (False, True):
+                assert bytes(mapped[name].get_data(raw, cache=False)) == plain[name].get_data(raw, cache=False)
+        mapped.close()
+
+
+def test_close_releases_map(tmp_path):
+    path = tmp_path / 'synthetic.pack2'
+    names = make_pack2(path, 5, 1000, zipped=False)
+    pack = Pack2(path, use_mmap=True)
+    data = bytes(pack[names[0]].get_data())
+    mapping = pack._mmap
+
+    pack.close()
+    assert mapping.closed
+    assert pack._mmap is None and pack._view is None
+    assert all(asset._view is None for asset in pack)
+    # Assets fall back to reading the file
+    assert pack[names[0]].get_data() == data
+
+
+def test_writer(tmp_path):
+    path = tmp_path / 'written.pack2'
+    entries = {'b.txt': (b'stored', 0x10), 'a.txt': (_zip(b'zipped' * 100, 6), 0x01), 'empty.txt': (b'', 0x10)}
+    with Pack2Writer(path) as writer:
+        for name, (stored, flag) in entries.items():
+            writer.add(crc64(name), [stored[:3], stored[3:]], flag, crc32(stored))
+
+    pack = Pack2(path, namelist=list(entries))
+    assert len(pack) == 3
+    assert list(pack.table['name_hash']) == sorted(crc64(name) for name in entries)
+    assert pack.map_offset == 0x200 + sum(len(stored) for stored, _ in entries.values())
+    assert pack.length == path.stat().st_size == pack.map_offset + 3 * 32
+    for name, (stored, flag) in entries.items():
+        row = pack.table[pack.table['name_hash'] == crc64(name)][0]
+        assert (row['flag'], row['hash']) == (flag, crc32(stored))
+        assert bytes(pack[name].get_data(raw=True)) == stored
+    assert pack['a.txt'].get_data() == b'zipped' * 100
+
+
+def test_export_compress(tmp_path):
+    names = make_pack2(tmp_path / 'source.pack2', 30, 2000)
+    source = Pack2(tmp_path / 'source.pack2')
+    Pack2.export(list(source.raw_assets.values()), 'unzipped.pack2', tmp_path, raw=False)
+    unzipped = Pack2(tmp_path / 'unzipped.pack2')
+    Pack2.export(list(unzipped.raw_assets.values()), 'compressed.pack2', tmp_path, raw=False, compress=True, workers=2)
+    compressed = Pack2(tmp_path / 'compressed.pack2')
+
+    assert set(unzipped.table['flag'].tolist()) == {0x10}
+    assert set(compressed.table['flag'].tolist()) == {0x01}
+    for pack in (unzipped, compressed):
+        assert np.array_equal(pack.table['name_hash'], source.table['name_hash'])
+        assert np.array_equal(pack.table['hash'], source.table['hash'])
+        for name in names + ['{NAMELIST}']:
+            data = pack[name].get_data(cache=False)
+            assert data == source[name].get_data(cache=False)
+            assert crc32(data) == pack[name].hash
+    assert all(asset.is_zipped for asset in compressed.raw_assets.values())
+    assert compressed.length < unzipped.length
+
+
+def test_offset_past_end(tmp_path):
+    path = tmp_path / 'truncated.pack2'
+    make_pack2(path, 5, 1000)
+    pack = Pack2(path)
+    assert pack == Pack2(path)
+
+    # Point the last entry just short of the end of the file, leaving no room for its zip header
+    data = bytearray(path.read_bytes())
+    entry = pack.map_offset + (pack.asset_count - 1) * 32
+    data[entry + 8:entry + 16] = (len(data) - 4).to_bytes(8, 'little')
+    path.write_bytes(bytes(data))
+    for use_mmap in (False, True):
+        with pytest.raises(AssertionError, match='past the end'):
+            Pack2(path, use_mmap=use_mmap)
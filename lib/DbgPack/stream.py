@@ -0,0 +1,41 @@
+from io import BufferedReader, RawIOBase
+from typing import Iterator
+
+# Bytes read from a pack, and produced by zlib, per step when streaming an asset
+CHUNK_SIZE = 1 << 20
+# Chunk size used when only the start of an asset is needed
+PEEK_SIZE = 1 << 12
+
+
+class ChunkReader(RawIOBase):
+    """
+    Read-only file object over an iterator of byte chunks, so streamed assets can be passed to code expecting a file.
+    """
+
+    def __init__(self, chunks: Iterator[bytes]):
+        super().__init__()
+        self._chunks = chunks
+        self._chunk = memoryview(b'')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._chunk:
+            try:
+                self._chunk = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+
+        length = min(len(buffer), len(self._chunk))
+        buffer[:length] = self._chunk[:length]
+        self._chunk = self._chunk[length:]
+        return length
+
+    def close(self):
+        self._chunks = iter(())
+        super().close()
+
+
+def open_chunks(chunks: Iterator[bytes], buffer_size: int = CHUNK_SIZE) -> BufferedReader:
+    return BufferedReader(ChunkReader(chunks), buffer_size=buffer_size)
@@ -0,0 +1,109 @@
+import struct
+
+from synthetic import make_pack1, make_pack2, write_pack2
+
+from DbgPack import AssetManager, Pack1, Pack2, data_cache
+
+# Smaller than the 8 byte zip header, around it and larger than whole assets
+CHUNK_SIZES = [1, 3, 7, 8, 9, 100, 4096, 1 << 20]
+
+
+def assert_streams_match(asset):
+    for raw in (False, True):
+        expected = bytes(asset.get_data(raw, cache=False))
+        for chunk_size in CHUNK_SIZES:
+            chunks = [bytes(chunk) for chunk in asset.iter_chunks(raw, chunk_size)]
+            assert b''.join(chunks) == expected
+            assert all(0 < len(chunk) <= chunk_size for chunk in chunks)
+        with asset.open(raw) as file:
+            assert file.read() == expected
+        with asset.open(raw) as file:
+            assert b''.join(iter(lambda: file.read(5), b'')) == expected
+
+
+def make_edge_pack(path):
+    """
+    Empty assets, data that inflates far past a chunk from a few stored bytes, and a zip stream shorter than a chunk
+    """
+    assets = {'empty.bin': b'', 'zeros.bin': bytes(300_000), 'tiny.bin': b'x', 'stored.bin': b'stored' * 50}
+    write_pack2(path, assets, zipped={'zeros.bin', 'tiny.bin'}, level=9)
+    return list(assets)
+
+
+def test_pack2_streams(tmp_path):
+    for zipped in (True, False):
+        path = tmp_path / f'synthetic_{zipped}.pack2'
+        names = make_pack2(path, 5, 5000, zipped=zipped)
+        for use_mmap in (False, True):
+            pack = Pack2(path, use_mmap=use_mmap)
+            for name in names:
+                assert_streams_match(pack[name])
+            pack.close()
+
+    path = tmp_path / 'edge.pack2'
+    names = make_edge_pack(path)
+    for use_mmap in (False, True):
+        pack = Pack2(path, use_mmap=use_mmap)
+        for name in names:
+            assert_streams_match(pack[name])
+        assert pack['zeros.bin'].is_zipped and list(pack['empty.bin'].iter_chunks()) == []
+        pack.close()
+
+
+def test_pack1_and_loose_streams(tmp_path):
+    names = make_pack1(tmp_path / 'synthetic.pack', 5, 5000)
+    for use_mmap in (False, True):
+        pack = Pack1(tmp_path / 'synthetic.pack', use_mmap=use_mmap)
+        for name in names:
+            assert_streams_match(pack[name])
+        pack.close()
+
+    loose = tmp_path / 'loose'
+    loose.mkdir()
+    (loose / 'empty.txt').write_bytes(b'')
+    (loose / 'data.txt').write_bytes(b'loose data' * 100)
+    manager = AssetManager([loose])
+    for name in ('empty.txt', 'data.txt'):
+        assert_streams_match(manager[name])
+
+
+def old_export(assets, raw):
+    """
+    What Pack2.export wrote before streaming: the header, zeros up to 0x200, the data of every asset
+    in name hash order and the map table after it.
+    """
+    assets = sorted(assets, key=lambda a: a.name_hash)
+    data, table = b'', b''
+    for a in assets:
+        zipped = raw and a.is_zipped
+        stored = bytes(a.get_data(raw, cache=False))
+        table += struct.pack('<QQQII', a.name_hash, 0x200 + len(data), len(stored), 0x01 if zipped else 0x10, a.hash)
+        data += stored
+    length = 0x200 + len(data) + len(table)
+    header = b'PAK\x01' + struct.pack('<IQQQ', len(assets), length, 0x200 + len(data), 256)
+    return header.ljust(0x200, b'\x00') + data + table
+
+
+def test_export_matches_old_output(tmp_path):
+    make_pack2(tmp_path / 'synthetic.pack2', 20, 3000)
+    make_edge_pack(tmp_path / 'edge.pack2')
+    for source in ('synthetic.pack2', 'edge.pack2'):
+        assets = list(Pack2(tmp_path / source).raw_assets.values())
+        for raw in (False, True):
+            Pack2.export(assets, 'export.pack2', tmp_path / 'out', raw)
+            assert (tmp_path / 'out' / 'export.pack2').read_bytes() == old_export(assets, raw)
+
+
+def test_save_matches_data(tmp_path, monkeypatch):
+    names = make_edge_pack(tmp_path / 'edge.pack2')
+    manager = AssetManager([tmp_path / 'edge.pack2'], namelist=names)
+    out = tmp_path / 'out'
+    out.mkdir()
+    monkeypatch.chdir(out)
+    data_cache.clear()
+    for name in names:
+        expected = bytes(manager[name].get_data())
+        assert manager.save_raw_as(name, str(out / ('raw_' + name)))
+        assert (out / ('raw_' + name)).read_bytes() == expected
+        manager.save(name)
+        assert (out / name).read_bytes() == expected
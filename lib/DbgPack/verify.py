@@ -0,0 +1,236 @@
+"""
+Checks every entry of a set of packs against the crc32 recorded in its map table.
+
+    python -m DbgPack.verify <assets dir or packs...> [--workers N]
+"""
+import json
+import sys
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from mmap import mmap, ACCESS_READ
+from os import cpu_count
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+from zlib import crc32, decompressobj, error as ZlibError
+
+import numpy as np
+
+from .asset2 import Asset2
+from .pack2 import Pack2, _ZIPPED_FLAGS, _UNZIPPED_FLAGS
+from .stream import CHUNK_SIZE
+
+BATCH_BYTES = 64 << 20  # stored bytes handed to a worker at once
+BATCH_ENTRIES = 4096
+
+# name_hash, offset, data_length, flag, hash
+Entry = Tuple[int, int, int, int, int]
+
+
+@dataclass
+class EntryProblem:
+    path: Path
+    name_hash: int
+    kind: str  # 'checksum', 'length', 'truncated', 'corrupt' or 'flag'
+    detail: str
+    name: str = ''
+
+    def to_json(self) -> Dict[str, str]:
+        return {'pack': str(self.path), 'name': self.name or f'0x{self.name_hash:016x}', 'kind': self.kind,
+                'detail': self.detail}
+
+
+@dataclass
+class VerifyReport:
+    entries: int = 0
+    bytes_read: int = 0
+    seconds: float = 0.0
+    problems: List[EntryProblem] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes_read / (1 << 20) / self.seconds if self.seconds else 0.0
+
+    def merge(self, other: 'VerifyReport'):
+        self.entries += other.entries
+        self.bytes_read += other.bytes_read
+        self.seconds += other.seconds
+        self.problems.extend(other.problems)
+
+    def to_json(self) -> dict:
+        return {'entries': self.entries, 'bytes': self.bytes_read, 'seconds': round(self.seconds, 3),
+                'mb_per_second': round(self.mb_per_second, 1), 'problems': [p.to_json() for p in self.problems]}
+
+
+def _unzipped_crc(stored: memoryview) -> Tuple[int, int, bool]:
+    """
+    Decompresses a zip payload chunk by chunk, keeping only the running crc32.
+    :return: crc32 and length of the unzipped data, and whether the zlib stream was complete
+    """
+    checksum, length = 0, 0
+    decompressor = decompressobj()
+    for position in range(0, len(stored), CHUNK_SIZE):
+        chunk = stored[position:position + CHUNK_SIZE]
+        while chunk:
+            data = decompressor.decompress(chunk, CHUNK_SIZE)
+            checksum = crc32(data, checksum)
+            length += len(data)
+            chunk = decompressor.unconsumed_tail
+        if decompressor.eof:
+            break
+    while not decompressor.eof:
+        # Output still buffered in zlib after the last input, or a stream cut short
+        data = decompressor.decompress(b'', CHUNK_SIZE)
+        if not data:
+            break
+        checksum = crc32(data, checksum)
+        length += len(data)
+    return checksum, length, decompressor.eof
+
+
+def _check_entry(view: memoryview, entry: Entry) -> List[Tuple[str, str]]:
+    """
+    :return: (kind, detail) of every problem found with one entry
+    """
+    _, offset, data_length, flag, expected = entry
+    end = offset + data_length
+    if end > len(view):
+        return [('truncated', f'entry ends at {end} but the pack is {len(view)} bytes')]
+
+    problems = []
+    stored = view[offset:end]
+    zipped = data_length >= Asset2.ZIP_HEADER_LENGTH and stored[:len(Asset2.ZIP_MAGIC)] == Asset2.ZIP_MAGIC
+    if flag in _ZIPPED_FLAGS and not zipped:
+        problems.append(('flag', f'flag 0x{flag:02x} marks the entry zipped but it has no zip header'))
+    elif flag in _UNZIPPED_FLAGS and zipped:
+        problems.append(('flag', f'flag 0x{flag:02x} marks the entry unzipped but it has a zip header'))
+    elif flag not in _ZIPPED_FLAGS and flag not in _UNZIPPED_FLAGS:
+        problems.append(('flag', f'unknown flag 0x{flag:02x}'))
+
+    if zipped:
+        unzipped_length = int.from_bytes(stored[len(Asset2.ZIP_MAGIC):Asset2.ZIP_HEADER_LENGTH], 'big')
+        try:
+            checksum, length, complete = _unzipped_crc(stored[Asset2.ZIP_HEADER_LENGTH:])
+        except ZlibError as e:
+            return problems + [('corrupt', f'zlib: {e}')]
+        if not complete:
+            return problems + [('truncated', 'zlib stream ends early')]
+        if length != unzipped_length:
+            problems.append(('length', f'zip header says {unzipped_length} bytes, unzipped {length}'))
+    else:
+        checksum = crc32(stored)
+
+    if checksum != expected:
+        problems.append(('checksum', f'crc32 is 0x{checksum:08x}, table says 0x{expected:08x}'))
+    return problems
+
+
+def verify_entries(path: Path, entries: List[Entry]) -> Tuple[List[Tuple[int, str, str]], int]:
+    """
+    Checks a batch of entries of one pack. Runs in the worker processes of verify_pack2.
+    :return: (name_hash, kind, detail) of every problem, and the number of stored bytes read
+    """
+    problems = []
+    with Path(path).open('rb') as file, mmap(file.fileno(), 0, access=ACCESS_READ) as mapping:
+        view = memoryview(mapping)
+        try:
+            for entry in entries:
+                problems.extend((entry[0], kind, detail) for kind, detail in _check_entry(view, entry))
+        finally:
+            view.release()
+        bytes_read = sum(min(entry[2], max(len(mapping) - entry[1], 0)) for entry in entries)
+    return problems, bytes_read
+
+
+def _batches(entries: List[Entry]):
+    batch, size = [], 0
+    for entry in entries:
+        batch.append(entry)
+        size += entry[2]
+        if size >= BATCH_BYTES or len(batch) >= BATCH_ENTRIES:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def verify_pack2(path: Path, table: np.ndarray, workers: Optional[int] = None,
+                 callback: Callable[[int, int], None] = lambda done, total: None,
+                 names: Optional[Dict[int, str]] = None, executor: Optional[Executor] = None) -> VerifyReport:
+    """
+    Checksums every entry of a pack on a process pool, in batches so only a few are in flight at once.
+    Only the map table is needed, so packs too damaged for Pack2 to load can still be checked.
+    :param table: MAP_ENTRY table of the pack, e.g. from Pack2.read_table
+    :param workers: number of processes, defaults to the number of CPUs
+    :param callback: called as callback(entries done, total entries) after each batch
+    :param names: asset names by name hash, for the report
+    :param executor: process pool of workers processes to use, shared when verifying many packs.
+                     By default one is started for this pack
+    """
+    entries = list(zip(*(table[column].tolist() for column in ('name_hash', 'offset', 'data_length', 'flag', 'hash'))))
+    names = names or {}
+    report = VerifyReport(entries=len(entries))
+    window = 2 * (workers or cpu_count() or 1)
+    pending = deque()
+    done = 0
+
+    def collect():
+        nonlocal done
+        count, future = pending.popleft()
+        problems, bytes_read = future.result()
+        report.bytes_read += bytes_read
+        report.problems.extend(EntryProblem(path, name_hash, kind, detail, names.get(name_hash, ''))
+                               for name_hash, kind, detail in problems)
+        done += count
+        callback(done, len(entries))
+
+    start = perf_counter()
+    with nullcontext(executor) if executor is not None else ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch in _batches(entries):
+            pending.append((len(batch), executor.submit(verify_entries, path, batch)))
+            while len(pending) > window:
+                collect()
+        while pending:
+            collect()
+    report.seconds = perf_counter() - start
+    return report
+
+
+def main():
+    parser = ArgumentParser(description='Check pack entries against their recorded crc32, printing a JSON report')
+    parser.add_argument('paths', type=Path, nargs='+', help='pack2 files or directories of them')
+    parser.add_argument('--workers', type=int, help='checksum processes, defaults to the number of CPUs')
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        paths.extend(sorted(path.glob('*.pack2')) if path.is_dir() else [path])
+
+    report = VerifyReport()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for path in paths:
+            try:
+                pack = Pack2(path)
+            except (AssertionError, IndexError):
+                # Damaged past what Pack2 can load, check what the map table still describes
+                pack_report = verify_pack2(path, Pack2.read_table(path)[3], args.workers, executor=executor)
+            else:
+                pack_report = pack.verify(args.workers, executor=executor)
+                pack.close()
+            sys.stderr.write(f'{path.name}: {pack_report.entries} entries, {len(pack_report.problems)} problems, '
+                             f'{pack_report.mb_per_second:.1f} MB/s\n')
+            report.merge(pack_report)
+    json.dump(report.to_json(), sys.stdout, indent=2)
+    sys.stdout.write('\n')
+    sys.exit(0 if report.ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+from zlib import crc32
+
+from synthetic import pack2_entry, write_pack2
+
+from DbgPack import AssetManager, Pack2, verify
+from DbgPack.hash import crc64
+from DbgPack.pack2 import _zip
+from DbgPack.verify import verify_pack2
+
+
+def test_clean_pack(tmp_path):
+    path = tmp_path / 'clean.pack2'
+    write_pack2(path, {'a.txt': pack2_entry(b'alpha' * 1000, zipped=True), 'b.txt': b'stored', 'empty.txt': b''})
+    report = Pack2(path).verify(workers=1)
+    assert report.ok
+    assert report.entries == 3
+    assert report.bytes_read > 0
+
+
+def test_reports_problems(tmp_path):
+    path = tmp_path / 'damaged.pack2'
+    zipped = _zip(b'beta' * 1000, 6)
+    write_pack2(path, {'bad_crc.txt': (b'stored', 0x10, crc32(b'other')),
+                     'bad_flag.txt': (b'plain', 0x01, crc32(b'plain')),
+                     'bad_length.txt': (zipped[:4] + (1).to_bytes(4, 'big') + zipped[8:], 0x01, crc32(b'beta' * 1000)),
+                     'cut.txt': (zipped[:len(zipped) // 2], 0x01, crc32(b'beta' * 1000))})
+
+    report = verify_pack2(path, Pack2.read_table(path)[3], workers=1)
+    kinds = {problem.name_hash: problem.kind for problem in report.problems}
+    assert kinds == {crc64('bad_crc.txt'): 'checksum', crc64('bad_flag.txt'): 'flag',
+                     crc64('bad_length.txt'): 'length', crc64('cut.txt'): 'truncated'}
+
+
+def test_truncated_file(tmp_path):
+    path = tmp_path / 'cut.pack2'
+    write_pack2(path, {'a.txt': b'x' * 4096})
+    table = Pack2.read_table(path)[3]
+    with path.open('r+b') as file:
+        file.truncate(0x200 + 100)
+
+    report = verify_pack2(path, table, workers=1)
+    assert [problem.kind for problem in report.problems] == ['truncated']
+
+
+def test_manager_shares_one_pool(tmp_path, monkeypatch):
+    paths = []
+    for i in range(3):
+        paths.append(tmp_path / f'{i}.pack2')
+        write_pack2(paths[-1], {f'{i}.txt': (b'stored', 0x10, crc32(b'stored' if i else b'other'))})
+    started = []
+    start_pool = verify.ProcessPoolExecutor.__init__
+    monkeypatch.setattr(verify.ProcessPoolExecutor, '__init__',
+                        lambda self, *args, **kwargs: started.append(args) or start_pool(self, *args, **kwargs))
+
+    report = AssetManager(paths).verify(workers=1)
+    assert len(started) == 1
+    assert report.entries == 3
+    assert [problem.name_hash for problem in report.problems] == [crc64('0.txt')]
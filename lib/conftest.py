@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests build their packs with the same generators as the benchmarks
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
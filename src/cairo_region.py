@@ -22,6 +22,7 @@ class CairoRegion(Region):
     def __init__(
             self, 
             id: int = 0,
+            facility_id: int = 0,
             zone_id: int = ZoneID.INDAR,
             facility_type_id: int = FacilityTypes.UNKNOWN,
             name: str = None, 
@@ -31,7 +32,7 @@ class CairoRegion(Region):
             connections: List[int] = [],
             color: FactionColors = FactionColors.VS
             ):
-        super().__init__(id, zone_id, facility_type_id, name, hex_tuples, hexes, location, connections, color)
+        super().__init__(id, facility_id, zone_id, facility_type_id, name, hex_tuples, hexes, location, connections, color)
     
     def draw_outline(self, context: cairo.Context, offset_x = 0, offset_y = 0, transform_fn = Map.world_to_map):
         context.save()
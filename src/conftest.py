@@ -0,0 +1,18 @@
+import progressbar
+import pytest
+
+from extract_tiles import LoadingBar
+
+
+@pytest.fixture
+def quiet_bar(monkeypatch):
+    """
+    Replaces the progress bars of the scripts with ones that draw nothing. progressbar's global stream state breaks
+    bars drawn by a second test in the same session.
+    """
+    def callback(self, index, total, path):
+        if self.loading_bar is None:
+            self.loading_bar = progressbar.NullBar(max_value=total)
+        return True
+
+    monkeypatch.setattr(LoadingBar, "callback", callback)
@@ -19,6 +19,7 @@ from auraxium import ps2
 
 from cube_hex import CubeHex
 from cairo_region import CairoRegion as Region
+from map_region import regions_from_census
 from map import Map
 from path_drawer import pathContext
 
@@ -78,47 +79,7 @@ async def main():
                     print("Could not find Oshur data in cache and Oshur is not implemented in Census ¯\\_(ツ)_/¯", file=sys.stderr)
                     continue
     
-            facilities: Dict[int, Region] = {}
-            for map_region in data["map_region_list"]:
-                map_region_id = int(map_region["map_region_id"])
-                if "facility_id" not in map_region:
-                    facility_id = map_region_id
-                    print(map_region["facility_name"])
-                    print(map_region_id)
-                else:
-                    facility_id = int(map_region["facility_id"])
-                if "location_x" in map_region:
-                    location = (float(map_region["location_x"]), float(map_region["location_z"]))
-                elif map_region["facility_name"] == "Berjess Overlook":
-                    location = (-2032.33, -92.78)
-                elif map_region["facility_name"] == "Sunken Relay Station":
-                    location = (1423.7, 2631.84)
-                elif map_region["facility_name"] == "Lowland Trading Post":
-                    location = (601.596, -2408.15)
-                else:
-                    location = tuple()
-                
-                if "facility_links" in map_region:
-                    connections = [int(link["map_region"]["map_region_id"]) for link in map_region["facility_links"]]
-                else:
-                    connections = []
-                
-                if "facility_type_id" not in map_region:
-                    map_region["facility_type_id"] = FacilityTypes.UNKNOWN
-
-                facilities[map_region_id] = Region(
-                    map_region_id,
-                    facility_id=facility_id,
-                    zone_id=id,
-                    facility_type_id=int(map_region["facility_type_id"]),
-                    name = map_region["facility_name"],
-                    location = location,
-                    connections = connections,
-                    hexes = [CubeHex.from_axial_rs(-int(hex["y"]) - 1, -int(hex["x"])) for hex in map_region["map_hexes"]],
-                    color=FactionColors.TR
-                )
-
-            
+            facilities = regions_from_census(data, id, Region, FactionColors.TR)
             zones[name] = facilities
 
         Path(f"..{os.path.sep}svg").mkdir(exist_ok=True)
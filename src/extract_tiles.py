@@ -0,0 +1,377 @@
+"""
+Extracts the map tiles of a continent from the game's packs as PNGs, in the tiles/<continent>/<zoom>/tile_x_y.png layout
+or into a single MBTiles-style archive.
+
+    python extract_tiles.py "<PlanetSide 2>/Resources/Assets" Oshur --lods 0 3 --output ../tiles/oshur
+    python extract_tiles.py "<PlanetSide 2>/Resources/Assets" Oshur --archive ../tiles/oshur.mbtiles
+"""
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha1
+from io import BytesIO
+import json
+import os
+from queue import Queue
+import sys
+from threading import Thread
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pathlib import Path, PosixPath
+import numpy as np
+import progressbar
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lib"))
+from DbgPack import AssetManager
+from DbgPack.hash import crc64_many
+
+from tile_archive import TileArchive, TileDirectory
+from tile_coords import MAX_LOD, TILE_GRID_MAX, TILE_GRID_MIN, lod_zoom, tile_name, tile_xy
+from tile_pyramid import PyramidBuilder
+
+TILE_FORMAT = "{}_Tile_{:03d}_{:03d}_LOD{:d}.dds"
+TILE_RANGE = range(TILE_GRID_MIN, TILE_GRID_MAX + 1)
+
+
+class LoadingBar:
+    def __init__(self) -> None:
+        self.loading_bar = None
+
+    def callback(self, index, total, path: PosixPath):
+        widgets = [progressbar.GranularBar(), '    ', progressbar.FormatLabel("{variables.path:35.35}", new_style=True)]
+        if self.loading_bar is None:
+            self.loading_bar = progressbar.ProgressBar(max_value=total, max_width=80, widgets=widgets, variables={"path": path.name})
+        self.loading_bar.update(index + 1, path=str(path.name))
+        return True
+
+    def finish(self):
+        self.loading_bar.finish()
+        self.loading_bar = None
+
+
+class TileManifest:
+    """
+    Records where each extracted tile came from and what was written, so later runs can skip tiles whose source
+    entry is unchanged and whose file is intact. It is saved every few tiles, letting an interrupted run resume.
+    """
+    VERSION = 1
+    SAVE_EVERY = 256
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tiles: Dict[str, dict] = {}
+        self._unsaved = 0
+        try:
+            manifest = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return
+        if manifest.get("version") == self.VERSION:
+            self.tiles = manifest["tiles"]
+
+    @staticmethod
+    def source(asset) -> dict:
+        return {"pack": asset.path.name, "name_hash": "0x{:016x}".format(asset.name_hash), "crc": asset.hash}
+
+    def is_current(self, key: str, source: dict, stored: Optional[bytes]) -> bool:
+        """
+        :param stored: the tile as currently written, None if it is missing
+        """
+        entry = self.tiles.get(key)
+        if entry is None or stored is None or any(entry.get(field) != value for field, value in source.items()):
+            return False
+        return sha1(stored).hexdigest() == entry["digest"]
+
+    def record(self, key: str, source: dict, data: bytes):
+        self.tiles[key] = dict(source, digest=sha1(data).hexdigest())
+        self._unsaved += 1
+        if self._unsaved >= self.SAVE_EVERY:
+            self.save()
+
+    def save(self):
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        temp_path.write_text(json.dumps({"version": self.VERSION, "tiles": self.tiles}, indent=1, sort_keys=True))
+        os.replace(temp_path, self.path)
+        self._unsaved = 0
+
+
+def find_tiles(manager: AssetManager, continent: str, lods: range) -> List[Tuple[int, int, int, int]]:
+    """
+    Hashes every candidate tile name at once and keeps those present in the manager's hash table,
+    instead of looking each name up separately.
+    :return: (x, z, lod, name_hash) of the tiles that exist, ordered by lod, x then z
+    """
+    grid = [(x, z, lod) for lod in lods for x in TILE_RANGE for z in TILE_RANGE]
+    hashes = crc64_many([TILE_FORMAT.format(continent, x, z, lod) for x, z, lod in grid])
+    known = np.fromiter(manager.raw_assets.keys(), dtype=np.uint64, count=len(manager.raw_assets))
+    present = np.flatnonzero(np.isin(hashes, known))
+    return [grid[i] + (int(hashes[i]),) for i in present.tolist()]
+
+
+def encode_tile(asset) -> bytes:
+    """
+    Runs in the worker processes: reads the DDS, decodes it, flips it and encodes it as PNG
+    """
+    image = Image.open(BytesIO(asset.get_data(cache=False)))
+    image = image.transpose(Image.FLIP_TOP_BOTTOM)
+    output = BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def decode_tile(asset) -> np.ndarray:
+    """
+    Runs in the worker processes: reads the DDS, decodes it and flips it
+    """
+    image = Image.open(BytesIO(asset.get_data(cache=False)))
+    return np.asarray(image.transpose(Image.FLIP_TOP_BOTTOM))
+
+
+def encode_array(tile: np.ndarray) -> bytes:
+    """
+    Runs in the worker processes: encodes a decoded or downsampled tile as PNG
+    """
+    output = BytesIO()
+    Image.fromarray(tile).save(output, format="PNG")
+    return output.getvalue()
+
+
+def write_tiles(queue: Queue, store, manifest: Optional[TileManifest], errors: List[Exception]):
+    """
+    Writer of the pipeline: saves (z, x, y, png, manifest key, source) items until it receives None.
+    A tile is only recorded in the manifest once it is written.
+    If writing fails, the error is added to errors and later items are discarded, so producers never block on a full
+    queue. Producers check errors with put_tile and the caller raises it.
+    """
+    while True:
+        item = queue.get()
+        if item is None:
+            if manifest is not None:
+                try:
+                    manifest.save()
+                except Exception as e:
+                    errors.append(e)
+            return
+        if errors:
+            continue
+        z, x, y, data, key, source = item
+        try:
+            store.write_tile(z, x, y, data)
+            if manifest is not None:
+                manifest.record(key, source, data)
+        except Exception as e:
+            errors.append(e)
+
+
+def put_tile(queue: Queue, item: tuple, errors: List[Exception]):
+    """
+    Hands an item to write_tiles, raising its error instead if it has failed
+    """
+    if errors:
+        raise errors[0]
+    queue.put(item)
+
+
+def extract_tiles(manager: AssetManager, tiles: List[Tuple[int, int, int, int]], store, workers: int = None,
+                  callback: Callable = lambda index, total, path: True,
+                  manifest: Optional[TileManifest] = None) -> int:
+    """
+    Tiles are decoded and encoded on a process pool and written by a separate thread. Only a few tiles per
+    worker are in flight, and results are collected in order so progress still moves forward.
+    Tiles go straight to their final z/x/y, so no renaming pass is needed afterwards.
+    :param tiles: (x, z, lod, name_hash) from find_tiles
+    :param store: TileDirectory or TileArchive to write to
+    :param callback: called as callback(index, total, path) as each tile is saved
+    :param manifest: skip tiles it lists as current, and record the ones written
+    :return: number of tiles written
+    """
+    jobs = []
+    for x, z, lod, name_hash in tiles:
+        asset = manager.raw_assets[name_hash]
+        zoom, (tile_x, tile_y) = lod_zoom(lod), tile_xy(x, z, lod)
+        key = f"{zoom}/{tile_name(tile_x, tile_y)}"
+        source = TileManifest.source(asset)
+        if manifest is None or not manifest.is_current(key, source, store.get_tile(zoom, tile_x, tile_y)):
+            jobs.append((asset, zoom, tile_x, tile_y, key, source))
+    if not jobs:
+        return 0
+
+    queue = Queue(maxsize=64)
+    errors = []
+    writer = Thread(target=write_tiles, args=(queue, store, manifest, errors))
+    writer.start()
+    pending = deque()
+
+    def collect():
+        index, zoom, tile_x, tile_y, key, source, future = pending.popleft()
+        put_tile(queue, (zoom, tile_x, tile_y, future.result(), key, source), errors)
+        callback(index, len(jobs), Path(key))
+
+    try:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            window = 4 * workers
+            for index, (asset, zoom, tile_x, tile_y, key, source) in enumerate(jobs):
+                pending.append((index, zoom, tile_x, tile_y, key, source, executor.submit(encode_tile, asset)))
+                while len(pending) > window:
+                    collect()
+            while pending:
+                collect()
+    finally:
+        queue.put(None)
+        writer.join()
+    if errors:
+        raise errors[0]
+    return len(jobs)
+
+
+def extract_pyramid(manager: AssetManager, continent: str, store, zooms: range, workers: int = None,
+                    callback: Callable = lambda index, total, path: True) -> int:
+    """
+    Decodes only LOD0 and builds the other zoom levels from it with a 2x2 box filter, streaming one row of LOD0
+    tiles at a time. Zoom levels deeper than LOD0 are scaled up from it, so zooms are not limited to those shipped.
+    Decoding and encoding run on a process pool, the next row is decoded while the current one is downsampled.
+    :param zooms: zoom levels to write
+    :param callback: called as callback(index, total, path) as each row of LOD0 is done
+    :return: number of tiles written
+    """
+    rows = {}
+    for x, z, lod, name_hash in find_tiles(manager, continent, range(1)):
+        tile_x, tile_y = tile_xy(x, z, lod)
+        rows.setdefault(tile_y, {})[tile_x] = manager.raw_assets[name_hash]
+    if not rows or not zooms:
+        return 0
+
+    finest = lod_zoom(0)
+    queue = Queue(maxsize=64)
+    errors = []
+    writer = Thread(target=write_tiles, args=(queue, store, None, errors))
+    writer.start()
+    pending = deque()
+    written = 0
+
+    try:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            window = 4 * workers
+
+            def emit(z, x, y, tile):
+                nonlocal written
+                if z not in zooms:
+                    return
+                pending.append((z, x, y, executor.submit(encode_array, tile)))
+                written += 1
+                while len(pending) > window:
+                    z, x, y, future = pending.popleft()
+                    put_tile(queue, (z, x, y, future.result(), None, None), errors)
+
+            def decode_row(y):
+                return {x: executor.submit(decode_tile, asset) for x, asset in rows[y].items()}
+
+            builder = PyramidBuilder(finest, min(zooms.start, finest), emit, max(zooms.stop - 1 - finest, 0))
+            ys = sorted(rows)
+            decoding = decode_row(ys[0])
+            for index, y in enumerate(ys):
+                row, decoding = decoding, decode_row(ys[index + 1]) if index + 1 < len(ys) else None
+                builder.add_row(y, {x: future.result() for x, future in row.items()})
+                callback(index, len(ys), Path(f"{finest}/row_{y}"))
+            builder.finish()
+            while pending:
+                z, x, y, future = pending.popleft()
+                put_tile(queue, (z, x, y, future.result(), None, None), errors)
+    finally:
+        queue.put(None)
+        writer.join()
+    if errors:
+        raise errors[0]
+    return written
+
+
+def pack_paths(paths: List[Path], pattern: str) -> List[Path]:
+    """
+    Expands directories to the packs in them matching pattern, keeping files as given.
+    """
+    expanded = []
+    for path in paths:
+        expanded.extend(sorted(path.glob(pattern)) if path.is_dir() else [path])
+    return expanded
+
+
+def make_parser(continent: Optional[str] = None) -> ArgumentParser:
+    """
+    :param continent: extract this continent instead of taking it as an argument
+    """
+    parser = ArgumentParser(description=f"Extract the map tiles of {continent or 'a continent'} as PNGs")
+    parser.add_argument("paths", type=Path, nargs="+", help="assets directories or pack files")
+    if continent is None:
+        parser.add_argument("continent", help="tile name prefix, e.g. Oshur or Indar")
+    else:
+        parser.set_defaults(continent=continent)
+    parser.add_argument("--lods", type=int, nargs=2, default=[0, MAX_LOD], choices=range(MAX_LOD + 1),
+                        metavar=("MIN", "MAX"), help=f"range of LODs to extract, inclusive, from 0 to {MAX_LOD}")
+    parser.add_argument("--packs", default="{continent}*.pack2",
+                        help="pattern selecting the packs in assets directories")
+    parser.add_argument("--output", type=Path, help="tile directory, defaults to tiles/<continent>")
+    parser.add_argument("--archive", type=Path, help="write the tiles into this MBTiles-style SQLite file instead")
+    parser.add_argument("--no-dedup", action="store_true", help="store identical tiles separately in the archive")
+    parser.add_argument("--workers", type=int, help="encoding processes, defaults to the number of CPUs")
+    parser.add_argument("--index-cache", type=Path, help="directory of sidecar pack indexes")
+    parser.add_argument("--pyramid", action="store_true",
+                        help="decode only LOD0 and downsample it for the other zoom levels, ignoring --lods")
+    parser.add_argument("--zooms", type=int, nargs=2, default=[2, 5], metavar=("MIN", "MAX"),
+                        help="zoom levels to build with --pyramid, inclusive. Levels above 5 are scaled up from LOD0")
+    parser.add_argument("--force", action="store_true", help="extract every tile, even those the manifest lists as current")
+    return parser
+
+
+def main(parser: Optional[ArgumentParser] = None):
+    parser = parser or make_parser()
+    args = parser.parse_args()
+    if args.lods[0] > args.lods[1]:
+        parser.error("--lods MIN must not be greater than MAX")
+
+    savepath = args.output or Path("tiles") / args.continent.lower()
+    packs = pack_paths(args.paths, args.packs.format(continent=args.continent))
+
+    print("Loading packs")
+    bar = LoadingBar()
+    manager = AssetManager(packs, callback=bar.callback, index_cache=args.index_cache)
+    if bar.loading_bar is not None:
+        bar.finish()
+
+    if args.pyramid:
+        print("Building tile pyramid...")
+        if args.archive is not None:
+            args.archive.parent.mkdir(parents=True, exist_ok=True)
+            store = TileArchive(args.archive, deduplicate=not args.no_dedup, metadata={"name": args.continent})
+        else:
+            store = TileDirectory(savepath)
+        with store:
+            written = extract_pyramid(manager, args.continent, store, range(args.zooms[0], args.zooms[1] + 1),
+                                      args.workers, bar.callback)
+            if written:
+                bar.finish()
+        print(f"Finished, {written} written")
+        return
+
+    tiles = find_tiles(manager, args.continent, range(args.lods[0], args.lods[1] + 1))
+    print(f"Saving {len(tiles)} tiles...")
+    if args.archive is not None:
+        args.archive.parent.mkdir(parents=True, exist_ok=True)
+        store = TileArchive(args.archive, deduplicate=not args.no_dedup, metadata={"name": args.continent})
+        manifest = TileManifest(args.archive.with_name(args.archive.name + ".manifest.json"))
+    else:
+        savepath.mkdir(parents=True, exist_ok=True)
+        store = TileDirectory(savepath)
+        manifest = TileManifest(savepath / "manifest.json")
+    if args.force:
+        manifest.tiles = {}
+    with store:
+        written = extract_tiles(manager, tiles, store, args.workers, bar.callback, manifest)
+        if written:
+            bar.finish()
+    print(f"Finished, {written} written and {len(tiles) - written} already up to date")
+
+
+if __name__ == "__main__":
+    main()
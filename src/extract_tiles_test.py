@@ -0,0 +1,195 @@
+import json
+import sys
+import threading
+import zlib
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from extract_tiles import TILE_FORMAT, TileManifest, extract_pyramid, extract_tiles, find_tiles, main, make_parser
+from tile_archive import TileDirectory
+from DbgPack import AssetManager, Pack2Writer
+from DbgPack.hash import crc64
+
+TILES = [(-64, -64, 0), (60, 60, 0), (-64, 0, 1), (0, -64, 1), (-64, -64, 3)]
+
+
+def dds(value: int) -> bytes:
+    output = BytesIO()
+    Image.fromarray(np.full((8, 8, 3), value, dtype=np.uint8)).save(output, format="DDS", pixel_format="DXT1")
+    return output.getvalue()
+
+
+def make_tile_pack(path, names, offset: int = 0):
+    with Pack2Writer(path) as writer:
+        for i, name in enumerate(names):
+            data = dds((i * 10 + offset) % 256)
+            writer.add(crc64(name), [data], 0x10, zlib.crc32(data))
+
+
+def test_find_tiles(tmp_path):
+    tiles = TILES
+    make_tile_pack(tmp_path / "tiles.pack2", [TILE_FORMAT.format("Synthetic", *tile) for tile in tiles]
+                   + [TILE_FORMAT.format("Other", 0, 0, 0), TILE_FORMAT.format("Synthetic", 68, 0, 0), "readme.txt"])
+    manager = AssetManager([tmp_path / "tiles.pack2"])
+
+    found = find_tiles(manager, "Synthetic", range(4))
+    assert [tile[:3] for tile in found] == sorted(tiles, key=lambda tile: (tile[2], tile[0], tile[1]))
+    for x, z, lod, name_hash in found:
+        assert name_hash == crc64(TILE_FORMAT.format("Synthetic", x, z, lod))
+        assert name_hash in manager.raw_assets
+    assert [tile[:3] for tile in find_tiles(manager, "Synthetic", range(1, 2))] == [(-64, 0, 1), (0, -64, 1)]
+    assert find_tiles(manager, "Missing", range(4)) == []
+
+
+def test_lods_are_validated():
+    parser = make_parser("Synthetic")
+    assert parser.parse_args(["assets"]).lods == [0, 3]
+    assert parser.parse_args(["assets", "--lods", "1", "2"]).lods == [1, 2]
+    for lods in (["0", "4"], ["-1", "3"]):
+        with pytest.raises(SystemExit):
+            parser.parse_args(["assets", "--lods", *lods])
+    assert make_parser().parse_args(["a", "b", "Indar"]).continent == "Indar"
+
+
+def extract(pack, output, **kwargs):
+    manager = AssetManager([pack])
+    store = TileDirectory(output)
+    manifest = TileManifest(output / "manifest.json")
+    written = extract_tiles(manager, find_tiles(manager, "Synthetic", range(4)), store, workers=1, manifest=manifest,
+                            **kwargs)
+    return written, store, manifest
+
+
+def test_manifest_skips_current_tiles(tmp_path):
+    make_tile_pack(tmp_path / "tiles.pack2", [TILE_FORMAT.format("Synthetic", *tile) for tile in TILES])
+    output = tmp_path / "tiles"
+    written, store, manifest = extract(tmp_path / "tiles.pack2", output)
+    assert written == len(TILES)
+    assert sorted(json.loads((output / "manifest.json").read_text())["tiles"]) == sorted(manifest.tiles)
+    assert sorted(manifest.tiles) == ["2/tile_0_3.png", "4/tile_0_7.png", "4/tile_8_15.png", "5/tile_0_31.png",
+                                      "5/tile_31_0.png"]
+    tile = store.get_tile(5, 0, 31)
+    assert Image.open(BytesIO(tile)).size == (8, 8)
+
+    # Tiles are read back and checked, but nothing is extracted again
+    assert extract(tmp_path / "tiles.pack2", output)[0] == 0
+    assert store.get_tile(5, 0, 31) == tile
+
+    # Changed source entries are extracted again, even with intact tiles
+    make_tile_pack(tmp_path / "tiles.pack2", [TILE_FORMAT.format("Synthetic", *tile) for tile in TILES], offset=128)
+    assert extract(tmp_path / "tiles.pack2", output)[0] == len(TILES)
+    assert extract(tmp_path / "tiles.pack2", output)[0] == 0
+
+
+def test_manifest_resumes(tmp_path):
+    make_tile_pack(tmp_path / "tiles.pack2", [TILE_FORMAT.format("Synthetic", *tile) for tile in TILES])
+    output = tmp_path / "tiles"
+    _, store, manifest = extract(tmp_path / "tiles.pack2", output)
+
+    # A run stopped after its last periodic save left some tiles written but unrecorded, and the rest unwritten
+    saved = dict(sorted(manifest.tiles.items())[:2])
+    (output / "manifest.json").write_text(json.dumps({"version": TileManifest.VERSION, "tiles": saved}))
+    (output / "5" / "tile_31_0.png").unlink()
+    seen = []
+    written, _, manifest = extract(tmp_path / "tiles.pack2", output,
+                                   callback=lambda index, total, path: seen.append(path.as_posix()))
+    assert written == len(TILES) - 2
+    assert sorted(seen) == sorted(manifest.tiles.keys() - saved.keys())
+    assert store.get_tile(5, 31, 0) is not None
+
+    # A manifest of another version or a damaged one is ignored
+    (output / "manifest.json").write_text(json.dumps({"version": TileManifest.VERSION + 1, "tiles": saved}))
+    assert TileManifest(output / "manifest.json").tiles == {}
+    (output / "manifest.json").write_text("{")
+    assert extract(tmp_path / "tiles.pack2", output)[0] == len(TILES)
+
+
+def test_manifest_periodic_save(tmp_path, monkeypatch):
+    monkeypatch.setattr(TileManifest, "SAVE_EVERY", 2)
+    manifest = TileManifest(tmp_path / "manifest.json")
+    manifest.record("5/tile_0_0.png", {"crc": 1}, b"a")
+    assert not (tmp_path / "manifest.json").exists()
+    manifest.record("5/tile_1_0.png", {"crc": 2}, b"b")
+    assert sorted(TileManifest(tmp_path / "manifest.json").tiles) == ["5/tile_0_0.png", "5/tile_1_0.png"]
+
+
+def test_manifest_digest_mismatch(tmp_path):
+    make_tile_pack(tmp_path / "tiles.pack2", [TILE_FORMAT.format("Synthetic", *tile) for tile in TILES])
+    output = tmp_path / "tiles"
+    _, store, _ = extract(tmp_path / "tiles.pack2", output)
+    tile = store.get_tile(4, 0, 7)
+    (output / "4" / "tile_0_7.png").write_bytes(tile[:-10])
+
+    seen = []
+    written, _, _ = extract(tmp_path / "tiles.pack2", output, callback=lambda index, total, path: seen.append(path))
+    assert written == 1 and [path.as_posix() for path in seen] == ["4/tile_0_7.png"]
+    assert store.get_tile(4, 0, 7) == tile
+
+
+class FailingStore(TileDirectory):
+    """
+    Runs out of space after three tiles
+    """
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.written = []
+
+    def write_tile(self, z: int, x: int, y: int, data: bytes):
+        if len(self.written) == 3:
+            raise OSError("disk full")
+        self.written.append((z, x, y))
+
+
+def run_with_timeout(function, *args, **kwargs):
+    """
+    :return: the exception function raised, failing the test if it is still running after a minute
+    """
+    raised = []
+
+    def run():
+        try:
+            function(*args, **kwargs)
+        except Exception as e:
+            raised.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(60)
+    assert not thread.is_alive(), "the pipeline hung"
+    return raised[0] if raised else None
+
+
+def test_write_errors_are_raised(tmp_path):
+    # More tiles than the writer queue holds, so producers would block on it if the writer stopped
+    tiles = [(x, z, 0) for x in range(-64, 64, 4) for z in range(-64, -32, 4)]
+    make_tile_pack(tmp_path / "tiles.pack2", [TILE_FORMAT.format("Synthetic", *tile) for tile in tiles])
+    manager = AssetManager([tmp_path / "tiles.pack2"])
+    found = find_tiles(manager, "Synthetic", range(1))
+    assert len(found) > 64
+
+    store = FailingStore(tmp_path / "tiles")
+    manifest = TileManifest(tmp_path / "manifest.json")
+    error = run_with_timeout(extract_tiles, manager, found, store, 1, manifest=manifest)
+    assert isinstance(error, OSError) and str(error) == "disk full"
+    assert len(store.written) == 3
+    # Tiles written before the error are still recorded
+    assert len(json.loads((tmp_path / "manifest.json").read_text())["tiles"]) == 3
+
+    error = run_with_timeout(extract_pyramid, manager, "Synthetic", FailingStore(tmp_path / "pyramid"), range(2, 6), 1)
+    assert isinstance(error, OSError) and str(error) == "disk full"
+
+
+def test_force(tmp_path, monkeypatch, capsys, quiet_bar):
+    make_tile_pack(tmp_path / "tiles.pack2", [TILE_FORMAT.format("Synthetic", *tile) for tile in TILES])
+    output = tmp_path / "tiles"
+    arguments = ["extract_tiles.py", str(tmp_path / "tiles.pack2"), "Synthetic", "--output", str(output),
+                 "--workers", "1"]
+    for extra, written in (([], len(TILES)), ([], 0), (["--force"], len(TILES))):
+        monkeypatch.setattr(sys, "argv", arguments + extra)
+        main()
+        assert f"Finished, {written} written" in capsys.readouterr().out
+    assert len(TileManifest(output / "manifest.json").tiles) == len(TILES)
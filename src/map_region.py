@@ -1,4 +1,5 @@
 import math
+import sys
 
 from typing import Dict, List, Optional, Tuple, Union
 from queue import SimpleQueue
@@ -108,3 +109,55 @@ class Region:
         
         self.__dirty = False
         return self.__shape
+
+
+def regions_from_census(data: dict, zone_id: int, region_type: type = Region, color: FactionColors = FactionColors.TR) -> Dict[int, Region]:
+    """
+    Builds the regions of a zone from a census map_region query with joined map hexes and facility links,
+    as drawing.py requests and caches it in cache/<zone>_cache.json
+    :param region_type: Region subclass to build, such as CairoRegion for drawing
+    :return: regions keyed by map region id
+    """
+    facilities: Dict[int, Region] = {}
+    missing_facilities = []
+    for map_region in data["map_region_list"]:
+        map_region_id = int(map_region["map_region_id"])
+        if "facility_id" not in map_region:
+            facility_id = map_region_id
+            missing_facilities.append(f'{map_region["facility_name"]} ({map_region_id})')
+        else:
+            facility_id = int(map_region["facility_id"])
+        if "location_x" in map_region:
+            location = (float(map_region["location_x"]), float(map_region["location_z"]))
+        elif map_region["facility_name"] == "Berjess Overlook":
+            location = (-2032.33, -92.78)
+        elif map_region["facility_name"] == "Sunken Relay Station":
+            location = (1423.7, 2631.84)
+        elif map_region["facility_name"] == "Lowland Trading Post":
+            location = (601.596, -2408.15)
+        else:
+            location = tuple()
+        
+        if "facility_links" in map_region:
+            connections = [int(link["map_region"]["map_region_id"]) for link in map_region["facility_links"]]
+        else:
+            connections = []
+        
+        if "facility_type_id" not in map_region:
+            map_region["facility_type_id"] = FacilityTypes.UNKNOWN
+
+        facilities[map_region_id] = region_type(
+            map_region_id,
+            facility_id=facility_id,
+            zone_id=zone_id,
+            facility_type_id=int(map_region["facility_type_id"]),
+            name = map_region["facility_name"],
+            location = location,
+            connections = connections,
+            hexes = [CubeHex.from_axial_rs(-int(hex["y"]) - 1, -int(hex["x"])) for hex in map_region["map_hexes"]],
+            color=color
+        )
+    if missing_facilities:
+        print(f"Regions without a facility id, using their map region id: {', '.join(missing_facilities)}",
+              file=sys.stderr)
+    return facilities
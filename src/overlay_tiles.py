@@ -0,0 +1,211 @@
+"""
+Renders the hex overlay of a continent into transparent PNG tiles in the tiles/<zone>/<zoom>/tile_x_y.png layout of the
+terrain tiles, with the same CairoRegion drawing code as the SVG overlays. Tiles no region or link reaches are skipped.
+
+    python overlay_tiles.py ../cache/oshur_cache.json Oshur --zooms 2 5 --output ../tiles/oshur_hexes
+    python overlay_tiles.py ../cache/oshur_cache.json Oshur --archive ../tiles/oshur_hexes.mbtiles
+"""
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cairo
+import numpy as np
+
+from cairo_region import CairoRegion
+from extract_tiles import LoadingBar
+from map import Map
+from map_region import regions_from_census
+from tile_archive import TileArchive, TileDirectory
+from tile_coords import tile_name
+
+from constants.facility_types import FacilityTypes
+from constants.faction_colors import FactionColors
+from constants.zone_ids import ZoneID
+
+# World offsets the SVG overlays are drawn with, placing the continent on the MAP_SIZE square the tiles divide up
+OFFSETS = (4096, 4096)
+TILE_SIZE = 256
+# Map units around outlines and links for the width of their strokes
+STROKE_MARGIN = 2
+
+
+def _drawable(location: tuple) -> bool:
+    return len(location) == 2 and None not in location
+
+
+class OverlayGeometry:
+    """
+    The regions to draw with their outlines already computed, which CairoRegion caches after the first get_outline,
+    the links each region draws and the bounds of both on the map. Built once and sent once to every worker process.
+    """
+
+    def __init__(self, regions: Dict[int, CairoRegion]):
+        self.regions: List[CairoRegion] = []
+        self.links: List[List[CairoRegion]] = []
+        bounds = []
+        linked = set()
+        for region_id, region in regions.items():
+            if region_id != region._id or region.get_facility_type() == FacilityTypes.UNKNOWN:
+                continue
+            outline = region.get_outline()
+            if len(outline) == 0:
+                continue
+            points = [Map.world_to_map(point, (-OFFSETS[0], OFFSETS[1])) for point in outline]
+            links = []
+            if _drawable(region.get_location()):
+                # Each link is drawn once, by the first of its two regions
+                for link_id in region.get_connections():
+                    if link_id not in regions or (link_id, region_id) in linked \
+                            or not _drawable(regions[link_id].get_location()):
+                        continue
+                    linked.add((region_id, link_id))
+                    links.append(regions[link_id])
+                    points.append(Map.world_to_map(regions[link_id].get_location(), (-OFFSETS[0], OFFSETS[1])))
+                if links:
+                    points.append(Map.world_to_map(region.get_location(), (-OFFSETS[0], OFFSETS[1])))
+            points = np.array(points)
+            bounds.append(np.concatenate([points.min(axis=0) - STROKE_MARGIN, points.max(axis=0) + STROKE_MARGIN]))
+            self.regions.append(region)
+            self.links.append(links)
+        # left, top, right, bottom of each region and its links in map units
+        self.bounds = np.array(bounds, dtype=np.float64).reshape(-1, 4)
+
+    @staticmethod
+    def tile_extent(zoom: int) -> float:
+        return Map.MAP_SIZE / (1 << zoom)
+
+    def tiles(self, zoom: int) -> List[Tuple[int, int]]:
+        """
+        :return: x, y of the tiles at zoom that some region or link reaches, row by row
+        """
+        count = 1 << zoom
+        first = np.clip(np.floor(self.bounds[:, :2] / self.tile_extent(zoom)), 0, count - 1).astype(int)
+        last = np.clip(np.floor(self.bounds[:, 2:] / self.tile_extent(zoom)), 0, count - 1).astype(int)
+        tiles = set()
+        for (left, top), (right, bottom) in zip(first, last):
+            tiles.update((x, y) for y in range(top, bottom + 1) for x in range(left, right + 1))
+        return sorted(tiles, key=lambda tile: (tile[1], tile[0]))
+
+    def overlapping(self, zoom: int, x: int, y: int) -> np.ndarray:
+        """
+        :return: indices of the regions whose bounds overlap tile x, y at zoom
+        """
+        extent = self.tile_extent(zoom)
+        left, top = x * extent, y * extent
+        return np.flatnonzero((self.bounds[:, 0] < left + extent) & (self.bounds[:, 2] > left)
+                              & (self.bounds[:, 1] < top + extent) & (self.bounds[:, 3] > top))
+
+
+_geometry: Optional[OverlayGeometry] = None
+
+
+def _init_worker(geometry: OverlayGeometry):
+    global _geometry
+    _geometry = geometry
+
+
+def render_tile(zoom: int, x: int, y: int, size: int = TILE_SIZE,
+                geometry: Optional[OverlayGeometry] = None) -> Optional[bytes]:
+    """
+    Runs in the worker processes: draws the outlines, then the links, of the regions overlapping a tile
+    :param geometry: defaults to the one the worker was started with
+    :return: the tile as PNG, or None if nothing was drawn on it
+    """
+    geometry = geometry or _geometry
+    indices = geometry.overlapping(zoom, x, y)
+    if len(indices) == 0:
+        return None
+
+    extent = geometry.tile_extent(zoom)
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, size, size)
+    context = cairo.Context(surface)
+    context.scale(size / extent, size / extent)
+    context.translate(-x * extent, -y * extent)
+    for index in indices:
+        geometry.regions[index].draw_outline(context, *OFFSETS)
+    for index in indices:
+        if geometry.links[index]:
+            geometry.regions[index].draw_lattice(context, *OFFSETS, geometry.links[index])
+    surface.flush()
+    # Bounds are rectangles, a tile in the corner of one can still come out empty
+    if not np.frombuffer(surface.get_data(), dtype=np.uint8).any():
+        return None
+    output = BytesIO()
+    surface.write_to_png(output)
+    return output.getvalue()
+
+
+def render_overlay(geometry: OverlayGeometry, store, zooms: range, size: int = TILE_SIZE, workers: int = None,
+                   callback: Callable = lambda index, total, path: True) -> int:
+    """
+    Renders the overlay tiles of every zoom level on a process pool and writes those with anything on them to store.
+    :param callback: called as callback(index, total, path) as each tile is done
+    :return: number of tiles written
+    """
+    jobs = [(zoom, x, y) for zoom in zooms for x, y in geometry.tiles(zoom)]
+    written = 0
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(geometry,)) as executor:
+        pending = deque()
+
+        def save_next():
+            nonlocal written
+            index, (zoom, x, y), future = pending.popleft()
+            data = future.result()
+            if data is not None:
+                store.write_tile(zoom, x, y, data)
+                written += 1
+            callback(index, len(jobs), Path(str(zoom)) / tile_name(x, y))
+
+        for index, job in enumerate(jobs):
+            pending.append((index, job, executor.submit(render_tile, *job, size)))
+            if len(pending) >= 4 * workers:
+                save_next()
+        while pending:
+            save_next()
+    return written
+
+
+def main():
+    parser = ArgumentParser(description="Render the hex overlay of a continent as PNG tiles")
+    parser.add_argument("cache", type=Path, help="census region cache written by drawing.py, e.g. ../cache/oshur_cache.json")
+    parser.add_argument("zone", choices=[zone.name.capitalize() for zone in ZoneID], metavar="zone",
+                        help="continent the cache is for, e.g. Oshur")
+    parser.add_argument("--zooms", type=int, nargs=2, default=[2, 5], metavar=("MIN", "MAX"),
+                        help="zoom levels to render, inclusive")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE, help="tile width and height in pixels")
+    parser.add_argument("--color", choices=[color.name for color in FactionColors], default="TR",
+                        help="faction color to fill the regions with")
+    parser.add_argument("--output", type=Path, help="tile directory, defaults to tiles/<zone>_hexes")
+    parser.add_argument("--archive", type=Path, help="write the tiles into this MBTiles-style SQLite file instead")
+    parser.add_argument("--workers", type=int, help="rendering processes, defaults to the number of CPUs")
+    args = parser.parse_args()
+
+    with open(args.cache) as f:
+        regions = regions_from_census(json.load(f), ZoneID[args.zone.upper()], CairoRegion, FactionColors[args.color])
+    print("Computing region outlines...")
+    geometry = OverlayGeometry(regions)
+
+    if args.archive is not None:
+        args.archive.parent.mkdir(parents=True, exist_ok=True)
+        store = TileArchive(args.archive, metadata={"name": f"{args.zone} hexes", "type": "overlay"})
+    else:
+        store = TileDirectory(args.output or Path("tiles") / f"{args.zone.lower()}_hexes")
+    print(f"Rendering {len(geometry.regions)} regions...")
+    bar = LoadingBar()
+    with store:
+        written = render_overlay(geometry, store, range(args.zooms[0], args.zooms[1] + 1), args.tile_size,
+                                 args.workers, bar.callback)
+        if bar.loading_bar is not None:
+            bar.finish()
+    print(f"Finished, {written} tiles written")
+
+
+if __name__ == "__main__":
+    main()
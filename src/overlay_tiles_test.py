@@ -0,0 +1,41 @@
+from cairo_region import CairoRegion
+from cube_hex import CubeHex
+from overlay_tiles import OverlayGeometry, render_tile
+
+from constants.facility_types import FacilityTypes
+from constants.zone_ids import ZoneID
+
+
+def make_regions():
+    # Two linked regions of a few hexes next to the middle of Oshur, plus one with no facility type
+    return {
+        1: CairoRegion(1, 101, ZoneID.OSHUR, FacilityTypes.SMALL_OUTPOST, "West",
+                       hexes=[CubeHex(0, 0, 0), CubeHex(1, 0, -1)], location=(-28.8, -50), connections=[2]),
+        2: CairoRegion(2, 102, ZoneID.OSHUR, FacilityTypes.LARGE_OUTPOST, "East",
+                       hexes=[CubeHex(2, 0, -2), CubeHex(3, 0, -3)], location=(-28.8, 350), connections=[1]),
+        3: CairoRegion(3, 103, ZoneID.OSHUR, FacilityTypes.UNKNOWN, "Unknown", hexes=[CubeHex(-5, 0, 5)]),
+    }
+
+
+def test_geometry_skips_unknown_and_draws_links_once():
+    geometry = OverlayGeometry(make_regions())
+    assert [region._id for region in geometry.regions] == [1, 2]
+    assert [[link._id for link in links] for links in geometry.links] == [[2], []]
+
+
+def test_tiles_cover_only_the_regions():
+    geometry = OverlayGeometry(make_regions())
+    assert geometry.tiles(0) == [(0, 0)]
+    tiles = geometry.tiles(5)
+    assert tiles
+    # The regions sit around map position (512, 512), 32 map units per tile at zoom 5
+    assert all(14 <= x <= 17 and 14 <= y <= 17 for x, y in tiles)
+    assert (0, 0) not in tiles
+
+
+def test_render_tile():
+    geometry = OverlayGeometry(make_regions())
+    x, y = geometry.tiles(5)[0]
+    data = render_tile(5, x, y, 64, geometry)
+    assert data.startswith(b"\x89PNG")
+    assert render_tile(5, 0, 0, 64, geometry) is None
@@ -0,0 +1,253 @@
+"""
+Stitches the tiles of one zoom level of a continent into a single image, reading them from extracted tiles or straight
+from the game's packs, optionally with the hex overlay tiles composited on top. Tiles are placed one row at a time into
+a memory-mapped array, so memory use stays at a few rows of tiles however large the image is.
+
+    python stitch_tiles.py Oshur --zoom 3 --tiles ../tiles/oshur --overlay ../tiles/oshur_hexes --output oshur.png
+    python stitch_tiles.py Oshur --zoom 5 --packs "<PlanetSide 2>/Resources/Assets" --output oshur_lod0.npy
+"""
+from argparse import ArgumentParser
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+import mmap
+import os
+from pathlib import Path
+import struct
+import sys
+import tempfile
+from typing import Callable, List, Optional
+import zlib
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lib"))
+from DbgPack import AssetManager
+
+from extract_tiles import LoadingBar, decode_tile, find_tiles, pack_paths
+from tile_archive import open_tiles
+from tile_coords import MAX_ZOOM, tile_xy
+
+
+class StoreSource:
+    """
+    Tiles already written to a tile directory or archive
+    """
+
+    def __init__(self, store, zoom: int):
+        self.store = store
+        self.zoom = zoom
+
+    def fetch(self, x: int, y: int) -> Optional[bytes]:
+        return self.store.get_tile(self.zoom, x, y)
+
+    @staticmethod
+    def decode(data: bytes) -> np.ndarray:
+        return np.asarray(Image.open(BytesIO(data)).convert("RGBA"))
+
+
+class PackSource:
+    """
+    Tiles of the LOD matching a zoom level, decoded from the packs
+    """
+
+    def __init__(self, manager: AssetManager, continent: str, zoom: int):
+        lod = MAX_ZOOM - zoom
+        self.assets = {tile_xy(x, z, lod): manager.raw_assets[name_hash]
+                       for x, z, lod, name_hash in find_tiles(manager, continent, range(lod, lod + 1))}
+
+    def fetch(self, x: int, y: int):
+        return self.assets.get((x, y))
+
+    @staticmethod
+    def decode(asset) -> np.ndarray:
+        tile = decode_tile(asset)
+        # Tiles are RGB or RGBA DDS, anything else is converted so stitch can take the colour channels
+        return tile if tile.ndim == 3 else np.asarray(Image.fromarray(tile).convert("RGBA"))
+
+
+def composite(base: np.ndarray, overlay: np.ndarray) -> np.ndarray:
+    """
+    Alpha blends a straight alpha RGBA overlay, as cairo writes PNGs, over an RGB image of the same size
+    """
+    alpha = overlay[..., 3:].astype(np.uint16)
+    blended = (base[..., :3] * (255 - alpha) + overlay[..., :3] * alpha + 127) // 255
+    return blended.astype(np.uint8)
+
+
+def release(array: np.ndarray):
+    """
+    Writes out a memmap and drops its pages from this process, which would otherwise stay resident as it is filled in.
+    The data stays in the file and is read back on the next access.
+    """
+    if isinstance(array, np.memmap):
+        array.flush()
+        mapping = getattr(array, "_mmap", None)
+        if mapping is not None and hasattr(mmap, "MADV_DONTNEED"):
+            mapping.madvise(mmap.MADV_DONTNEED)
+
+
+def _fit(tile: np.ndarray, size: int) -> np.ndarray:
+    if tile.shape[0] == size and tile.shape[1] == size:
+        return tile
+    return np.asarray(Image.fromarray(tile).resize((size, size), Image.LANCZOS))
+
+
+def tile_size(source, count: int) -> Optional[int]:
+    """
+    :return: the width of the first tile source has, None if it has none
+    """
+    for y in range(count):
+        for x in range(count):
+            data = source.fetch(x, y)
+            if data is not None:
+                return source.decode(data).shape[1]
+    return None
+
+
+def stitch(source, count: int, output: np.ndarray, overlay=None, workers: int = None,
+           callback: Callable = lambda index, total, path: True) -> int:
+    """
+    Decodes the tiles of each row on a thread pool, the next row while the current one is placed,
+    and writes them into output. Missing tiles are left as they are in output, black in a new memmap.
+    :param source: StoreSource or PackSource of the zoom level with count x count tiles
+    :param output: (height, width, 3) uint8 array, such as a memmap, its size a multiple of count
+    :param overlay: StoreSource of overlay tiles to composite over the tiles, resized to match them
+    :param callback: called as callback(index, total, path) as each row is placed
+    :return: number of tiles placed
+    """
+    size = output.shape[0] // count
+    placed = 0
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        def decode_row(y: int) -> List[List[Optional[Future]]]:
+            rows = []
+            for tiles in filter(None, (source, overlay)):
+                fetched = (tiles.fetch(x, y) for x in range(count))
+                rows.append([executor.submit(tiles.decode, data) if data is not None else None for data in fetched])
+            return rows
+
+        decoding = decode_row(0)
+        for y in range(count):
+            rows, decoding = decoding, decode_row(y + 1) if y + 1 < count else None
+            band = output[y * size:(y + 1) * size]
+            for x in range(count):
+                tile = rows[0][x].result() if rows[0][x] is not None else None
+                lay = rows[1][x].result() if overlay is not None and rows[1][x] is not None else None
+                if tile is None and lay is None:
+                    continue
+                columns = slice(x * size, (x + 1) * size)
+                if tile is not None:
+                    band[:, columns] = _fit(tile, size)[..., :3]
+                    placed += 1
+                if lay is not None:
+                    band[:, columns] = composite(band[:, columns], _fit(lay, size))
+            release(output)
+            callback(y, count, Path(f"row_{y}"))
+    return placed
+
+
+def _chunk(file, kind: bytes, data: bytes):
+    file.write(struct.pack(">I", len(data)))
+    file.write(kind)
+    file.write(data)
+    file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
+
+
+def write_png(path: Path, image: np.ndarray, level: int = 6, band: int = 256):
+    """
+    Writes an 8 bit gray, RGB or RGBA image as PNG, compressing band rows at a time, so an image too large for memory
+    can be written straight from a memmap. Rows use the Sub filter.
+    """
+    height, width = image.shape[:2]
+    channels = image.shape[2] if image.ndim == 3 else 1
+    color_type = {1: 0, 3: 2, 4: 6}[channels]
+    compressor = zlib.compressobj(level)
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        _chunk(file, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))
+        for top in range(0, height, band):
+            rows = np.ascontiguousarray(image[top:top + band], dtype=np.uint8).reshape(-1, width * channels)
+            filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+            filtered[:, 0] = 1
+            filtered[:, 1:channels + 1] = rows[:, :channels]
+            # Each byte minus the same channel of the pixel to its left, wrapping as PNG expects
+            np.subtract(rows[:, channels:], rows[:, :-channels], out=filtered[:, channels + 1:])
+            data = compressor.compress(filtered.tobytes())
+            if data:
+                _chunk(file, b"IDAT", data)
+            release(image)
+        _chunk(file, b"IDAT", compressor.flush())
+        _chunk(file, b"IEND", b"")
+
+
+def main():
+    parser = ArgumentParser(description="Stitch the tiles of a continent into one image")
+    parser.add_argument("continent", help="tile name prefix, e.g. Oshur or Indar")
+    parser.add_argument("--zoom", type=int, default=3, help="zoom level to stitch, 5 being LOD0")
+    parser.add_argument("--tiles", type=Path, help="tile directory or archive to read, defaults to tiles/<continent>")
+    parser.add_argument("--packs", type=Path, nargs="+", help="read the tiles from these assets directories or packs instead")
+    parser.add_argument("--pack-pattern", default="{continent}*.pack2",
+                        help="pattern selecting the packs in assets directories")
+    parser.add_argument("--index-cache", type=Path, help="directory of sidecar pack indexes")
+    parser.add_argument("--overlay", type=Path, help="tile directory or archive of hex overlay tiles to composite on top")
+    parser.add_argument("--output", type=Path, required=True,
+                        help="image to write. .png and .npy are written in constant memory, "
+                             "other formats Pillow can save hold the whole image in memory")
+    parser.add_argument("--workers", type=int, help="decoding threads, defaults to the number of CPUs")
+    args = parser.parse_args()
+
+    stores = []
+    if args.packs:
+        print("Loading packs")
+        bar = LoadingBar()
+        manager = AssetManager(pack_paths(args.packs, args.pack_pattern.format(continent=args.continent)),
+                               callback=bar.callback, index_cache=args.index_cache)
+        if bar.loading_bar is not None:
+            bar.finish()
+        source = PackSource(manager, args.continent, args.zoom)
+    else:
+        stores.append(open_tiles(args.tiles or Path("tiles") / args.continent.lower()))
+        source = StoreSource(stores[-1], args.zoom)
+    overlay = None
+    if args.overlay is not None:
+        stores.append(open_tiles(args.overlay))
+        overlay = StoreSource(stores[-1], args.zoom)
+
+    count = 1 << args.zoom
+    size = tile_size(source, count)
+    if size is None:
+        print(f"No zoom {args.zoom} tiles found for {args.continent}", file=sys.stderr)
+        sys.exit(1)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    in_place = args.output.suffix == ".npy"
+    if in_place:
+        buffer_path = args.output
+    else:
+        fd, name = tempfile.mkstemp(".npy", dir=args.output.parent)
+        os.close(fd)
+        buffer_path = Path(name)
+    image = None
+    try:
+        image = np.lib.format.open_memmap(buffer_path, mode="w+", dtype=np.uint8, shape=(count * size, count * size, 3))
+        print(f"Stitching {count}x{count} tiles into {count * size}x{count * size} pixels...")
+        bar = LoadingBar()
+        placed = stitch(source, count, image, overlay, args.workers, bar.callback)
+        if bar.loading_bar is not None:
+            bar.finish()
+        if args.output.suffix == ".png":
+            write_png(args.output, image)
+        elif not in_place:
+            Image.fromarray(np.asarray(image)).save(args.output)
+    finally:
+        # The memmap has to be closed before its file can be removed on Windows
+        del image
+        if not in_place:
+            os.remove(buffer_path)
+        for store in stores:
+            store.close()
+    print(f"Finished, {placed} of {count * count} tiles placed")
+
+
+if __name__ == "__main__":
+    main()
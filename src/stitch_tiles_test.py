@@ -0,0 +1,103 @@
+import sys
+import zlib
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from extract_tiles import TILE_FORMAT
+from stitch_tiles import PackSource, StoreSource, composite, main, stitch, write_png
+from tile_archive import TileArchive, TileDirectory
+from DbgPack import AssetManager, Pack2Writer
+from DbgPack.hash import crc64
+
+
+def png(pixels: np.ndarray) -> bytes:
+    output = BytesIO()
+    Image.fromarray(pixels).save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_write_png_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    for shape in [(37, 50), (37, 50, 3), (37, 50, 4)]:
+        image = rng.integers(0, 256, shape, dtype=np.uint8)
+        write_png(tmp_path / "image.png", image, band=8)
+        assert np.array_equal(np.asarray(Image.open(tmp_path / "image.png")), image)
+
+
+def test_composite():
+    base = np.full((1, 3, 3), 200, dtype=np.uint8)
+    overlay = np.zeros((1, 3, 4), dtype=np.uint8)
+    overlay[..., :3] = 100
+    overlay[..., 3] = [0, 255, 51]
+    assert composite(base, overlay)[0, :, 0].tolist() == [200, 100, 180]
+
+
+def test_stitch(tmp_path):
+    tiles = TileDirectory(tmp_path / "tiles")
+    for x, y in [(0, 0), (1, 0), (1, 1)]:
+        tiles.write_tile(1, x, y, png(np.full((4, 4, 3), 10 * (x + 2 * y + 1), dtype=np.uint8)))
+    tiles.write_tile(2, 0, 0, png(np.full((4, 4, 3), 255, dtype=np.uint8)))
+    overlay = np.zeros((4, 4, 4), dtype=np.uint8)
+    overlay[0, 0] = 255
+    with TileArchive(tmp_path / "overlay.mbtiles") as archive:
+        archive.write_tile(1, 1, 1, png(overlay))
+
+    image = np.full((8, 8, 3), 1, dtype=np.uint8)
+    with TileArchive(tmp_path / "overlay.mbtiles") as archive:
+        placed = stitch(StoreSource(tiles, 1), 2, image, StoreSource(archive, 1), workers=2)
+    assert placed == 3
+    assert (image[:4, :4] == 10).all() and (image[:4, 4:] == 20).all()
+    assert (image[4:, :4] == 1).all()
+    assert (image[4, 4] == 255).all() and (image[7, 7] == 40).all()
+
+
+def make_lod3_pack(path):
+    """
+    The four LOD3 tiles of a continent, zoom 2, each a solid colour with its top row marked
+    """
+    with Pack2Writer(path) as writer:
+        for i, (x, z) in enumerate([(-64, -64), (-64, -32), (-32, -64), (-32, -32)]):
+            pixels = np.full((8, 8, 3), 40 * (i + 1), dtype=np.uint8)
+            pixels[0] = 255
+            output = BytesIO()
+            Image.fromarray(pixels).save(output, format="DDS")
+            data = output.getvalue()
+            writer.add(crc64(TILE_FORMAT.format("Synthetic", x, z, 3)), [data], 0x10, zlib.crc32(data))
+
+
+def test_pack_source(tmp_path):
+    make_lod3_pack(tmp_path / "tiles.pack2")
+    source = PackSource(AssetManager([tmp_path / "tiles.pack2"]), "Synthetic", 2)
+    assert sorted(source.assets) == [(0, 2), (0, 3), (1, 2), (1, 3)]
+    assert source.fetch(3, 3) is None
+    tile = source.decode(source.fetch(0, 3))
+    assert tile.shape[:2] == (8, 8) and tile.shape[2] in (3, 4)
+    # Tiles are stored bottom up
+    assert (tile[-1, :, :3] == 255).all() and (tile[0, :, :3] == 40).all()
+
+
+def test_main(tmp_path, monkeypatch, capsys, quiet_bar):
+    make_lod3_pack(tmp_path / "tiles.pack2")
+    output = tmp_path / "out" / "stitched.png"
+    monkeypatch.setattr(sys, "argv", ["stitch_tiles.py", "Synthetic", "--zoom", "2", "--packs",
+                                      str(tmp_path / "tiles.pack2"), "--output", str(output), "--workers", "1"])
+    main()
+    assert "4 of 16 tiles placed" in capsys.readouterr().out
+    image = np.asarray(Image.open(output))
+    assert image.shape == (32, 32, 3)
+    assert (image[31, :8] == 255).all() and (image[24, :8] == 40).all() and (image[16, :8] == 80).all()
+    assert (image[:16] == 0).all()
+    # The temporary buffer is gone
+    assert [path.name for path in output.parent.iterdir()] == ["stitched.png"]
+
+    # No packs matching, the progress bar was never started
+    (tmp_path / "empty").mkdir()
+    monkeypatch.setattr(sys, "argv", ["stitch_tiles.py", "Synthetic", "--packs", str(tmp_path / "empty"),
+                                      "--output", str(output)])
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+    assert exit_info.value.code == 1
+    assert "No zoom 3 tiles found for Synthetic" in capsys.readouterr().err
@@ -0,0 +1,163 @@
+"""
+Places extracted tiles can be written to: a z/tile_x_y.png directory tree, or a single MBTiles-style SQLite archive.
+Both take tiles by zoom and x/y with y counting down from the top of the map, as tile_coords produces them.
+"""
+from hashlib import sha1
+from pathlib import Path
+import sqlite3
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from tile_coords import tile_name
+
+
+class TileDirectory:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._created = set()
+
+    def path(self, z: int, x: int, y: int) -> Path:
+        return self.root / str(z) / tile_name(x, y)
+
+    def write_tile(self, z: int, x: int, y: int, data: bytes):
+        path = self.path(z, x, y)
+        if path.parent not in self._created:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._created.add(path.parent)
+        path.write_bytes(data)
+
+    def get_tile(self, z: int, x: int, y: int) -> Optional[bytes]:
+        try:
+            return self.path(z, x, y).read_bytes()
+        except OSError:
+            return None
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class TileArchive:
+    """
+    Tile pyramid in one SQLite file laid out like MBTiles: images are stored once in `images` keyed by id,
+    `map` points each (zoom_level, tile_column, tile_row) at an image and the `tiles` view joins the two.
+    As in MBTiles, tile_row counts up from the bottom of the map, the archive flips y on the way in and out.
+    Writes are buffered and inserted in batches, one transaction per batch.
+    """
+    BATCH_SIZE = 512
+
+    _schema = """
+        CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS map (
+            zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_id TEXT,
+            PRIMARY KEY (zoom_level, tile_column, tile_row)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS images (tile_id TEXT PRIMARY KEY, tile_data BLOB);
+        CREATE VIEW IF NOT EXISTS tiles AS
+            SELECT map.zoom_level AS zoom_level, map.tile_column AS tile_column, map.tile_row AS tile_row,
+                   images.tile_data AS tile_data
+            FROM map JOIN images ON images.tile_id = map.tile_id;
+    """
+
+    def __init__(self, path: Path, deduplicate: bool = True, metadata: Optional[Dict[str, str]] = None):
+        """
+        :param path: archive to create or add to
+        :param deduplicate: store identical tiles, such as open ocean, only once, keyed by their sha1
+        :param metadata: MBTiles metadata such as name and description
+        """
+        self.path = Path(path)
+        self.deduplicate = deduplicate
+        # The extractor writes from its writer thread, one thread at a time
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.executescript(self._schema)
+            self._connection.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)",
+                                         dict({"format": "png", "scheme": "tms"}, **(metadata or {})).items())
+        self._pending: List[Tuple[int, int, int, str, bytes]] = []
+
+    @staticmethod
+    def _row(z: int, y: int) -> int:
+        return (1 << z) - 1 - y
+
+    def write_tile(self, z: int, x: int, y: int, data: bytes):
+        tile_id = sha1(data).hexdigest() if self.deduplicate else f"{z}/{x}/{y}"
+        self._pending.append((z, x, self._row(z, y), tile_id, data))
+        if len(self._pending) >= self.BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self._connection:
+            # With deduplication an existing id already holds the same data
+            self._connection.executemany(f"INSERT OR {'IGNORE' if self.deduplicate else 'REPLACE'} INTO images "
+                                         "VALUES (?, ?)",
+                                         [(tile_id, data) for _, _, _, tile_id, data in self._pending])
+            self._connection.executemany("INSERT OR REPLACE INTO map VALUES (?, ?, ?, ?)",
+                                         [(z, x, row, tile_id) for z, x, row, tile_id, _ in self._pending])
+        self._pending = []
+
+    def get_tile(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """
+        :return: the tile at zoom z and x/y, counting y from the top, or None if there is none
+        """
+        self.flush()
+        row = self._connection.execute("SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? "
+                                       "AND tile_row = ?", (z, x, self._row(z, y))).fetchone()
+        return row[0] if row is not None else None
+
+    def __contains__(self, zxy: Tuple[int, int, int]) -> bool:
+        z, x, y = zxy
+        self.flush()
+        return self._connection.execute("SELECT 1 FROM map WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                                        (z, x, self._row(z, y))).fetchone() is not None
+
+    def __iter__(self) -> Iterator[Tuple[int, int, int]]:
+        """
+        Yields the z, x, y of every tile, y counting from the top
+        """
+        self.flush()
+        for z, x, row in self._connection.execute("SELECT zoom_level, tile_column, tile_row FROM map ORDER BY 1, 2, 3"):
+            yield z, x, self._row(z, row)
+
+    def __len__(self):
+        self.flush()
+        return self._connection.execute("SELECT COUNT(*) FROM map").fetchone()[0]
+
+    @property
+    def image_count(self) -> int:
+        self.flush()
+        return self._connection.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def close(self):
+        """
+        Writes any buffered tiles, drops images no tile points at any more and records the zoom range
+        """
+        self.flush()
+        with self._connection:
+            self._connection.execute("DELETE FROM images WHERE tile_id NOT IN (SELECT tile_id FROM map)")
+            zooms = self._connection.execute("SELECT MIN(zoom_level), MAX(zoom_level) FROM map").fetchone()
+            if zooms[0] is not None:
+                self._connection.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)",
+                                             [("minzoom", str(zooms[0])), ("maxzoom", str(zooms[1]))])
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def open_tiles(path: Path):
+    """
+    Opens existing tiles to read from: an archive if path is a file, otherwise a tile directory
+    """
+    path = Path(path)
+    return TileArchive(path) if path.is_file() else TileDirectory(path)
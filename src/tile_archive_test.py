@@ -0,0 +1,56 @@
+import sqlite3
+
+from tile_archive import TileArchive, TileDirectory, open_tiles
+
+
+def test_archive_round_trip(tmp_path):
+    path = tmp_path / "tiles.mbtiles"
+    with TileArchive(path) as archive:
+        archive.write_tile(5, 3, 0, b"top")
+        archive.write_tile(5, 3, 31, b"bottom")
+        archive.write_tile(2, 0, 1, b"ocean")
+        archive.write_tile(2, 1, 1, b"ocean")
+        assert archive.get_tile(5, 3, 0) == b"top"
+        assert archive.get_tile(5, 4, 0) is None
+        assert (2, 1, 1) in archive
+        assert len(archive) == 4
+        assert archive.image_count == 3
+        archive.write_tile(5, 3, 0, b"replaced")
+
+    with TileArchive(path) as archive:
+        assert archive.get_tile(5, 3, 0) == b"replaced"
+        assert list(archive) == [(2, 0, 1), (2, 1, 1), (5, 3, 31), (5, 3, 0)]
+        assert archive.image_count == 3  # "top" is no longer referenced
+
+    # MBTiles readers see rows counted from the bottom
+    connection = sqlite3.connect(str(path))
+    assert connection.execute("SELECT tile_data FROM tiles WHERE zoom_level = 5 AND tile_column = 3 AND tile_row = 31"
+                              ).fetchone() == (b"replaced",)
+    assert dict(connection.execute("SELECT name, value FROM metadata")) == \
+        {"format": "png", "scheme": "tms", "minzoom": "2", "maxzoom": "5"}
+    connection.close()
+
+
+def test_archive_without_dedup(tmp_path):
+    with TileArchive(tmp_path / "tiles.mbtiles", deduplicate=False) as archive:
+        archive.write_tile(2, 0, 1, b"ocean")
+        archive.write_tile(2, 1, 1, b"ocean")
+        assert archive.image_count == 2
+
+
+def test_directory(tmp_path):
+    with TileDirectory(tmp_path) as directory:
+        directory.write_tile(4, 2, 7, b"png")
+        assert (tmp_path / "4" / "tile_2_7.png").read_bytes() == b"png"
+        assert directory.get_tile(4, 2, 7) == b"png"
+        assert directory.get_tile(4, 2, 8) is None
+
+
+def test_open_tiles(tmp_path):
+    with TileArchive(tmp_path / "tiles.mbtiles") as archive:
+        archive.write_tile(1, 0, 1, b"archived")
+    TileDirectory(tmp_path / "tiles").write_tile(1, 0, 1, b"loose")
+    with open_tiles(tmp_path / "tiles.mbtiles") as tiles:
+        assert isinstance(tiles, TileArchive) and tiles.get_tile(1, 0, 1) == b"archived"
+    with open_tiles(tmp_path / "tiles") as tiles:
+        assert isinstance(tiles, TileDirectory) and tiles.get_tile(1, 0, 1) == b"loose"
@@ -0,0 +1,54 @@
+import math
+from typing import Optional, Tuple
+
+# Game tiles are named by the coordinates of their corner on a grid running from -64 to 64
+TILE_GRID_MIN = -64
+TILE_GRID_MAX = 64
+MAX_ZOOM = 5
+# The game ships LOD0 to LOD3, zoom levels 5 down to 2
+MAX_LOD = 3
+
+
+def lod_zoom(lod: int) -> int:
+    """
+    LOD0 is the most detailed level, written as zoom 5
+    """
+    return MAX_ZOOM - lod
+
+
+def tile_xy(x: int, z: int, lod: int) -> Tuple[int, int]:
+    """
+    Maps a game tile at grid position (x, z) of a LOD to its x/y in the zoom level directory,
+    with y counting down from the top of the map
+    """
+    size = math.pow(2, 2 + lod)
+    return int((x - TILE_GRID_MIN) / size), int((-z + (TILE_GRID_MAX - size)) / size)
+
+
+def legacy_tile_xy(x: int, y: int, zoom: int) -> Tuple[int, int]:
+    """
+    Maps a tile saved under its game coordinates by older extractors to its x/y in the zoom level directory
+    """
+    divisor = int(32 / (2 ** (zoom - 2)))
+    offset = 2 ** (zoom - 1)
+    return int(x / divisor) + offset, abs(int(y / divisor) - (offset - 1))
+
+
+def tile_name(x: int, y: int) -> str:
+    return f"tile_{x:d}_{y:d}.png"
+
+
+def parse_legacy_name(filename: str) -> Optional[Tuple[int, int]]:
+    """
+    :return: the game coordinates in a legacy tile name such as tile_-32_016.png, or None for any other file
+    """
+    fields = filename.split("_")
+    if len(fields) != 3 or fields[0] != "tile" or not fields[2].endswith(".png"):
+        return None
+    x, y = fields[1], fields[2][:-len(".png")]
+    if len(x) != 3:
+        return None
+    try:
+        return int(x), int(y)
+    except ValueError:
+        return None
@@ -0,0 +1,47 @@
+import math
+
+from tile_coords import legacy_tile_xy, lod_zoom, parse_legacy_name, tile_name, tile_xy
+
+
+def original_tile_xy(x, z, lod):
+    # extract_oshur_tiles.py before the transform was factored out
+    return int((x + 64) / math.pow(2, 2 + lod)), int((-z + (64 - math.pow(2, 2 + lod))) / math.pow(2, 2 + lod))
+
+
+def test_tile_xy_matches_extractor():
+    for lod in range(4):
+        for x in range(-64, 65):
+            for z in range(-64, 65):
+                assert tile_xy(x, z, lod) == original_tile_xy(x, z, lod)
+
+
+def test_tile_xy_corners():
+    assert lod_zoom(0) == 5
+    assert tile_xy(-64, 60, 0) == (0, 0)
+    assert tile_xy(60, -64, 0) == (31, 31)
+    assert tile_xy(-64, 32, 3) == (0, 0)
+    assert tile_xy(0, 0, 3) == (2, 1)
+
+
+def original_legacy_tile_xy(x, y, z):
+    # tile_renamer.py before the transform was factored out
+    divisor = int(32 / (2 ** (z - 2)))
+    offset = 2 ** (z - 1)
+    return int(int(x) / divisor) + offset, abs(int(int(y) / divisor) - (offset - 1))
+
+
+def test_legacy_tile_xy():
+    for zoom in range(2, 6):
+        for x in range(-64, 65, 4):
+            for y in range(-64, 65, 4):
+                assert legacy_tile_xy(x, y, zoom) == original_legacy_tile_xy(x, y, zoom)
+    assert legacy_tile_xy(0, 0, 2) == (2, 1)
+    assert legacy_tile_xy(60, -60, 5) == (31, 30)
+
+
+def test_parse_legacy_name():
+    assert parse_legacy_name("tile_-32_016.png") == (-32, 16)
+    assert parse_legacy_name("tile_000_-04.png") == (0, -4)
+    assert parse_legacy_name(tile_name(12, 3)) is None
+    assert parse_legacy_name("manifest.json") is None
+    assert parse_legacy_name("tile_abc_def.png") is None
@@ -0,0 +1,105 @@
+"""
+Builds a tile pyramid from its most detailed zoom level, so only that level has to be decoded.
+Tiles are NumPy arrays of shape (height, width[, channels]) and y counts down from the top of the map,
+so tile (x, y) at zoom z covers tiles 2x..2x+1, 2y..2y+1 at zoom z + 1.
+"""
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+Row = Dict[int, np.ndarray]
+
+
+def downsample(quad: List[List[Optional[np.ndarray]]]) -> np.ndarray:
+    """
+    2x2 box filter of four neighbouring tiles into one of the same size. Missing tiles count as zeros.
+    :param quad: [[top left, top right], [bottom left, bottom right]], at least one not None.
+                 Tiles must have even width and height
+    """
+    shape = next(tile.shape for pair in quad for tile in pair if tile is not None)
+    height, width = shape[0] // 2, shape[1] // 2
+    result = np.zeros(shape, dtype=np.uint8)
+    for i, pair in enumerate(quad):
+        for j, tile in enumerate(pair):
+            if tile is None:
+                continue
+            # Adding the four strided pixel grids is much faster than a reduction over reshaped axes
+            tile = tile.astype(np.uint16)
+            summed = tile[0::2, 0::2] + tile[1::2, 0::2] + tile[0::2, 1::2] + tile[1::2, 1::2]
+            result[i * height:(i + 1) * height, j * width:(j + 1) * width] = (summed + 2) >> 2
+    return result
+
+
+def upsample(tile: np.ndarray, levels: int) -> Dict[tuple, np.ndarray]:
+    """
+    Splits a tile into the 2^levels x 2^levels tiles covering it at a deeper zoom, scaled up by pixel repetition.
+    Sizes not divisible by 2^levels lose their last rows and columns.
+    :return: tiles keyed by their (dx, dy) offset within the split
+    """
+    factor = 1 << levels
+    height, width = tile.shape[0] // factor, tile.shape[1] // factor
+    return {(dx, dy): np.repeat(np.repeat(tile[dy * height:(dy + 1) * height, dx * width:(dx + 1) * width],
+                                          factor, axis=0), factor, axis=1)
+            for dy in range(factor) for dx in range(factor)}
+
+
+class PyramidBuilder:
+    """
+    Takes the most detailed zoom level one row of tiles at a time, in increasing y, and emits every tile of the
+    pyramid as soon as it can be made. Each coarser level holds at most one row waiting for its neighbour,
+    so memory stays at a few rows of tiles however large the map is.
+    """
+
+    def __init__(self, zoom: int, min_zoom: int, emit: Callable[[int, int, int, np.ndarray], None],
+                 extra_zooms: int = 0):
+        """
+        :param zoom: zoom level of the rows given to add_row
+        :param min_zoom: coarsest zoom level to build
+        :param emit: called as emit(z, x, y, tile) for every tile
+        :param extra_zooms: also emit this many zoom levels deeper than zoom, scaled up from it
+        """
+        self.zoom = zoom
+        self.min_zoom = min_zoom
+        self.emit = emit
+        self.extra_zooms = extra_zooms
+        self._waiting: Dict[int, tuple] = {}  # zoom -> (y, row) waiting for the other half of its parent row
+
+    def add_row(self, y: int, row: Row):
+        for x, tile in sorted(row.items()):
+            for levels in range(1, self.extra_zooms + 1):
+                factor = 1 << levels
+                for (dx, dy), part in upsample(tile, levels).items():
+                    self.emit(self.zoom + levels, x * factor + dx, y * factor + dy, part)
+        self._add(self.zoom, y, row)
+
+    def finish(self):
+        """
+        Emits the tiles still waiting for a neighbouring row that never came
+        """
+        for z in range(self.zoom, self.min_zoom, -1):
+            if z in self._waiting:
+                y, row = self._waiting.pop(z)
+                self._reduce(z, y // 2, row, {})
+
+    def _add(self, z: int, y: int, row: Row):
+        for x, tile in sorted(row.items()):
+            self.emit(z, x, y, tile)
+        if z <= self.min_zoom:
+            return
+
+        waiting = self._waiting.pop(z, None)
+        if waiting is not None and waiting[0] // 2 == y // 2:
+            self._reduce(z, y // 2, waiting[1], row)
+            return
+        if waiting is not None:
+            self._reduce(z, waiting[0] // 2, waiting[1], {})
+        if y % 2 == 0:
+            self._waiting[z] = (y, row)
+        else:
+            self._reduce(z, y // 2, {}, row)
+
+    def _reduce(self, z: int, parent_y: int, top: Row, bottom: Row):
+        parents = sorted({x // 2 for x in top} | {x // 2 for x in bottom})
+        self._add(z - 1, parent_y, {x: downsample([[top.get(2 * x), top.get(2 * x + 1)],
+                                                   [bottom.get(2 * x), bottom.get(2 * x + 1)]])
+                                    for x in parents})
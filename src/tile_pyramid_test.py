@@ -0,0 +1,59 @@
+import numpy as np
+
+from tile_pyramid import PyramidBuilder, downsample, upsample
+
+
+def test_downsample():
+    quad = [[np.full((4, 4, 3), 10, np.uint8), np.full((4, 4, 3), 20, np.uint8)],
+            [np.full((4, 4, 3), 30, np.uint8), None]]
+    tile = downsample(quad)
+    assert tile.shape == (4, 4, 3)
+    assert (tile[:2, :2] == 10).all() and (tile[:2, 2:] == 20).all()
+    assert (tile[2:, :2] == 30).all() and (tile[2:, 2:] == 0).all()
+
+    pixels = np.array([[0, 1, 254, 255], [3, 4, 255, 255]], np.uint8)
+    assert downsample([[pixels, None], [None, None]])[0, :2].tolist() == [2, 255]
+
+
+def test_upsample():
+    tile = np.arange(16, dtype=np.uint8).reshape(4, 4)
+    parts = upsample(tile, 1)
+    assert parts[(1, 0)].tolist() == [[2, 2, 3, 3], [2, 2, 3, 3], [6, 6, 7, 7], [6, 6, 7, 7]]
+    assert len(upsample(tile, 2)) == 16
+
+
+def test_builder_matches_direct_downsampling():
+    rng = np.random.default_rng(0)
+    finest = {(x, y): rng.integers(0, 256, (8, 8, 3), dtype=np.uint8) for x in range(4) for y in range(4)
+              if (x, y) != (3, 3)}
+    emitted = {}
+    builder = PyramidBuilder(2, 0, lambda z, x, y, tile: emitted.setdefault((z, x, y), tile), extra_zooms=1)
+    for y in range(4):
+        builder.add_row(y, {x: tile for (x, tile_y), tile in finest.items() if tile_y == y})
+    builder.finish()
+
+    assert sorted(key for key in emitted if key[0] == 2) == sorted((2, x, y) for x, y in finest)
+    assert sorted(key for key in emitted if key[0] == 1) == [(1, x, y) for x in range(2) for y in range(2)]
+    assert [key for key in emitted if key[0] == 0] == [(0, 0, 0)]
+    assert len([key for key in emitted if key[0] == 3]) == 4 * len(finest)
+
+    def quad(z, x, y):
+        return [[emitted.get((z, 2 * x, 2 * y)), emitted.get((z, 2 * x + 1, 2 * y))],
+                [emitted.get((z, 2 * x, 2 * y + 1)), emitted.get((z, 2 * x + 1, 2 * y + 1))]]
+    for x in range(2):
+        for y in range(2):
+            assert (emitted[(1, x, y)] == downsample(quad(2, x, y))).all()
+    assert (emitted[(0, 0, 0)] == downsample(quad(1, 0, 0))).all()
+    assert (emitted[(3, 3, 1)] == upsample(finest[(1, 0)], 1)[(1, 1)]).all()
+
+
+def test_builder_sparse_rows():
+    emitted = []
+    builder = PyramidBuilder(3, 1, lambda z, x, y, tile: emitted.append((z, x, y)))
+    tile = np.zeros((2, 2), np.uint8)
+    builder.add_row(1, {5: tile})
+    builder.add_row(2, {0: tile})
+    builder.add_row(6, {7: tile})
+    builder.finish()
+    assert sorted(emitted) == [(1, 0, 0), (1, 1, 0), (1, 1, 1), (2, 0, 1), (2, 2, 0), (2, 3, 3),
+                               (3, 0, 2), (3, 5, 1), (3, 7, 6)]
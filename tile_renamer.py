@@ -1,5 +1,20 @@
-import os, shutil
+"""
+Renames tiles saved under their game coordinates by older extractors to their final z/x/y names.
+Current extractors write the final names directly, so this is only needed for legacy tile trees.
+
+    python tile_renamer.py tiles/oshur [--dry-run]
+
+Renames are done in-process with os.replace, and only files still carrying legacy names are touched,
+so running it again, including after an interruption, finishes the remaining tiles.
+"""
+import os
 import sys
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src"))
+from tile_coords import legacy_tile_xy, parse_legacy_name, tile_name
 
 z_to_lod = {
     5: "lod0",
@@ -8,25 +23,56 @@ z_to_lod = {
     2: "lod3",
 }
 
-for z in range(2, 6):
-    divisor = int(32 / (2 ** (z - 2)))
-    offset = 2 ** (z - 1)
-
-    #32 2 16 3 8 4 4 5
-    
-    for dir in ["oshur"]:
-        coords = []
-        for filename in os.listdir(f"tiles/{dir}/{z}"):
-            fields = filename.split("_")
-            x = fields[1]
-            if len(x) != 3:
-                continue
-            y = fields[2].split(".")[0]
-            coords.append((x, y))
-
-        for coord in coords:
-            transform = (int(int(coord[0]) / divisor) + offset, abs(int(int(coord[1]) / divisor) - (offset - 1)))
-            # print(f"/home/ryan/temp/magick oshur/{lod}/tile_{coord[0]}_{coord[1]}.png -flip oshur/{lod}/tile_{transform[0]}_{transform[1]}.png")
-            # sys.stdout.flush()
-            os.system(f"mv tiles/{dir}/{z}/tile_{coord[0]}_{coord[1]}.png tiles/{dir}/{z}/tile_{transform[0]}_{transform[1]}.png")
-        
+
+def plan_renames(directory: Path, z: int) -> List[Tuple[Path, Path]]:
+    """
+    :return: (legacy path, final path) for every legacy tile in a zoom level directory
+    """
+    renames = []
+    for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+        coord = parse_legacy_name(entry.name)
+        if coord is None or not entry.is_file():
+            continue
+        renames.append((Path(entry.path), directory / tile_name(*legacy_tile_xy(*coord, z))))
+
+    targets = {}
+    for source, target in renames:
+        if target in targets:
+            raise ValueError(f"{source.name} and {targets[target].name} would both be renamed to {target.name}")
+        targets[target] = source
+    return renames
+
+
+def rename_tiles(root: Path, dry_run: bool = False) -> int:
+    """
+    :param root: continent tile directory holding the zoom level directories
+    :return: number of tiles renamed
+    """
+    # Plan every level before touching anything, so a collision leaves the tree untouched
+    renames = []
+    for z in z_to_lod:
+        directory = root / str(z)
+        if directory.is_dir():
+            renames.extend(plan_renames(directory, z))
+
+    for source, target in renames:
+        if dry_run:
+            print(f"{source} -> {target}")
+        else:
+            os.replace(source, target)
+    return len(renames)
+
+
+def main():
+    parser = ArgumentParser(description="Rename legacy game-coordinate tiles to their final z/x/y names")
+    parser.add_argument("roots", type=Path, nargs="*", default=[Path("tiles/oshur")],
+                        help="continent tile directories")
+    parser.add_argument("--dry-run", action="store_true", help="print the renames without doing them")
+    args = parser.parse_args()
+
+    for root in args.roots:
+        print(f"{root}: {rename_tiles(root, args.dry_run)} tiles renamed")
+
+
+if __name__ == "__main__":
+    main()